@@ -12,10 +12,12 @@
 API端点:
     GET  /api/videos                - 获取视频列表 (支持分页)
     GET  /api/videos/<id>           - 获取单个视频
+    GET  /api/videos/batch          - 按ID批量获取视频
     GET  /api/videos/search         - 搜索视频
     GET  /api/videos/category       - 按分类获取视频
     GET  /api/videos/category/tags  - 获取分类下的视频标签
     GET  /api/videos/top            - 获取热门视频
+    GET  /api/videos/trending       - 获取热度榜 (按时间衰减)
     POST /api/videos/<id>/play      - 增加播放次数
     GET  /api/categories            - 获取所有分类
     GET  /api/statistics            - 获取统计信息
@@ -26,27 +28,32 @@ API端点:
 from __future__ import annotations
 
 import os
-import re
 import sys
+import tempfile
+import atexit
+import hashlib
 import uuid
 import json
 import logging
+import threading
 import time
 from datetime import datetime
 from functools import wraps
 from contextlib import contextmanager
-from typing import Any, Callable, cast, Dict, Generator, List, Optional, Tuple, TypeVar
+from typing import Any, Callable, cast, Dict, Generator, Iterable, List, Optional, Tuple, TypeVar
+from urllib.parse import quote
 
 import requests as http_requests
 from flask import (
     Flask, jsonify, request, Response, g, send_from_directory, stream_with_context
 )
+from werkzeug.http import http_date, parse_date, unquote_etag
 from werkzeug.utils import secure_filename
 from flask_cors import CORS
 
 # 导入视频数据库模块 (在同一目录或父目录中)
 try:
-    from video_database import VideoDatabase
+    from video_database import ConnectionPool, PlayCountAggregator, PoolTimeout, VideoDatabase
 except ImportError:
     # 如果同目录找不到,尝试父目录 (本地开发环境)
     repo_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
@@ -55,7 +62,7 @@ except ImportError:
     if tools_path not in sys.path:
         sys.path.insert(0, tools_path)
     try:
-        from video_database import VideoDatabase
+        from video_database import ConnectionPool, PlayCountAggregator, PoolTimeout, VideoDatabase
     except ImportError:
         print("错误: 无法导入 video_database 模块")
         print("请确保 video_database.py 在正确的位置")
@@ -67,6 +74,9 @@ try:
 except ImportError:
     hanime_scraper = None  # type: ignore
 
+from response_cache import (CacheBackend, MemoryCache, ProxyCachePurger, create_cache, make_cache_key,
+                            video_tags)
+
 # Type variable for decorated functions
 F = TypeVar('F', bound=Callable[..., Any])
 
@@ -143,15 +153,269 @@ def after_request(response: Response) -> Response:
     return response
 
 
+# 进程级连接池 (Process-wide connection pool), 在每个 gunicorn worker 中首次使用时创建
+_db_pool: Optional[ConnectionPool] = None
+_db_pool_pid: Optional[int] = None
+_db_pool_lock: threading.Lock = threading.Lock()
+
+
+def get_db_pool() -> ConnectionPool:
+    """
+    获取进程级连接池 (Get the process-wide connection pool)
+
+    建池时只执行一次建表与迁移, 之后每个请求都从池中借用连接。
+    如果进程在建池后被 fork (例如 gunicorn --preload), 子进程会重建自己的连接池,
+    避免多个进程共享同一条数据库连接。
+    """
+    global _db_pool, _db_pool_pid
+    pid = os.getpid()
+    if _db_pool is None or _db_pool_pid != pid:
+        with _db_pool_lock:
+            if _db_pool is None or _db_pool_pid != pid:
+                use_mysql: bool = os.environ.get('USE_MYSQL', 'true').lower() == 'true'
+                _db_pool = ConnectionPool(use_mysql=use_mysql)
+                _db_pool_pid = pid
+                logger.info(f"数据库连接池已创建 (Connection pool created): {_db_pool.stats()}")
+    return _db_pool
+
+
+# 进程级播放数合并写入器 (Process-wide write-behind play counter)
+_play_counter: Optional[PlayCountAggregator] = None
+_play_counter_pid: Optional[int] = None
+_play_counter_lock: threading.Lock = threading.Lock()
+
+
+def get_play_counter() -> PlayCountAggregator:
+    """
+    获取进程级播放数合并写入器 (Get the process-wide play counter)
+
+    播放接口只在内存中累加, 由后台线程定时批量写库;
+    进程正常退出 (gunicorn worker 收到 SIGTERM) 时通过 atexit 写入剩余增量。
+    """
+    global _play_counter, _play_counter_pid
+    pid = os.getpid()
+    if _play_counter is None or _play_counter_pid != pid:
+        with _play_counter_lock:
+            if _play_counter is None or _play_counter_pid != pid:
+                _play_counter = PlayCountAggregator(get_db_pool())
+                _play_counter_pid = pid
+                atexit.register(_play_counter.close)
+    return _play_counter
+
+
+# ==================== 响应缓存 (Response cache) ====================
+# 公共读接口的响应进入缓存, 数据库提交写入后按数据标签失效
+# CACHE_BACKEND 选择后端 (类似 USE_MYSQL):
+#   memory - 每个 worker 进程内缓存, 同机 worker 通过 RESPONSE_CACHE_SHARED_FILE 互相通知失效 (默认)
+#   file   - 同机所有 worker 共享 CACHE_DIR 目录中的缓存
+#   redis  - 多台 API 节点共享 CACHE_REDIS_URL 指向的 Redis 协议服务
+CACHE_BACKEND: str = os.environ.get('CACHE_BACKEND', 'memory').strip().lower() or 'memory'
+RESPONSE_CACHE_TTL: float = float(os.environ.get('RESPONSE_CACHE_TTL', '60'))
+RESPONSE_CACHE_MAX_BYTES: int = int(float(os.environ.get('RESPONSE_CACHE_MAX_MB', '32')) * 1024 * 1024)
+# 各 worker 共享的标签版本文件 (同一台机器上的 worker 须指向同一个文件), 留空使用系统临时目录
+RESPONSE_CACHE_SHARED_FILE: str = os.environ.get('RESPONSE_CACHE_SHARED_FILE', '').strip() or os.path.join(
+    tempfile.gettempdir(), 'video-api-cache-versions')
+CACHE_DIR: str = os.environ.get('CACHE_DIR', '').strip() or os.path.join(
+    tempfile.gettempdir(), 'video-api-cache')
+CACHE_REDIS_URL: str = os.environ.get('CACHE_REDIS_URL', 'redis://localhost:6379/0').strip()
+CACHE_REDIS_TIMEOUT: float = float(os.environ.get('CACHE_REDIS_TIMEOUT', '0.5'))
+CACHE_REDIS_PREFIX: str = os.environ.get('CACHE_REDIS_PREFIX', 'video-api:')
+
+_response_cache: Optional[CacheBackend] = None
+_response_cache_pid: Optional[int] = None
+_response_cache_lock: threading.Lock = threading.Lock()
+
+
+def get_response_cache() -> CacheBackend:
+    """
+    获取进程级响应缓存 (Get the process-wide response cache)
+
+    后端由 CACHE_BACKEND 选择; 配置无效或共享文件/目录无法打开时,
+    退化为只在本进程内失效的 memory 缓存 (其它 worker 依赖 TTL)。
+    """
+    global _response_cache, _response_cache_pid
+    pid = os.getpid()
+    if _response_cache is None or _response_cache_pid != pid:
+        with _response_cache_lock:
+            if _response_cache is None or _response_cache_pid != pid:
+                try:
+                    _response_cache = create_cache(
+                        CACHE_BACKEND, RESPONSE_CACHE_MAX_BYTES, RESPONSE_CACHE_TTL,
+                        shared_file=RESPONSE_CACHE_SHARED_FILE, directory=CACHE_DIR,
+                        redis_url=CACHE_REDIS_URL, redis_timeout=CACHE_REDIS_TIMEOUT,
+                        redis_prefix=CACHE_REDIS_PREFIX)
+                except (ValueError, OSError) as e:
+                    logger.warning(f"缓存后端不可用, 使用进程内缓存 (Cache backend unavailable): {e}")
+                    _response_cache = MemoryCache(RESPONSE_CACHE_MAX_BYTES, RESPONSE_CACHE_TTL)
+                _response_cache_pid = pid
+    return _response_cache
+
+
+# 前置 nginx proxy_cache (见 video-app/nginx.conf): 公共 GET 响应带 s-maxage / stale-while-revalidate,
+# PROXY_CACHE_TTL 为 0 时不允许代理缓存; PROXY_CACHE_DIR 为与 nginx 共享的缓存卷, 留空不清除代理缓存
+PROXY_CACHE_TTL: int = int(os.environ.get('PROXY_CACHE_TTL', '10'))
+PROXY_CACHE_STALE: int = int(os.environ.get('PROXY_CACHE_STALE', '60'))
+PROXY_CACHE_DIR: str = os.environ.get('PROXY_CACHE_DIR', '').strip()
+
+_proxy_purger: Optional[ProxyCachePurger] = ProxyCachePurger(PROXY_CACHE_DIR) if PROXY_CACHE_DIR else None
+
+
+def invalidate_caches(tags: Iterable[str]) -> None:
+    """
+    数据库提交写入后的失效回调 (on_change): 先失效响应缓存, 再清除 nginx 中依赖这些标签的条目,
+    使 nginx 回源时拿到的已是新数据
+    """
+    tags = list(tags)
+    try:
+        get_response_cache().invalidate(tags)
+    finally:
+        if _proxy_purger is not None:
+            purged = _proxy_purger.purge(tags)
+            if purged:
+                logger.debug(f"清除代理缓存 {purged} 条 (Purged proxy cache entries): {tags}")
+
+
+def _record_proxy_key(tags: Iterable[str]) -> None:
+    """登记 nginx 缓存键 (nginx 以 X-Proxy-Cache-Key 请求头传入) 依赖的标签, 供写入后清除"""
+    cache_key = request.headers.get('X-Proxy-Cache-Key')
+    if _proxy_purger is not None and cache_key and PROXY_CACHE_TTL > 0:
+        _proxy_purger.record(cache_key, tags)
+
+
+def cached_count(key: str, tags: Iterable[str], compute: Callable[[], int]) -> int:
+    """
+    带缓存的总数查询 (Cached COUNT)
+
+    列表接口的 total 与分页无关, 按 cursor/offset 翻页时不必每页重新 COUNT;
+    结果以 count: 前缀的键存入响应缓存, 随相同的数据标签失效。
+    """
+    cache = get_response_cache()
+    if not cache.enabled:
+        return compute()
+    entry = cache.get(key)
+    if entry is not None:
+        return int(entry.body)
+    generation = cache.generation()
+    count = compute()
+    cache.set(key, str(count).encode('ascii'), tags, generation=generation)
+    return count
+
+
+def add_cache_tags(*tags: str) -> None:
+    """为当前请求的缓存条目追加依赖于参数或结果的标签 (在 cached_response 视图内调用)"""
+    if 'cache_tags' in g:
+        g.cache_tags.extend(tags)
+
+
+# ETag/Last-Modified 中的时间分段秒数: 播放数写入不递增数据版本, 校验值每个分段变化一次,
+# 客户端拿到的播放数最多滞后一个分段; 0 表示校验值只随数据版本变化
+ETAG_PERIOD: float = float(os.environ.get('ETAG_PERIOD', '60'))
+
+
+def _validators(key: str, version: int, updated_at: int) -> Dict[str, str]:
+    """
+    由数据版本生成条件请求的校验头 (Validators for conditional GET)
+
+    弱 ETag = 版本号-时间分段-查询摘要; Last-Modified 为该版本最后写入时间与分段起点中较晚者。
+    Cache-Control: max-age=0 让浏览器每次使用前带 If-None-Match 重新验证;
+    s-maxage / stale-while-revalidate 允许 nginx 等共享缓存保存 PROXY_CACHE_TTL 秒,
+    过期后先返回旧响应并在后台回源 (PROXY_CACHE_TTL 为 0 时为 no-cache)。
+    """
+    bucket = int(time.time() // ETAG_PERIOD) if ETAG_PERIOD > 0 else 0
+    digest = hashlib.blake2b(key.encode('utf-8'), digest_size=8).hexdigest()
+    if PROXY_CACHE_TTL > 0:
+        cache_control = (f'public, max-age=0, s-maxage={PROXY_CACHE_TTL}, '
+                         f'stale-while-revalidate={PROXY_CACHE_STALE}, stale-if-error={PROXY_CACHE_STALE}')
+    else:
+        cache_control = 'no-cache'
+    return {
+        'ETag': f'W/"{version}-{bucket}-{digest}"',
+        'Last-Modified': http_date(max(updated_at, int(bucket * ETAG_PERIOD))),
+        'Cache-Control': cache_control,
+    }
+
+
+def _not_modified(headers: Dict[str, str]) -> bool:
+    """请求的 If-None-Match / If-Modified-Since 是否与校验头一致 (提供 If-None-Match 时以其为准)"""
+    if request.if_none_match:
+        etag, _ = unquote_etag(headers['ETag'])
+        return request.if_none_match.contains_weak(etag)
+    if request.if_modified_since:
+        last_modified = parse_date(headers['Last-Modified'])
+        return last_modified is not None and last_modified <= request.if_modified_since
+    return False
+
+
+def _not_modified_response(headers: Dict[str, str], cache_status: str) -> Tuple[Response, int]:
+    response = Response(status=304)
+    response.headers.update(headers)
+    response.headers['X-Cache'] = cache_status
+    return response, 304
+
+
+def cached_response(*tags: str,
+                    version_scope: Optional[Callable[[], str]] = None) -> Callable[[F], F]:
+    """
+    缓存 GET 接口的 200 响应并支持条件请求 (Cache + conditional GET for public read endpoints)
+
+    键为路径 + 排序后的查询参数; tags 为固定标签, 视图内可用 add_cache_tags 追加。
+    放在 handle_errors 之下, 出错的响应不会被缓存。响应头 X-Cache 标明 HIT/MISS,
+    Surrogate-Key 列出条目的标签 (URL 编码, 空格分隔)。
+
+    响应带有由数据版本 (version_scope() 返回的 scope, 默认 global) 生成的 ETag / Last-Modified;
+    If-None-Match 匹配时返回 304: 缓存命中时不访问数据库, 未命中时只读取 data_version 一行。
+    """
+    def decorator(f: F) -> F:
+        @wraps(f)
+        def decorated_function(*args: Any, **kwargs: Any) -> Tuple[Response, int]:
+            cache = get_response_cache()
+            key = make_cache_key(request.path, request.args.items(multi=True))
+            entry = cache.get(key) if cache.enabled else None
+            if entry is not None:
+                headers = dict(entry.headers)
+                if _not_modified(headers):
+                    return _not_modified_response(headers, 'HIT')
+                response = Response(entry.body, status=200, mimetype='application/json')
+                response.headers.update(headers)
+                response.headers['X-Cache'] = 'HIT'
+                _record_proxy_key(entry.tags)
+                return response, 200
+
+            generation = cache.generation()
+            scope = version_scope() if version_scope else 'global'
+            with get_db() as db:
+                version, updated_at = db.get_data_version(scope)
+            headers = _validators(key, version, updated_at)
+            if _not_modified(headers):
+                return _not_modified_response(headers, 'MISS')
+
+            g.cache_tags = list(tags)
+            response, code = f(*args, **kwargs)
+            if code == 200:
+                entry_tags = list(dict.fromkeys(g.cache_tags))
+                headers['Surrogate-Key'] = ' '.join(quote(tag, safe=':') for tag in entry_tags)
+                response.headers.update(headers)
+                _record_proxy_key(entry_tags)
+                if cache.enabled:
+                    cache.set(key, response.get_data(), entry_tags, headers=headers,
+                              generation=generation)
+            response.headers['X-Cache'] = 'MISS'
+            return response, code
+        return cast(F, decorated_function)
+    return decorator
+
+
 @contextmanager
 def get_db() -> Generator[VideoDatabase, None, None]:
     """
     获取数据库连接 (Get database connection)
-    每个请求创建新连接，解决SQLite线程问题
-    Creates a new connection per request to solve SQLite threading issues
+    从进程级连接池借出连接, 请求结束时归还, 不再为每个请求重复建表
+    Borrows a pooled connection for the request and returns it afterwards
+
+    写入提交后, 数据库把变更的数据标签交给响应缓存失效对应条目。
     """
-    use_mysql: bool = os.environ.get('USE_MYSQL', 'true').lower() == 'true'
-    db: VideoDatabase = VideoDatabase(use_mysql=use_mysql, verbose=False)
+    db: VideoDatabase = VideoDatabase(pool=get_db_pool(), verbose=False,
+                                      on_change=invalidate_caches)
     try:
         yield db
     finally:
@@ -162,7 +426,8 @@ def api_response(
     data: Optional[Any] = None,
     message: str = "success",
     code: int = 200,
-    total: Optional[int] = None
+    total: Optional[int] = None,
+    **extra: Any
 ) -> Tuple[Response, int]:
     """
     统一API响应格式 (Unified API response format)
@@ -172,6 +437,7 @@ def api_response(
         message: Response message
         code: HTTP status code
         total: 数据总量, 用于分页 (Total count for pagination, optional)
+        **extra: 附加的顶层字段, 如 next_cursor (Extra top-level fields)
 
     Returns:
         Tuple of (JSON response, status code)
@@ -183,9 +449,45 @@ def api_response(
     }
     if total is not None:
         response["total"] = total
+    response.update(extra)
     return jsonify(response), code
 
 
+def _next_cursor(videos: List[Dict[str, Any]], limit: int) -> Optional[str]:
+    """
+    下一页游标 (Cursor for the next page)
+
+    本页不足 limit 条时说明已到末尾, 返回 None。
+    """
+    if len(videos) < limit:
+        return None
+    return VideoDatabase.encode_list_cursor(videos[-1])
+
+
+def _list_fields() -> Optional[Tuple[str, ...]]:
+    """
+    解析列表接口的 fields 参数 (Parse the sparse fieldset parameter)
+
+    未提供或为 card 时返回卡片字段 (VideoDatabase.VIDEO_CARD_FIELDS);
+    all 返回 None, 即完整记录; 否则为逗号分隔的列名 (未知列名由数据库层报 400)。
+    """
+    raw: str = request.args.get('fields', '').strip()
+    if raw in ('', 'card'):
+        return VideoDatabase.VIDEO_CARD_FIELDS
+    if raw in ('all', '*'):
+        return None
+    return tuple(dict.fromkeys(field.strip() for field in raw.split(',') if field.strip()))
+
+
+def _project(videos: List[Dict[str, Any]],
+             fields: Optional[Tuple[str, ...]]) -> List[Dict[str, Any]]:
+    """去掉查询时为生成游标额外读取的列, 只返回请求的字段"""
+    if fields is None:
+        return videos
+    keep = set(fields) | {'video_id'}
+    return [{key: value for key, value in video.items() if key in keep} for video in videos]
+
+
 def handle_errors(f: F) -> F:
     """
     错误处理装饰器 (Error handling decorator)
@@ -198,6 +500,9 @@ def handle_errors(f: F) -> F:
         except ValueError as e:
             logger.warning(f"参数错误 (Parameter error): {e}")
             return api_response(message=str(e), code=400)
+        except PoolTimeout as e:
+            logger.warning(f"数据库连接池繁忙 (Connection pool exhausted): {e}")
+            return api_response(message="服务繁忙，请稍后重试", code=503)
         except Exception as e:
             logger.error(f"服务器错误 (Server error): {e}", exc_info=True)
             return api_response(message="服务器内部错误", code=500)
@@ -207,49 +512,6 @@ def handle_errors(f: F) -> F:
 # ==================== API路由 (API Routes) ====================
 
 
-# 用于切分系列名的分隔符: 空格/全角空格/中点/数字/英文字母等
-# (Delimiters used to derive a series base name from a video title:
-#  ASCII/full-width spaces, middle dots, digits and latin letters.)
-_SERIES_SPLIT_RE = re.compile(
-    r'[\s\u3000・·･:：.．,，、\-–—~〜/／|｜0-9０-９a-zA-Zａ-ｚＡ-Ｚ]'
-)
-# 自然排序: 把标题拆成数字块与文字块, 让 "Karte.1" < "Karte.2" < "Karte.5.5"
-_NATURAL_KEY_RE = re.compile(r'(\d+(?:\.\d+)?)')
-
-
-def _series_base(title: Optional[str]) -> str:
-    """
-    从视频标题推导"合集/系列"名 (Derive the collection/series base name).
-
-    取标题开头、遇到第一个分隔符 (空格/中点/数字/英文字母) 之前的部分。例如:
-        "黒獣 1"                       -> "黒獣"
-        "夜勤病棟 Karte.1"             -> "夜勤病棟"
-        "夜勤病棟・参 Experiment.1"    -> "夜勤病棟"
-    若开头即为分隔符 (无法提取有效前缀), 返回去除首尾空白的完整标题,
-    这样该视频只会与自身成为一个"合集" (即没有合集)。
-    """
-    if not title:
-        return ''
-    title = title.strip()
-    match = _SERIES_SPLIT_RE.search(title)
-    base = title[:match.start()] if match else title
-    base = base.strip()
-    return base if base else title
-
-
-def _natural_sort_key(title: str) -> List[Any]:
-    """把标题拆成 [文字, 数字, 文字, ...] 以便按集数自然排序。"""
-    parts = _NATURAL_KEY_RE.split(title or '')
-    key: List[Any] = []
-    for index, part in enumerate(parts):
-        if index % 2 == 1:  # 数字块
-            try:
-                key.append((1, float(part)))
-            except ValueError:
-                key.append((2, part))
-        else:  # 文字块
-            key.append((0, part))
-    return key
 @app.route('/api/health', methods=['GET'])
 def health_check() -> Tuple[Response, int]:
     """健康检查端点 (Health check endpoint)"""
@@ -258,6 +520,7 @@ def health_check() -> Tuple[Response, int]:
 
 @app.route('/api/videos', methods=['GET'])
 @handle_errors
+@cached_response('videos')
 def get_videos() -> Tuple[Response, int]:
     """
     获取视频列表 (Get video list)
@@ -265,15 +528,21 @@ def get_videos() -> Tuple[Response, int]:
     Query参数 (Query parameters):
         limit: 返回数量 (默认20, 最大100) / Return count (default 20, max 100)
         offset: 偏移量 (默认0) / Offset (default 0)
+        cursor: 上一页返回的 next_cursor, 提供时忽略 offset / Keyset cursor
+        fields: 返回字段, 默认 card (卡片所需字段), all 为完整记录, 或逗号分隔的列名 / Sparse fieldset
     """
     limit: int = max(1, min(int(request.args.get('limit', 20)), 100))
     offset: int = max(0, int(request.args.get('offset', 0)))
+    cursor: str = request.args.get('cursor', '').strip()
+    fields: Optional[Tuple[str, ...]] = _list_fields()
 
     with get_db() as db:
-        videos: List[Dict[str, Any]] = db.get_all_videos(limit=limit, offset=offset)
-        total: int = db.count_all_videos()
+        videos: List[Dict[str, Any]] = db.get_all_videos(
+            limit=limit, offset=offset, cursor=cursor or None, fields=fields)
+        total: int = cached_count('count:videos', ['categories'], db.count_all_videos)
 
-    return api_response(data=videos, total=total)
+    return api_response(data=_project(videos, fields), total=total,
+                        next_cursor=_next_cursor(videos, limit))
 
 
 @app.route('/api/videos/search', methods=['GET'])
@@ -286,6 +555,7 @@ def search_videos() -> Tuple[Response, int]:
         keyword: 搜索关键词 (必需) / Search keyword (required)
         limit: 返回数量 (默认20, 最大100) / Return count (default 20, max 100)
         offset: 偏移量 (默认0) / Offset (default 0)
+        fields: 返回字段, 默认 card (卡片所需字段), all 为完整记录, 或逗号分隔的列名 / Sparse fieldset
     """
     keyword: str = request.args.get('keyword', '').strip()
     if not keyword:
@@ -293,14 +563,56 @@ def search_videos() -> Tuple[Response, int]:
 
     limit: int = max(1, min(int(request.args.get('limit', 20)), 100))
     offset: int = max(0, int(request.args.get('offset', 0)))
+    fields: Optional[Tuple[str, ...]] = _list_fields()
 
     with get_db() as db:
-        videos: List[Dict[str, Any]] = db.search_videos(keyword, limit=limit, offset=offset)
-        total: int = db.count_search_videos(keyword)
+        videos: List[Dict[str, Any]] = db.search_videos(
+            keyword, limit=limit, offset=offset, fields=fields)
+        total: int = cached_count(
+            make_cache_key('count:search', [('keyword', keyword)]), ['videos'],
+            lambda: db.count_search_videos(keyword))
 
     return api_response(data=videos, total=total)
 
 
+# 批量获取接口单次请求的最大ID数 (Max ids per batch request)
+BATCH_MAX_IDS: int = 500
+
+
+@app.route('/api/videos/batch', methods=['GET'])
+@handle_errors
+def get_videos_batch() -> Tuple[Response, int]:
+    """
+    按ID批量获取视频 (Get many videos by id in one request)
+
+    用于轮播、合集、"继续观看"/收藏等需要一组指定视频的场景, 代替逐个请求 /api/videos/<id>。
+    data 与 ids 顺序一一对应, 不存在的视频为 null, 其ID同时列在 missing 中。
+
+    Query参数 (Query parameters):
+        ids: 逗号分隔的视频ID (必需, 最多500个) / Comma-separated video ids (required, max 500)
+        fields: 返回字段, 默认 card (卡片所需字段), all 为完整记录, 或逗号分隔的列名 / Sparse fieldset
+    """
+    raw_ids: List[str] = [part.strip() for part in request.args.get('ids', '').split(',') if part.strip()]
+    if not raw_ids:
+        return api_response(message="请提供视频ID (ids)", code=400)
+    if len(raw_ids) > BATCH_MAX_IDS:
+        return api_response(message=f"一次最多请求 {BATCH_MAX_IDS} 个视频", code=400)
+    try:
+        ids: List[int] = [int(part) for part in raw_ids]
+    except ValueError:
+        return api_response(message="视频ID必须为整数", code=400)
+    fields: Optional[Tuple[str, ...]] = _list_fields()
+
+    with get_db() as db:
+        videos: List[Optional[Dict[str, Any]]] = db.get_videos(ids, fields=fields)
+
+    missing: List[int] = [vid for vid, video in zip(ids, videos) if video is None]
+    data: List[Optional[Dict[str, Any]]] = [
+        _project([video], fields)[0] if video is not None else None for video in videos
+    ]
+    return api_response(data=data, missing=missing)
+
+
 @app.route('/api/videos/<int:video_id>', methods=['GET'])
 @handle_errors
 def get_video(video_id: int) -> Tuple[Response, int]:
@@ -316,6 +628,7 @@ def get_video(video_id: int) -> Tuple[Response, int]:
 
 @app.route('/api/videos/category', methods=['GET'])
 @handle_errors
+@cached_response(version_scope=lambda: f"category:{request.args.get('category', '').strip()}")
 def get_videos_by_category() -> Tuple[Response, int]:
     """
     按分类获取视频 (Get videos by category)
@@ -327,28 +640,40 @@ def get_videos_by_category() -> Tuple[Response, int]:
         tag: 单个标签过滤 (可选, 向后兼容) / Single tag filter (optional)
         tags: 多个标签, 逗号分隔 (可选) / Multiple tags, comma-separated (optional)
         broad: 广泛配对开关, 1/true 时任意匹配, 否则全部匹配 / Broad match toggle
+        cursor: 上一页返回的 next_cursor, 提供时忽略 offset / Keyset cursor
+        fields: 返回字段, 默认 card (卡片所需字段), all 为完整记录, 或逗号分隔的列名 / Sparse fieldset
     """
     category: str = request.args.get('category', '').strip()
     if not category:
         return api_response(message="请提供分类名称", code=400)
+    add_cache_tags(f'category:{category}')
 
     limit: int = max(1, min(int(request.args.get('limit', 20)), 100))
     offset: int = max(0, int(request.args.get('offset', 0)))
+    cursor: str = request.args.get('cursor', '').strip()
     tag: str = request.args.get('tag', '').strip()
     # 多标签筛选 (参考 dyb 的标签筛选): tags 以逗号分隔, broad 为广泛配对(任意匹配)
     raw_tags: str = request.args.get('tags', '')
     tags: List[str] = [t.strip() for t in raw_tags.split(',') if t.strip()]
     match_any: bool = str(request.args.get('broad', '')).strip().lower() in (
         '1', 'true', 'yes', 'on')
+    fields: Optional[Tuple[str, ...]] = _list_fields()
 
     with get_db() as db:
         videos: List[Dict[str, Any]] = db.get_videos_by_category(
             category, limit=limit, offset=offset, tag=tag or None,
-            tags=tags or None, match_any=match_any)
-        total: int = db.count_videos_by_category(
-            category, tag=tag or None, tags=tags or None, match_any=match_any)
+            tags=tags or None, match_any=match_any, cursor=cursor or None, fields=fields)
+        total: int = cached_count(
+            make_cache_key('count:category', [
+                ('category', category), ('tag', tag), ('tags', ','.join(sorted(tags))),
+                ('broad', '1' if match_any else ''),
+            ]),
+            [f'category:{category}'],
+            lambda: db.count_videos_by_category(
+                category, tag=tag or None, tags=tags or None, match_any=match_any))
 
-    return api_response(data=videos, total=total)
+    return api_response(data=_project(videos, fields), total=total,
+                        next_cursor=_next_cursor(videos, limit))
 
 
 @app.route('/api/videos/category/tags', methods=['GET'])
@@ -358,17 +683,15 @@ def get_category_tags() -> Tuple[Response, int]:
     获取指定分类下的视频标签 (Get video tags available within a category)
 
     Query参数 (Query parameters):
-        category: 分类名称 (必需) / Category name (required)
+        category: 分类名称, 为空时返回全站标签 / Category name, empty for the whole catalog
         limit: 返回标签数量 (默认60, 最大200) / Tag count (default 60, max 200)
     """
     category: str = request.args.get('category', '').strip()
-    if not category:
-        return api_response(message="请提供分类名称", code=400)
 
     limit: int = max(1, min(int(request.args.get('limit', 60)), 200))
 
     with get_db() as db:
-        tags: List[Dict[str, Any]] = db.get_category_tags(category, limit=limit)
+        tags: List[Dict[str, Any]] = db.get_category_tags(category or None, limit=limit)
 
     return api_response(data=tags)
 
@@ -390,17 +713,62 @@ def get_top_videos() -> Tuple[Response, int]:
     return api_response(data=videos)
 
 
+@app.route('/api/videos/trending', methods=['GET'])
+@handle_errors
+def get_trending_videos() -> Tuple[Response, int]:
+    """
+    获取热度榜 (Get trending videos with time-decayed play counts)
+
+    与 /api/videos/top 的累计播放量不同, 每次播放的贡献随时间指数衰减,
+    新近播放多的视频排在前面。
+
+    Query参数 (Query parameters):
+        window: 时间窗口 24h 或 7d (默认24h) / Time window
+        category: 分类 (可选) / Category filter
+        limit: 返回数量 (默认20) / Return count (default 20)
+    """
+    window: str = request.args.get('window', '24h')
+    category: str = request.args.get('category', '').strip()
+    limit: int = max(1, min(int(request.args.get('limit', 20)), 100))
+
+    with get_db() as db:
+        videos: List[Dict[str, Any]] = db.get_trending_videos(
+            window=window, category=category or None, limit=limit
+        )
+
+    return api_response(data=videos)
+
+
+def _viewer_fingerprint() -> str:
+    """
+    观看者指纹 (Viewer fingerprint): 客户端 IP + User-Agent + Accept-Language
+
+    IP 优先取 nginx 设置的 X-Real-IP。指纹只参与 HyperLogLog 哈希, 不会被保存。
+    """
+    ip: str = request.headers.get('X-Real-IP') or request.remote_addr or ''
+    return '|'.join((
+        ip.strip(),
+        request.headers.get('User-Agent', ''),
+        request.headers.get('Accept-Language', ''),
+    ))
+
+
 @app.route('/api/videos/<int:video_id>/play', methods=['POST'])
 @handle_errors
 def update_play_count(video_id: int) -> Tuple[Response, int]:
-    """增加视频播放次数 (Increment video play count)"""
+    """
+    增加视频播放次数 (Increment video play count)
+
+    增量先在进程内合并, 由 PlayCountAggregator 定时批量写库,
+    因此 play_count / unique_viewers 最多滞后 PLAY_FLUSH_INTERVAL 秒。
+    """
     with get_db() as db:
-        success: bool = db.update_play_count(video_id)
+        exists: bool = db.video_exists(video_id)
 
-    if success:
-        return api_response(message="播放次数已更新")
-    else:
+    if not exists:
         return api_response(message="视频不存在", code=404)
+    get_play_counter().add(video_id, viewer=_viewer_fingerprint())
+    return api_response(message="播放次数已更新")
 
 
 @app.route('/api/videos/random', methods=['GET'])
@@ -409,32 +777,35 @@ def get_random_videos() -> Tuple[Response, int]:
     """
     获取随机视频推荐 (Get random video recommendations)
 
+    在全站 (或分类) 范围内均匀抽样, 不再只从最新的视频中挑选。
+
     Query参数 (Query parameters):
         limit: 返回数量 (默认10, 最大50) / Return count (default 10, max 50)
         category: 可选分类过滤 / Optional category filter
+        seed: 可选随机种子, 相同种子返回相同结果 / Optional seed for reproducible pages
+        offset: 配合 seed 翻页的偏移量 (默认0, 最大1000) / Page offset within the seeded order
     """
     limit: int = max(1, min(int(request.args.get('limit', 10)), 50))
     category: str = request.args.get('category', '').strip()
+    seed: str = request.args.get('seed', '').strip()
+    offset: int = max(0, min(int(request.args.get('offset', 0)), 1000))
 
     with get_db() as db:
-        if category:
-            videos: List[Dict[str, Any]] = db.get_videos_by_category(
-                category, limit=limit * 2, offset=0
-            )
-        else:
-            videos = db.get_all_videos(limit=limit * 2, offset=0)
+        videos: List[Dict[str, Any]] = db.get_random_videos(
+            limit=limit, category=category or None, seed=seed or None, offset=offset
+        )
 
-    # Shuffle and return random subset
-    import random
-    random.shuffle(videos)
-    return api_response(data=videos[:limit])
+    return api_response(data=videos)
 
 
 @app.route('/api/videos/related/<int:video_id>', methods=['GET'])
 @handle_errors
 def get_related_videos(video_id: int) -> Tuple[Response, int]:
     """
-    获取相关视频 (Get related videos based on category)
+    获取相关视频 (Get related videos)
+
+    读取按标签/标题相似度预先计算的近邻 (见 video_database --update-related),
+    不足时用同分类的最新视频补足。
 
     Query参数 (Query parameters):
         limit: 返回数量 (默认6, 最大20) / Return count (default 6, max 20)
@@ -442,21 +813,10 @@ def get_related_videos(video_id: int) -> Tuple[Response, int]:
     limit: int = max(1, min(int(request.args.get('limit', 6)), 20))
 
     with get_db() as db:
-        # Get the current video to find its category
         video: Optional[Dict[str, Any]] = db.get_video(video_id)
         if not video:
             return api_response(message="视频不存在", code=404)
-
-        # Get videos from the same category
-        category = video.get('video_category', '')
-        if category:
-            related: List[Dict[str, Any]] = db.get_videos_by_category(
-                category, limit=limit + 1, offset=0
-            )
-            # Filter out the current video
-            related = [v for v in related if v.get('video_id') != video_id][:limit]
-        else:
-            related = []
+        related: List[Dict[str, Any]] = db.get_related_videos(video, limit=limit)
 
     return api_response(data=related)
 
@@ -467,8 +827,9 @@ def get_video_collection(video_id: int) -> Tuple[Response, int]:
     """
     获取视频所属"合集/系列" (Get the collection/series a video belongs to).
 
-    根据视频标题推导系列名 (见 _series_base), 找出同系列的其它视频,
-    按集数自然排序后返回。返回结果始终包含当前视频本身; 若没有其它同系列
+    系列名 series_key 与集数排序键 episode_key 在写入时由标题推导
+    (见 video_database 的 _series_base / _episode_key), 这里按索引直接读出
+    同系列视频并已按集数排好序。返回结果始终包含当前视频本身; 若没有其它同系列
     视频, 则只返回当前视频 (即前端在"合集"位置只显示正在播放的视频)。
     """
     limit: int = max(1, min(int(request.args.get('limit', 50)), 100))
@@ -478,29 +839,14 @@ def get_video_collection(video_id: int) -> Tuple[Response, int]:
         if not video:
             return api_response(message="视频不存在", code=404)
 
-        base: str = _series_base(video.get('video_title', ''))
-        collection: List[Dict[str, Any]] = [video]
-
-        # 以系列名为关键字搜索候选视频, 再用相同的推导逻辑过滤,
-        # 避免把只是标题中间恰好包含该词的无关视频混进合集。
-        if base:
-            candidates: List[Dict[str, Any]] = db.search_videos(base, limit=limit)
-            seen = {video_id}
-            for candidate in candidates:
-                cid = candidate.get('video_id')
-                if cid in seen:
-                    continue
-                if _series_base(candidate.get('video_title', '')) == base:
-                    collection.append(candidate)
-                    seen.add(cid)
-
-        collection.sort(key=lambda v: _natural_sort_key(v.get('video_title', '')))
+        collection: List[Dict[str, Any]] = db.get_series_videos(video, limit=limit)
 
     return api_response(data=collection)
 
 
 @app.route('/api/categories', methods=['GET'])
 @handle_errors
+@cached_response('categories')
 def get_categories() -> Tuple[Response, int]:
     """获取所有视频分类 (Get all video categories)"""
     with get_db() as db:
@@ -511,6 +857,7 @@ def get_categories() -> Tuple[Response, int]:
 
 @app.route('/api/statistics', methods=['GET'])
 @handle_errors
+@cached_response('videos')
 def get_statistics() -> Tuple[Response, int]:
     """获取数据库统计信息 (Get database statistics)"""
     with get_db() as db:
@@ -553,6 +900,7 @@ DEFAULT_NAV_CATEGORIES: List[Dict[str, Any]] = [
 
 @app.route('/api/nav-categories', methods=['GET'])
 @handle_errors
+@cached_response('nav_categories')
 def get_nav_categories() -> Tuple[Response, int]:
     """
     获取导航分类配置 (Get navigation categories)
@@ -612,6 +960,7 @@ def reset_nav_categories() -> Tuple[Response, int]:
 
 @app.route('/api/carousel', methods=['GET'])
 @handle_errors
+@cached_response('carousel')
 def get_carousel() -> Tuple[Response, int]:
     """
     获取首页轮播图视频 (Get home carousel videos)
@@ -623,6 +972,7 @@ def get_carousel() -> Tuple[Response, int]:
     with get_db() as db:
         videos: List[Dict[str, Any]] = db.get_carousel_videos()
 
+    add_cache_tags(*video_tags(videos))
     return api_response(data=videos)
 
 
@@ -704,6 +1054,53 @@ def save_carousel() -> Tuple[Response, int]:
         return api_response(message="保存失败", code=500)
 
 
+# ==================== 首页聚合API (Home bootstrap API) ====================
+
+# 首页每个子分类默认/最多返回的视频数
+HOME_PER_CATEGORY_DEFAULT: int = 7
+HOME_PER_CATEGORY_MAX: int = 20
+
+
+@app.route('/api/home', methods=['GET'])
+@handle_errors
+@cached_response('nav_categories', 'carousel', 'categories')
+def get_home() -> Tuple[Response, int]:
+    """
+    首页聚合数据 (Home page bootstrap)
+
+    一次返回导航分类、轮播图、分类列表和所有导航子分类的第一页视频 (卡片字段),
+    代替首页逐个子分类请求 /api/videos/category。整个响应进入响应缓存,
+    依赖的分类、轮播视频或导航配置有写入时失效。
+
+    Query params:
+        per_category: 每个子分类的视频数 (默认 7, 最大 20)
+    """
+    per_category: int = max(1, min(
+        int(request.args.get('per_category', HOME_PER_CATEGORY_DEFAULT)),
+        HOME_PER_CATEGORY_MAX
+    ))
+    fields = VideoDatabase.VIDEO_CARD_FIELDS
+
+    with get_db() as db:
+        nav_categories: List[Dict[str, Any]] = db.get_nav_categories() or DEFAULT_NAV_CATEGORIES
+        subcategories: List[str] = [
+            sub for nav in nav_categories for sub in (nav.get('subcategories') or [])
+        ]
+        heads = db.get_category_heads(subcategories, per_category, fields=fields)
+        carousel: List[Dict[str, Any]] = db.get_carousel_videos()
+        categories: List[Dict[str, Any]] = db.get_categories()
+
+    add_cache_tags(*(f'category:{category}' for category in heads), *video_tags(carousel))
+    return api_response(data={
+        'nav_categories': nav_categories,
+        'carousel': carousel,
+        'categories': categories,
+        'category_videos': {
+            category: _project(videos, fields) for category, videos in heads.items()
+        },
+    })
+
+
 # ==================== 图片上传API (Image Upload API) ====================
 
 @app.route('/api/admin/upload-image', methods=['POST'])
@@ -764,6 +1161,28 @@ def serve_upload(filename: str) -> Response:
     return send_from_directory(upload_dir, filename)
 
 
+# ==================== 运行指标API (Runtime Metrics API) ====================
+
+@app.route('/api/admin/metrics', methods=['GET'])
+@handle_errors
+def get_runtime_metrics() -> Tuple[Response, int]:
+    """
+    获取当前 worker 进程的运行指标 (Get runtime metrics of this worker process)
+
+    db_pool: 连接池容量、占用以及累计借出(checkouts)/等待(waits)/超时(timeouts)次数
+    play_counter: 待写入的播放增量、批量写入次数与耗时
+    response_cache: 响应缓存占用与命中/未命中/淘汰/过期/失效次数
+    proxy_cache: nginx 缓存键登记与清除次数 (未配置 PROXY_CACHE_DIR 时为 null)
+    """
+    return api_response(data={
+        'pid': os.getpid(),
+        'db_pool': get_db_pool().stats(),
+        'play_counter': get_play_counter().stats(),
+        'response_cache': get_response_cache().stats(),
+        'proxy_cache': _proxy_purger.stats() if _proxy_purger is not None else None,
+    })
+
+
 # ==================== 视频管理API (Video Management API) ====================
 
 @app.route('/api/admin/category-stats', methods=['GET'])
@@ -790,6 +1209,7 @@ def get_category_videos_admin() -> Tuple[Response, int]:
         category: 分类名称 (必需)
         limit: 返回数量 (默认50, 最大200)
         offset: 偏移量 (默认0)
+        cursor: 上一页返回的 next_cursor, 提供时忽略 offset
     """
     category: str = request.args.get('category', '').strip()
     if not category:
@@ -797,12 +1217,15 @@ def get_category_videos_admin() -> Tuple[Response, int]:
 
     limit: int = max(1, min(int(request.args.get('limit', 50)), 200))
     offset: int = max(0, int(request.args.get('offset', 0)))
+    cursor: str = request.args.get('cursor', '').strip()
 
     with get_db() as db:
-        videos: List[Dict[str, Any]] = db.get_videos_by_category(category, limit=limit, offset=offset)
+        videos: List[Dict[str, Any]] = db.get_videos_by_category(
+            category, limit=limit, offset=offset, cursor=cursor or None)
         total: int = db.count_videos_by_category(category)
 
-    return api_response(data=videos, total=total)
+    return api_response(data=videos, total=total,
+                        next_cursor=_next_cursor(videos, limit))
 
 
 @app.route('/api/admin/duplicates', methods=['GET'])
@@ -1061,6 +1484,8 @@ def collect_videos() -> Tuple[Response, int]:
                     break
                 
                 pages_processed += 1
+                page_batch: List[Dict[str, Any]] = []
+                page_ids = set()
 
                 for video in source_videos:
                     # 验证视频有效性
@@ -1073,16 +1498,17 @@ def collect_videos() -> Tuple[Response, int]:
                         skipped_count += 1
                         continue
 
-                    # 检查重复
-                    if skip_duplicates and db.get_video(vod_id):
+                    # 检查重复 (包括同一页内重复出现的视频)
+                    if skip_duplicates and (vod_id in page_ids or db.get_video(vod_id)):
                         duplicate_count += 1
                         continue
+                    page_ids.add(vod_id)
 
                     # 处理播放URL
                     vod_play_url = process_play_url(video.get('vod_play_url', ''))
 
-                    # 映射字段并插入数据库
-                    db_video = {
+                    # 映射字段, 整页收集后批量写入
+                    page_batch.append({
                         'video_id': vod_id,
                         'video_url': vod_play_url,
                         'video_image': video.get('vod_pic', ''),
@@ -1092,13 +1518,18 @@ def collect_videos() -> Tuple[Response, int]:
                         'upload_time': video.get('vod_time', ''),
                         'video_duration': video.get('vod_duration', video.get('vod_remarks', '')),
                         'video_coins': 0
-                    }
+                    })
 
-                    if db.insert_video(db_video):
+                # 每页只用一个事务批量写入, 单条失败不影响其余记录
+                outcome = db.upsert_videos(page_batch)
+                skipped_count += len(outcome['failed'])
+                failed_indexes = {failure['index'] for failure in outcome['failed']}
+                for index, db_video in enumerate(page_batch):
+                    if index not in failed_indexes:
                         collected_videos.append({
-                            'video_id': vod_id,
-                            'video_title': video.get('vod_name', ''),
-                            'video_category': video.get('type_name', '')
+                            'video_id': db_video['video_id'],
+                            'video_title': db_video['video_title'],
+                            'video_category': db_video['video_category']
                         })
 
         result = {
@@ -1225,12 +1656,13 @@ def _save_hanime_item(
     category: str,
     skip_duplicates: bool,
     stats: Dict[str, int],
-    collected_videos: List[Dict[str, Any]],
+    pending: List[Tuple[Dict[str, Any], Dict[str, Any]]],
 ) -> None:
-    """处理并保存单个 hanime 采集条目, 就地累加统计数据。
+    """处理单个 hanime 采集条目, 就地累加统计数据。
 
     去重以「名称(标题)」为准: 若已存在同名视频, 只替换图片/视频链接,
-    不新增重复的视频数据; 否则按 video_id 兜底判重后新增。
+    不新增重复的视频数据; 否则按 video_id 兜底判重。需要新增/覆盖的记录
+    放入 pending, 由 _flush_hanime_items 在整页处理完后批量写入。
     """
     video_id = item.get('video_id')
     # 没有可播放地址的条目视为无效, 跳过
@@ -1243,6 +1675,13 @@ def _save_hanime_item(
     record['video_category'] = category
 
     title = (record.get('video_title') or '').strip()
+    # 同一页内已待写入的同名视频也视为重复
+    if skip_duplicates and title and any(
+        (queued.get('video_title') or '').strip() == title for queued, _ in pending
+    ):
+        stats['duplicate'] += 1
+        return
+
     existing = db.get_video_by_title(title) if title else None
     if existing is None:
         existing = db.get_video(video_id)
@@ -1258,13 +1697,29 @@ def _save_hanime_item(
                 stats['updated'] += 1
             stats['duplicate'] += 1
             return
-        # 未开启去重时, 按主键覆盖(可能重置采集时间)
-        if db.insert_video(record):
-            collected_videos.append(_hanime_preview(item))
+        # 未开启去重时, 按主键 upsert 覆盖采集到的字段 (保留采集时间)
+        pending.append((record, _hanime_preview(item)))
         return
 
-    if db.insert_video(record):
-        collected_videos.append(_hanime_preview(item))
+    pending.append((record, _hanime_preview(item)))
+
+
+def _flush_hanime_items(
+    db: VideoDatabase,
+    pending: List[Tuple[Dict[str, Any], Dict[str, Any]]],
+    stats: Dict[str, int],
+    collected_videos: List[Dict[str, Any]],
+) -> None:
+    """把一页中待新增的 hanime 记录用一个事务批量写入, 失败的记录计入 skipped。"""
+    if not pending:
+        return
+    outcome = db.upsert_videos([record for record, _ in pending])
+    failed_indexes = {failure['index'] for failure in outcome['failed']}
+    stats['skipped'] += len(failed_indexes)
+    for index, (_, preview) in enumerate(pending):
+        if index not in failed_indexes:
+            collected_videos.append(preview)
+    pending.clear()
 
 
 @app.route('/api/admin/collect-hanime', methods=['POST'])
@@ -1309,11 +1764,13 @@ def collect_hanime() -> Tuple[Response, int]:
         ):
             total_items += len(page_items)
             with get_db() as db:
+                pending: List[Tuple[Dict[str, Any], Dict[str, Any]]] = []
                 for item in page_items:
                     _save_hanime_item(
                         db, item, genre, category,
-                        skip_duplicates, stats, collected_videos,
+                        skip_duplicates, stats, pending,
                     )
+                _flush_hanime_items(db, pending, stats, collected_videos)
             pages_processed = page
 
         updated_count = stats['updated']
@@ -1398,11 +1855,13 @@ def collect_hanime_stream() -> Response:
             ):
                 total_items += len(page_items)
                 with get_db() as db:
+                    pending: List[Tuple[Dict[str, Any], Dict[str, Any]]] = []
                     for item in page_items:
                         _save_hanime_item(
                             db, item, genre, category,
-                            skip_duplicates, stats, collected_videos,
+                            skip_duplicates, stats, pending,
                         )
+                    _flush_hanime_items(db, pending, stats, collected_videos)
                 pages_processed = page
 
                 remaining = (
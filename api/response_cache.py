@@ -0,0 +1,897 @@
+#!/usr/bin/env python3
+"""
+响应缓存 (Response cache)
+=========================
+
+以规范化的路由和查询参数为键缓存接口的响应体 (JSON 字节) 及其校验头。
+每个条目带一组标签 (如 category:<分类>、video:<ID>、nav_categories), 数据库提交写入后
+按标签失效, 只清除受影响的条目; 未被写入触及的条目保留到 TTL 过期或被淘汰。
+
+三种后端实现同一接口 (CacheBackend), 由 create_cache 按名称选择:
+
+- memory: 进程内 LRU, 总字节数受 max_bytes 限制。多进程 (gunicorn 多 worker) 下通过
+  SharedVersions 保持一致: 标签散列到一个 mmap 共享文件中的版本槽, 任一进程失效标签时
+  递增对应槽; 条目记录写入时各标签槽的值, 读取时发现槽值变化即视为已失效。
+- file: 本机共享目录, 每个条目一个文件, 同机所有 worker (以及挂载同一目录的容器) 共享
+  缓存内容, 失效同样通过目录中的 SharedVersions。
+- redis: 通过 Redis 协议 (RESP) 访问外部缓存服务, 多台 API 节点共享缓存内容;
+  标签版本存放在服务端, 条目记录写入时的标签版本, 读取时比对。
+
+前置 nginx 的 proxy_cache 不经过上述后端: ProxyCachePurger 记录每个 nginx 缓存键依赖的标签,
+失效时直接删除共享卷中对应的 nginx 缓存文件。
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import mmap
+import os
+import socket
+import struct
+import threading
+import time
+import zlib
+from collections import OrderedDict
+from typing import Any, Dict, Iterable, List, NamedTuple, Optional, Sequence, Set, Tuple
+from urllib.parse import unquote, urlencode, urlsplit
+
+try:
+    import fcntl
+except ImportError:  # Windows: 没有 flock, 递增不加跨进程锁
+    fcntl = None  # type: ignore
+
+
+class CacheEntry(NamedTuple):
+    """缓存条目 (Cached response body and headers)"""
+    body: bytes
+    headers: Tuple[Tuple[str, str], ...]
+    expires: float
+    tags: Tuple[str, ...]
+    # 写入时各标签版本槽的下标与取值 (memory/file 后端使用 SharedVersions 时)
+    slots: Tuple[int, ...] = ()
+    versions: Tuple[int, ...] = ()
+
+
+def make_cache_key(path: str, args: Iterable[Tuple[str, str]]) -> str:
+    """
+    规范化缓存键: 路径 + 按参数名/值排序后的查询串
+
+    参数顺序不同的同一请求 (?a=1&b=2 与 ?b=2&a=1) 得到相同的键; 空值参数被忽略。
+    """
+    items = sorted((name, value.strip()) for name, value in args if value.strip())
+    return f'{path}?{urlencode(items)}' if items else path
+
+
+def video_tags(videos: Iterable[Optional[Dict[str, Any]]]) -> List[str]:
+    """响应中每个视频的实体标签 video:<ID>"""
+    return [f"video:{video['video_id']}" for video in videos
+            if video and video.get('video_id') is not None]
+
+
+def _key_digest(key: str) -> str:
+    """缓存键的定长摘要 (用作文件名 / Redis 键)"""
+    return hashlib.blake2b(key.encode('utf-8'), digest_size=16).hexdigest()
+
+
+def _pack_entry(meta: Dict[str, Any], body: bytes) -> bytes:
+    """序列化条目: 一行 JSON 元数据 + 换行 + 响应体"""
+    return json.dumps(meta, separators=(',', ':'), ensure_ascii=False).encode('utf-8') + b'\n' + body
+
+
+def _unpack_entry(data: bytes) -> Tuple[Dict[str, Any], bytes]:
+    """反序列化条目, 格式不对时抛出 ValueError"""
+    meta, sep, body = data.partition(b'\n')
+    if not sep:
+        raise ValueError('invalid cache entry')
+    return json.loads(meta), body
+
+
+class SharedVersions:
+    """
+    跨进程共享的标签版本槽 (Tag version slots in a shared mmap file)
+
+    文件由 slots 个 8 字节无符号计数组成: 0 号槽为全局 epoch, 每次 bump 都递增;
+    标签按 crc32 散列到其余槽。散列冲突只会导致多失效一些条目, 不会漏失效。
+    bump 先递增 epoch 再递增标签槽, 并用 flock 串行化各进程的递增;
+    读取不加锁, 读到半写的值也只会表现为"已变化"。
+    """
+
+    _SLOT = struct.Struct('<Q')
+
+    def __init__(self, path: str, slots: int = 4096):
+        self.path = path
+        self.slots = slots
+        size = slots * self._SLOT.size
+        self._fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o644)
+        if os.fstat(self._fd).st_size < size:
+            os.ftruncate(self._fd, size)
+        self._mmap = mmap.mmap(self._fd, size)
+        self._lock = threading.Lock()
+
+    def slot(self, tag: str) -> int:
+        """标签对应的槽下标 (1 .. slots-1)"""
+        return 1 + zlib.crc32(tag.encode('utf-8')) % (self.slots - 1)
+
+    def _read(self, slot: int) -> int:
+        return self._SLOT.unpack_from(self._mmap, slot * self._SLOT.size)[0]
+
+    def epoch(self) -> int:
+        """全局 epoch (任一进程每次 bump 都会改变)"""
+        return self._read(0)
+
+    def read(self, slots: Iterable[int]) -> Tuple[int, ...]:
+        """读取一组槽的当前值"""
+        return tuple(self._read(slot) for slot in slots)
+
+    def bump(self, tags: Iterable[str]) -> None:
+        """递增 epoch 与这些标签的槽"""
+        slots = [0] + sorted({self.slot(tag) for tag in tags})
+        with self._lock:
+            if fcntl is not None:
+                fcntl.flock(self._fd, fcntl.LOCK_EX)
+            try:
+                for slot in slots:
+                    offset = slot * self._SLOT.size
+                    value = (self._SLOT.unpack_from(self._mmap, offset)[0] + 1) & 0xFFFFFFFFFFFFFFFF
+                    self._SLOT.pack_into(self._mmap, offset, value)
+            finally:
+                if fcntl is not None:
+                    fcntl.flock(self._fd, fcntl.LOCK_UN)
+
+
+class CacheBackend:
+    """
+    响应缓存后端接口 (Cache backend interface)
+
+    get/set 以 make_cache_key 生成的键存取响应体和响应头, invalidate 按标签失效。
+    失效计数 generation() 防止并发写入时缓存旧结果: 计算响应前记下 generation(),
+    写入缓存时若期间发生过失效 (包括其它进程/节点的失效), 则丢弃这次结果。
+    后端读写出错只计入 errors 并按未命中处理, 不影响请求本身。
+    """
+
+    name = 'base'
+
+    def __init__(self, max_bytes: int, ttl: float):
+        """
+        Args:
+            max_bytes: 缓存的最大总字节数 (redis 后端只限制单个条目, 总量由服务端 maxmemory 控制)
+            ttl: 条目默认存活秒数, <= 0 表示不缓存
+        """
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self._counters: Dict[str, int] = dict.fromkeys(
+            ('hits', 'misses', 'stale', 'sets', 'invalidations', 'errors'), 0)
+        self._counters_lock = threading.Lock()
+
+    @property
+    def enabled(self) -> bool:
+        return self.ttl > 0 and self.max_bytes > 0
+
+    def _incr(self, counter: str, amount: int = 1) -> None:
+        with self._counters_lock:
+            self._counters[counter] = self._counters.get(counter, 0) + amount
+
+    def generation(self) -> int:
+        """当前失效计数"""
+        raise NotImplementedError
+
+    def get(self, key: str) -> Optional[CacheEntry]:
+        """读取未过期且标签未失效的条目"""
+        raise NotImplementedError
+
+    def set(self, key: str, body: bytes, tags: Iterable[str],
+            headers: Optional[Dict[str, str]] = None,
+            ttl: Optional[float] = None, generation: Optional[int] = None) -> bool:
+        """
+        写入响应体
+
+        Args:
+            key: make_cache_key 生成的键
+            body: 响应体
+            tags: 条目依赖的数据标签
+            headers: 命中时随响应体返回的响应头 (如 ETag)
+            ttl: 存活秒数, 默认使用构造时的 ttl
+            generation: 开始计算响应时的 generation(), 之后发生过失效时不写入
+
+        Returns:
+            是否写入
+        """
+        raise NotImplementedError
+
+    def invalidate(self, tags: Iterable[str]) -> None:
+        """使带有任一标签的条目失效"""
+        raise NotImplementedError
+
+    def clear(self) -> None:
+        """清空缓存"""
+        raise NotImplementedError
+
+    def stats(self) -> Dict[str, Any]:
+        """命中/未命中/失效/错误次数等运行指标"""
+        with self._counters_lock:
+            counters = dict(self._counters)
+        lookups = counters['hits'] + counters['misses']
+        counters.update({
+            'backend': self.name,
+            'ttl': self.ttl,
+            'max_bytes': self.max_bytes,
+            'hit_rate': round(counters['hits'] / lookups, 4) if lookups else 0.0,
+        })
+        return counters
+
+
+class MemoryCache(CacheBackend):
+    """
+    进程内 LRU + TTL 缓存 (线程安全)
+
+    总字节数 (键 + 响应体 + 响应头) 超过 max_bytes 时从最久未使用的条目开始淘汰。
+    提供 shared 时其它进程的失效对本进程立即生效; 否则只能依赖 TTL。
+    """
+
+    name = 'memory'
+
+    def __init__(self, max_bytes: int, ttl: float,
+                 shared: Optional[SharedVersions] = None):
+        super().__init__(max_bytes, ttl)
+        self.shared = shared
+        self._entries: 'OrderedDict[str, CacheEntry]' = OrderedDict()
+        self._tag_keys: Dict[str, Set[str]] = {}
+        self._bytes = 0
+        self._generation = 0
+        self._lock = threading.Lock()
+        self._evictions = 0
+        self._expirations = 0
+
+    def generation(self) -> int:
+        """每次 invalidate/clear 加一; 启用 shared 时为跨进程的全局 epoch"""
+        if self.shared is not None:
+            return self.shared.epoch()
+        return self._generation
+
+    def get(self, key: str) -> Optional[CacheEntry]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self._incr('misses')
+                return None
+            if entry.expires <= time.time():
+                self._remove(key)
+                self._expirations += 1
+                self._incr('misses')
+                return None
+            if self.shared is not None and self.shared.read(entry.slots) != entry.versions:
+                # 其它进程失效了该条目的某个标签
+                self._remove(key)
+                self._incr('stale')
+                self._incr('misses')
+                return None
+            self._entries.move_to_end(key)
+            self._incr('hits')
+            return entry
+
+    def set(self, key: str, body: bytes, tags: Iterable[str],
+            headers: Optional[Dict[str, str]] = None,
+            ttl: Optional[float] = None, generation: Optional[int] = None) -> bool:
+        ttl = self.ttl if ttl is None else ttl
+        header_items = tuple((headers or {}).items())
+        size = self._entry_size(key, body, header_items)
+        if ttl <= 0 or size > self.max_bytes:
+            return False
+        tags = tuple(dict.fromkeys(tags))
+        slots: Tuple[int, ...] = ()
+        versions: Tuple[int, ...] = ()
+        if self.shared is not None:
+            # 先读槽值再核对 epoch: bump 先递增 epoch, 核对通过说明读到的槽值早于任何新的失效
+            slots = tuple(self.shared.slot(tag) for tag in tags)
+            versions = self.shared.read(slots)
+        with self._lock:
+            if generation is not None and generation != self.generation():
+                return False
+            if key in self._entries:
+                self._remove(key)
+            entry = CacheEntry(body, header_items, time.time() + ttl, tags, slots, versions)
+            self._entries[key] = entry
+            self._bytes += size
+            for tag in entry.tags:
+                self._tag_keys.setdefault(tag, set()).add(key)
+            while self._bytes > self.max_bytes:
+                self._remove(next(iter(self._entries)))
+                self._evictions += 1
+        self._incr('sets')
+        return True
+
+    def invalidate(self, tags: Iterable[str]) -> None:
+        """删除本进程中带有任一标签的条目, 并通知其它进程"""
+        tags = list(tags)
+        if self.shared is not None:
+            self.shared.bump(tags)
+        with self._lock:
+            self._generation += 1
+            keys: Set[str] = set()
+            for tag in tags:
+                keys |= self._tag_keys.get(tag, set())
+            for key in keys:
+                self._remove(key)
+        self._incr('invalidations', len(tags))
+
+    def clear(self) -> None:
+        """清空本进程的缓存"""
+        if self.shared is not None:
+            self.shared.bump(())
+        with self._lock:
+            self._generation += 1
+            self._entries.clear()
+            self._tag_keys.clear()
+            self._bytes = 0
+
+    @staticmethod
+    def _entry_size(key: str, body: bytes, headers: Tuple[Tuple[str, str], ...]) -> int:
+        """条目占用的字节数 (键 + 响应体 + 响应头)"""
+        return len(key) + len(body) + sum(len(name) + len(value) for name, value in headers)
+
+    def _remove(self, key: str) -> None:
+        """删除条目并维护标签索引与字节数 (调用方持有锁)"""
+        entry = self._entries.pop(key)
+        self._bytes -= self._entry_size(key, entry.body, entry.headers)
+        for tag in entry.tags:
+            keys = self._tag_keys.get(tag)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._tag_keys[tag]
+
+    def stats(self) -> Dict[str, Any]:
+        stats = super().stats()
+        with self._lock:
+            stats.update({
+                'entries': len(self._entries),
+                'bytes': self._bytes,
+                'evictions': self._evictions,
+                'expirations': self._expirations,
+                'tags': len(self._tag_keys),
+                'shared_file': self.shared.path if self.shared is not None else None,
+            })
+        return stats
+
+
+class FileCache(CacheBackend):
+    """
+    本机共享目录缓存 (Shared-directory cache)
+
+    每个条目一个文件 (元数据行 + 响应体), 先写临时文件再原子替换; 同机所有进程读写同一目录,
+    标签失效通过目录中的 SharedVersions 文件。命中时更新文件 mtime, 本进程累计写入超过
+    max_bytes/8 时扫描目录, 按 mtime 从旧到新删除, 直到总大小不超过 max_bytes。
+    已失效的条目在下次读取或淘汰时删除。
+    """
+
+    name = 'file'
+
+    def __init__(self, directory: str, max_bytes: int, ttl: float):
+        super().__init__(max_bytes, ttl)
+        os.makedirs(directory, exist_ok=True)
+        self.directory = directory
+        self.shared = SharedVersions(os.path.join(directory, 'versions'))
+        self._written = 0
+        self._evictions = 0
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, _key_digest(key) + '.entry')
+
+    def generation(self) -> int:
+        return self.shared.epoch()
+
+    def _discard(self, path: str) -> None:
+        try:
+            os.unlink(path)
+        except OSError:
+            pass
+
+    def get(self, key: str) -> Optional[CacheEntry]:
+        path = self._path(key)
+        try:
+            with open(path, 'rb') as f:
+                meta, body = _unpack_entry(f.read())
+        except FileNotFoundError:
+            self._incr('misses')
+            return None
+        except (OSError, ValueError):
+            self._incr('errors')
+            self._incr('misses')
+            return None
+        if meta.get('k') != key:
+            self._incr('misses')
+            return None
+        if meta['e'] <= time.time():
+            self._discard(path)
+            self._incr('misses')
+            return None
+        if self.shared.read(meta['s']) != tuple(meta['v']):
+            self._discard(path)
+            self._incr('stale')
+            self._incr('misses')
+            return None
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+        self._incr('hits')
+        return CacheEntry(body, tuple((name, value) for name, value in meta['h']), meta['e'],
+                          tuple(meta['t']), tuple(meta['s']), tuple(meta['v']))
+
+    def set(self, key: str, body: bytes, tags: Iterable[str],
+            headers: Optional[Dict[str, str]] = None,
+            ttl: Optional[float] = None, generation: Optional[int] = None) -> bool:
+        ttl = self.ttl if ttl is None else ttl
+        if ttl <= 0:
+            return False
+        tags = list(dict.fromkeys(tags))
+        slots = [self.shared.slot(tag) for tag in tags]
+        versions = self.shared.read(slots)
+        if generation is not None and generation != self.generation():
+            return False
+        data = _pack_entry({
+            'k': key, 'e': time.time() + ttl, 'h': list((headers or {}).items()),
+            't': tags, 's': slots, 'v': list(versions),
+        }, body)
+        if len(data) > self.max_bytes:
+            return False
+        path = self._path(key)
+        tmp_path = f'{path}.{os.getpid()}.{threading.get_ident()}.tmp'
+        try:
+            with open(tmp_path, 'wb') as f:
+                f.write(data)
+            os.replace(tmp_path, path)
+        except OSError:
+            self._incr('errors')
+            self._discard(tmp_path)
+            return False
+        self._incr('sets')
+        self._written += len(data)
+        if self._written > self.max_bytes // 8:
+            self._written = 0
+            self._evict()
+        return True
+
+    def _evict(self) -> None:
+        """按 mtime 从旧到新删除条目文件, 使目录总大小不超过 max_bytes"""
+        files: List[Tuple[float, int, str]] = []
+        try:
+            with os.scandir(self.directory) as it:
+                for item in it:
+                    if item.name.endswith('.entry'):
+                        try:
+                            stat = item.stat()
+                        except OSError:
+                            continue
+                        files.append((stat.st_mtime, stat.st_size, item.path))
+        except OSError:
+            self._incr('errors')
+            return
+        total = sum(size for _, size, _ in files)
+        files.sort()
+        for _, size, path in files:
+            if total <= self.max_bytes:
+                break
+            self._discard(path)
+            total -= size
+            self._evictions += 1
+
+    def invalidate(self, tags: Iterable[str]) -> None:
+        tags = list(tags)
+        self.shared.bump(tags)
+        self._incr('invalidations', len(tags))
+
+    def clear(self) -> None:
+        self.shared.bump(())
+        try:
+            with os.scandir(self.directory) as it:
+                for item in it:
+                    if item.name.endswith('.entry'):
+                        self._discard(item.path)
+        except OSError:
+            self._incr('errors')
+
+    def stats(self) -> Dict[str, Any]:
+        stats = super().stats()
+        stats.update({'directory': self.directory, 'evictions': self._evictions})
+        return stats
+
+
+class RespError(Exception):
+    """Redis 协议错误应答 (Error reply from a RESP server)"""
+
+
+class RespClient:
+    """
+    最小的 Redis 协议 (RESP2) 客户端 (Minimal Redis-protocol client)
+
+    只实现缓存所需的命令收发与流水线, 兼容任何实现 RESP 的服务 (Redis、KeyDB、Valkey 等)。
+    每个线程一条连接, 连接出错时关闭, 下次调用重新连接。
+    连接失败后 retry_interval 秒内直接报错, 服务不可用时请求不必每次等待连接超时。
+
+    Args:
+        url: redis://[:password@]host[:port][/db]
+        timeout: 连接与读写超时秒数
+        retry_interval: 连接失败后暂停访问的秒数
+    """
+
+    def __init__(self, url: str, timeout: float = 0.5, retry_interval: float = 5.0):
+        parts = urlsplit(url)
+        if parts.scheme != 'redis':
+            raise ValueError(f"不支持的缓存地址 (Unsupported cache URL): {url}")
+        self.host = parts.hostname or 'localhost'
+        self.port = parts.port or 6379
+        self.password = unquote(parts.password) if parts.password else None
+        self.db = int(parts.path.lstrip('/') or 0)
+        self.timeout = timeout
+        self.retry_interval = retry_interval
+        self._down_until = 0.0
+        self._local = threading.local()
+
+    @property
+    def address(self) -> str:
+        return f'{self.host}:{self.port}/{self.db}'
+
+    @staticmethod
+    def _encode(args: Sequence[Any]) -> bytes:
+        parts = [b'*%d\r\n' % len(args)]
+        for arg in args:
+            if isinstance(arg, bytes):
+                data = arg
+            else:
+                data = str(arg).encode('utf-8')
+            parts.append(b'$%d\r\n%s\r\n' % (len(data), data))
+        return b''.join(parts)
+
+    def _read_reply(self, reader: Any) -> Any:
+        line = reader.readline()
+        if not line.endswith(b'\r\n'):
+            raise ConnectionError('缓存服务连接已断开 (Connection closed)')
+        prefix, rest = line[:1], line[1:-2]
+        if prefix == b'+':
+            return rest.decode('utf-8')
+        if prefix == b'-':
+            return RespError(rest.decode('utf-8', 'replace'))
+        if prefix == b':':
+            return int(rest)
+        if prefix == b'$':
+            length = int(rest)
+            if length < 0:
+                return None
+            data = reader.read(length + 2)
+            if len(data) != length + 2:
+                raise ConnectionError('缓存服务连接已断开 (Connection closed)')
+            return data[:-2]
+        if prefix == b'*':
+            count = int(rest)
+            if count < 0:
+                return None
+            return [self._read_reply(reader) for _ in range(count)]
+        raise ConnectionError(f'无法解析的应答 (Unexpected reply): {line[:50]!r}')
+
+    def _connect(self) -> Tuple[socket.socket, Any]:
+        sock = socket.create_connection((self.host, self.port), timeout=self.timeout)
+        sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        conn = (sock, sock.makefile('rb'))
+        setup: List[Tuple[Any, ...]] = []
+        if self.password:
+            setup.append(('AUTH', self.password))
+        if self.db:
+            setup.append(('SELECT', self.db))
+        if setup:
+            self._send(conn, setup)
+        return conn
+
+    def _send(self, conn: Tuple[socket.socket, Any], commands: Sequence[Sequence[Any]]) -> List[Any]:
+        sock, reader = conn
+        sock.sendall(b''.join(self._encode(command) for command in commands))
+        replies = [self._read_reply(reader) for _ in commands]
+        for reply in replies:
+            if isinstance(reply, RespError):
+                raise reply
+        return replies
+
+    def close(self) -> None:
+        """关闭当前线程的连接"""
+        conn = getattr(self._local, 'conn', None)
+        self._local.conn = None
+        if conn is not None:
+            try:
+                conn[1].close()
+                conn[0].close()
+            except OSError:
+                pass
+
+    def pipeline(self, *commands: Sequence[Any]) -> List[Any]:
+        """一次发送多条命令并按顺序返回应答, 任一命令出错时抛出 RespError"""
+        conn = getattr(self._local, 'conn', None)
+        if conn is None and time.time() < self._down_until:
+            raise ConnectionError(f'缓存服务暂不可用 (Cache server unavailable): {self.address}')
+        try:
+            if conn is None:
+                conn = self._local.conn = self._connect()
+            return self._send(conn, commands)
+        except OSError:
+            self.close()
+            self._down_until = time.time() + self.retry_interval
+            raise
+
+    def execute(self, *args: Any) -> Any:
+        """执行一条命令"""
+        return self.pipeline(args)[0]
+
+
+class RedisCache(CacheBackend):
+    """
+    Redis 协议共享缓存 (Cache shared by all API nodes through a RESP server)
+
+    条目以 <prefix>r:<键摘要> 存放 (PX 过期), 标签版本为 <prefix>t:<标签> 计数,
+    全局 epoch 为 <prefix>epoch。失效只递增计数, 条目在读取时比对写入时记录的标签版本;
+    标签计数 7 天未变化后过期 (远大于条目 TTL, 过期重置不会让旧条目重新生效)。
+    服务不可用时所有操作按未命中处理并计入 errors。
+
+    失效发生在数据库提交之后, 不能失败: 递增失败的标签留在待补发集合中 (stats 的 pending),
+    服务恢复后的第一次操作先补发, 其它节点随即看到版本变化; 补发前本节点不返回依赖这些
+    标签的条目。进程在补发前退出时, 其它节点上的旧条目最多保留到 TTL 过期。
+    """
+
+    name = 'redis'
+    _TAG_VERSION_TTL = 7 * 24 * 3600
+
+    def __init__(self, client: RespClient, max_bytes: int, ttl: float,
+                 prefix: str = 'video-api:'):
+        super().__init__(max_bytes, ttl)
+        self.client = client
+        self.prefix = prefix
+        self._epoch_key = prefix + 'epoch'
+        self._pending: Set[str] = set()
+        self._pending_lock = threading.Lock()
+
+    def _entry_key(self, key: str) -> str:
+        return f'{self.prefix}r:{_key_digest(key)}'
+
+    def _tag_key(self, tag: str) -> str:
+        return f'{self.prefix}t:{tag}'
+
+    def generation(self) -> int:
+        try:
+            return int(self.client.execute('GET', self._epoch_key) or 0)
+        except (OSError, RespError, ValueError):
+            self._incr('errors')
+            return -1
+
+    def _flush_pending(self) -> Set[str]:
+        """补发之前失败的标签递增, 返回仍未补发的标签"""
+        with self._pending_lock:
+            if not self._pending:
+                return set()
+            tags, self._pending = self._pending, set()
+        commands: List[Tuple[Any, ...]] = [('INCR', self._epoch_key)]
+        for tag in sorted(tags):
+            commands.append(('INCR', self._tag_key(tag)))
+            commands.append(('EXPIRE', self._tag_key(tag), self._TAG_VERSION_TTL))
+        try:
+            self.client.pipeline(*commands)
+            return set()
+        except (OSError, RespError):
+            self._incr('errors')
+            with self._pending_lock:
+                self._pending.update(tags)
+                return set(self._pending)
+
+    def get(self, key: str) -> Optional[CacheEntry]:
+        entry_key = self._entry_key(key)
+        pending = self._flush_pending()
+        try:
+            data = self.client.execute('GET', entry_key)
+            if data is None:
+                self._incr('misses')
+                return None
+            meta, body = _unpack_entry(data)
+            if meta.get('k') != key:
+                self._incr('misses')
+                return None
+            if pending.intersection(meta['t']):
+                self._incr('stale')
+                self._incr('misses')
+                return None
+            if meta['t']:
+                current = self.client.execute('MGET', *(self._tag_key(tag) for tag in meta['t']))
+                if [int(value or 0) for value in current] != meta['v']:
+                    self.client.execute('DEL', entry_key)
+                    self._incr('stale')
+                    self._incr('misses')
+                    return None
+        except (OSError, RespError, ValueError):
+            self._incr('errors')
+            self._incr('misses')
+            return None
+        self._incr('hits')
+        return CacheEntry(body, tuple((name, value) for name, value in meta['h']), meta['e'],
+                          tuple(meta['t']), (), tuple(meta['v']))
+
+    def set(self, key: str, body: bytes, tags: Iterable[str],
+            headers: Optional[Dict[str, str]] = None,
+            ttl: Optional[float] = None, generation: Optional[int] = None) -> bool:
+        ttl = self.ttl if ttl is None else ttl
+        if ttl <= 0:
+            return False
+        tags = list(dict.fromkeys(tags))
+        if self._flush_pending().intersection(tags):
+            return False
+        try:
+            # 先读标签版本再核对 epoch (invalidate 在同一流水线中先递增 epoch)
+            commands: List[Tuple[Any, ...]] = [('GET', self._epoch_key)]
+            if tags:
+                commands.insert(0, ('MGET', *(self._tag_key(tag) for tag in tags)))
+            replies = self.client.pipeline(*commands)
+            versions = [int(value or 0) for value in replies[0]] if tags else []
+            if generation is not None and generation != int(replies[-1] or 0):
+                return False
+            data = _pack_entry({
+                'k': key, 'e': time.time() + ttl, 'h': list((headers or {}).items()),
+                't': tags, 'v': versions,
+            }, body)
+            if len(data) > self.max_bytes:
+                return False
+            self.client.execute('SET', self._entry_key(key), data, 'PX', int(ttl * 1000))
+        except (OSError, RespError, ValueError):
+            self._incr('errors')
+            return False
+        self._incr('sets')
+        return True
+
+    def invalidate(self, tags: Iterable[str]) -> None:
+        """递增标签版本; 失败时不抛出, 标签留待下次操作补发"""
+        tags = list(tags)
+        with self._pending_lock:
+            self._pending.update(tags)
+        self._incr('invalidations', len(tags))
+        self._flush_pending()
+
+    def clear(self) -> None:
+        """只递增 epoch 阻止进行中的写入; 删除全部条目需要遍历键空间, 已有条目随 TTL 过期"""
+        try:
+            self.client.execute('INCR', self._epoch_key)
+        except (OSError, RespError):
+            self._incr('errors')
+
+    def stats(self) -> Dict[str, Any]:
+        stats = super().stats()
+        stats['server'] = self.client.address
+        with self._pending_lock:
+            stats['pending'] = len(self._pending)
+        return stats
+
+
+# 可选的缓存后端名称 (CACHE_BACKEND)
+CACHE_BACKENDS: Tuple[str, ...] = ('memory', 'file', 'redis')
+
+
+def create_cache(backend: str, max_bytes: int, ttl: float,
+                 shared_file: Optional[str] = None,
+                 directory: Optional[str] = None,
+                 redis_url: Optional[str] = None,
+                 redis_timeout: float = 0.5,
+                 redis_prefix: str = 'video-api:') -> CacheBackend:
+    """
+    按名称创建缓存后端 (Create a cache backend by name)
+
+    Args:
+        backend: memory / file / redis
+        max_bytes: 缓存上限字节数
+        ttl: 条目存活秒数
+        shared_file: memory 后端的跨进程版本文件 (不提供时只在本进程内失效)
+        directory: file 后端的缓存目录
+        redis_url: redis 后端的服务地址
+        redis_timeout: redis 后端的连接与读写超时秒数
+        redis_prefix: redis 后端的键前缀 (多套环境共用一个服务时区分)
+
+    Raises:
+        ValueError: 未知的后端名称或缺少必需的配置
+    """
+    if backend == 'memory':
+        shared = SharedVersions(shared_file) if shared_file else None
+        return MemoryCache(max_bytes, ttl, shared)
+    if backend == 'file':
+        if not directory:
+            raise ValueError("file 缓存后端需要缓存目录 (CACHE_DIR)")
+        return FileCache(directory, max_bytes, ttl)
+    if backend == 'redis':
+        if not redis_url:
+            raise ValueError("redis 缓存后端需要服务地址 (CACHE_REDIS_URL)")
+        return RedisCache(RespClient(redis_url, redis_timeout), max_bytes, ttl, redis_prefix)
+    raise ValueError(f"未知的缓存后端 (Unknown cache backend): {backend}, 可选 {', '.join(CACHE_BACKENDS)}")
+
+
+class ProxyCachePurger:
+    """
+    nginx proxy_cache 的代理键索引与清除 (Surrogate-key purge for an nginx proxy_cache directory)
+
+    nginx 把响应存为 <缓存目录>/<md5 末 1 位>/<md5 倒数 3~2 位>/<md5> (levels=1:2),
+    md5 为 proxy_cache_key 的值。API 在生成响应时 (nginx 未命中才会到达 API) 为条目的每个标签
+    记录一个以该 md5 命名的空文件: <索引目录>/<标签摘要>/<md5>; 失效标签时删除索引中列出的
+    nginx 缓存文件, nginx 下次请求视为未命中并回源。标准 nginx 不带 purge 模块, 直接删除
+    缓存文件是官方镜像下可用的清除方式。
+
+    与写入并发生成的旧响应可能在清除之后才被 nginx 存入, 最多保留到代理 TTL (s-maxage) 过期。
+    """
+
+    def __init__(self, directory: str, levels: Sequence[int] = (1, 2)):
+        """
+        Args:
+            directory: 共享卷挂载目录, nginx 缓存在其中的 entries/, 索引在 keys/
+            levels: 与 nginx proxy_cache_path 的 levels 一致
+        """
+        self.directory = directory
+        self.entries_dir = os.path.join(directory, 'entries')
+        self.keys_dir = os.path.join(directory, 'keys')
+        self.levels = tuple(levels)
+        self._counters: Dict[str, int] = dict.fromkeys(('recorded', 'purged', 'errors'), 0)
+        self._counters_lock = threading.Lock()
+
+    def _incr(self, counter: str, amount: int = 1) -> None:
+        with self._counters_lock:
+            self._counters[counter] += amount
+
+    def entry_path(self, cache_key: str) -> str:
+        """proxy_cache_key 的值对应的 nginx 缓存文件路径"""
+        return self._digest_path(hashlib.md5(cache_key.encode('latin-1', 'replace')).hexdigest())
+
+    def _digest_path(self, digest: str) -> str:
+        parts = []
+        end = len(digest)
+        for width in self.levels:
+            parts.append(digest[end - width:end])
+            end -= width
+        return os.path.join(self.entries_dir, *parts, digest)
+
+    def _tag_dir(self, tag: str) -> str:
+        return os.path.join(self.keys_dir, _key_digest(tag))
+
+    def record(self, cache_key: str, tags: Iterable[str]) -> None:
+        """登记 cache_key 依赖的标签 (重复登记只是覆盖同名空文件)"""
+        name = os.path.basename(self.entry_path(cache_key))
+        for tag in dict.fromkeys(tags):
+            tag_dir = self._tag_dir(tag)
+            try:
+                os.makedirs(tag_dir, exist_ok=True)
+                os.close(os.open(os.path.join(tag_dir, name), os.O_WRONLY | os.O_CREAT, 0o644))
+            except OSError:
+                self._incr('errors')
+                return
+        self._incr('recorded')
+
+    def purge(self, tags: Iterable[str]) -> int:
+        """删除依赖这些标签的 nginx 缓存文件及其索引, 返回删除的缓存文件数"""
+        purged = 0
+        for tag in dict.fromkeys(tags):
+            tag_dir = self._tag_dir(tag)
+            try:
+                names = os.listdir(tag_dir)
+            except FileNotFoundError:
+                continue
+            except OSError:
+                self._incr('errors')
+                continue
+            for name in names:
+                try:
+                    os.unlink(self._digest_path(name))
+                    purged += 1
+                except FileNotFoundError:
+                    pass
+                except OSError:
+                    self._incr('errors')
+                try:
+                    os.unlink(os.path.join(tag_dir, name))
+                except OSError:
+                    pass
+        self._incr('purged', purged)
+        return purged
+
+    def stats(self) -> Dict[str, Any]:
+        with self._counters_lock:
+            stats: Dict[str, Any] = dict(self._counters)
+        stats['directory'] = self.directory
+        return stats
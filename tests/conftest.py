@@ -0,0 +1,42 @@
+"""
+测试公共配置 (Shared test fixtures)
+
+tools/ 与 api/ 不是 Python 包, 与 Docker 镜像中相同, 把两个目录加入 sys.path 后按模块名导入。
+所有测试使用 tmp_path 中的 SQLite 数据库, 不需要 MySQL。
+"""
+
+import os
+import sys
+from typing import Any, Dict
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+for _directory in ('tools', 'api'):
+    sys.path.insert(0, os.path.join(ROOT, _directory))
+
+from video_database import VideoDatabase  # noqa: E402
+
+
+def make_video(video_id: int, **fields: Any) -> Dict[str, Any]:
+    """构造一条视频记录, 未提供的必需字段使用占位值"""
+    video = {
+        'video_id': video_id,
+        'video_title': f'视频 {video_id}',
+        'video_url': f'https://example.com/{video_id}.m3u8',
+        'video_category': '动作电影',
+    }
+    video.update(fields)
+    return video
+
+
+@pytest.fixture
+def db_path(tmp_path) -> str:
+    return str(tmp_path / 'videos.db')
+
+
+@pytest.fixture
+def db(db_path):
+    database = VideoDatabase(use_mysql=False, db_path=db_path, verbose=False)
+    yield database
+    database.close()
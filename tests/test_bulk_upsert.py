@@ -0,0 +1,61 @@
+"""批量写入: 分批事务, 坏行按下标报告, 逐行重试后的失败整批回滚"""
+
+from conftest import make_video
+from video_database import VideoDatabase
+
+
+def test_missing_required_field_is_reported_by_index(db):
+    videos = [make_video(1), {'video_id': 2, 'video_title': '缺少链接'}, make_video(3)]
+    result = db.upsert_videos(videos)
+    assert (result['total'], result['succeeded']) == (3, 2)
+    assert [(item['index'], item['video_id']) for item in result['failed']] == [(1, 2)]
+    assert 'video_url' in result['failed'][0]['error']
+    assert db.get_video(2) is None and db.get_video(3) is not None
+
+
+def test_bad_row_falls_back_to_per_row_writes(db):
+    videos = [make_video(1), make_video(2), make_video('坏ID'), make_video(4)]
+    result = db.upsert_videos(videos, chunk_size=10)
+    assert result['succeeded'] == 3
+    assert [(item['index'], item['video_id']) for item in result['failed']] == [(2, '坏ID')]
+    assert [video['video_id'] for video in db.get_videos([1, 2, 4])] == [1, 2, 4]
+    cursor = db.connection.cursor()
+    cursor.execute("SELECT video_count FROM category_stats WHERE video_category = '动作电影'")
+    assert cursor.fetchone()[0] == 3
+
+
+def test_only_the_failing_chunk_is_retried(db):
+    videos = [make_video(1), make_video(2), make_video('坏ID'), make_video(4)]
+    result = db.upsert_videos(videos, chunk_size=2)
+    assert result['succeeded'] == 3
+    assert [item['index'] for item in result['failed']] == [2]
+
+
+def test_failed_commit_after_retry_rolls_back_the_chunk(db, monkeypatch):
+    db.insert_videos([make_video(1)])
+    version = db.get_data_version()[0]
+
+    def broken_reindex(self, cursor, before, after):
+        raise RuntimeError('索引维护失败')
+
+    monkeypatch.setattr(VideoDatabase, '_reindex_videos', broken_reindex)
+    result = db.upsert_videos([make_video(2), make_video(3)], chunk_size=2)
+    assert result['succeeded'] == 0
+    assert [(item['index'], item['error']) for item in result['failed']] == [
+        (0, '索引维护失败'), (1, '索引维护失败')]
+
+    monkeypatch.undo()
+    assert db.get_videos([2, 3]) == [None, None]
+    assert db.get_data_version()[0] == version
+    db.insert_videos([make_video(4)])
+    assert db.get_video(4) is not None
+
+
+def test_update_only_writes_provided_fields(db):
+    db.insert_videos([make_video(1, video_image='cover.jpg', video_tags='冒险')])
+    result = db.upsert_videos([{'video_id': 1, 'video_title': '新标题', 'video_url': 'new.m3u8'}])
+    assert result['succeeded'] == 1 and not result['failed']
+    video = db.get_video(1)
+    assert (video['video_title'], video['video_url']) == ('新标题', 'new.m3u8')
+    assert (video['video_image'], video['video_tags'], video['video_category']) == (
+        'cover.jpg', '冒险', '动作电影')
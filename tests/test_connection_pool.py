@@ -0,0 +1,83 @@
+"""连接池: 容量上限、等待超时 (PoolTimeout -> 503)、归还时回滚与溢出连接关闭"""
+
+import os
+import threading
+import time
+
+import pytest
+
+from conftest import make_video
+from video_database import ConnectionPool, PoolTimeout, VideoDatabase
+
+
+@pytest.fixture
+def pool(db_path):
+    pool = ConnectionPool(use_mysql=False, db_path=db_path, pool_size=1, max_overflow=1, timeout=0.05)
+    yield pool
+    pool.dispose()
+
+
+def test_acquire_times_out_when_pool_and_overflow_are_exhausted(pool):
+    first, second = pool.acquire(), pool.acquire()
+    started = time.monotonic()
+    with pytest.raises(PoolTimeout):
+        pool.acquire()
+    assert time.monotonic() - started >= pool.timeout
+    stats = pool.stats()
+    assert (stats['in_use'], stats['overflow'], stats['waits'], stats['timeouts']) == (2, 1, 1, 1)
+    pool.release(first)
+    pool.release(second)
+
+
+def test_waiting_acquire_gets_the_released_connection(db_path):
+    pool = ConnectionPool(use_mysql=False, db_path=db_path, pool_size=1, max_overflow=0, timeout=5)
+    held = pool.acquire()
+    acquired = []
+    waiter = threading.Thread(target=lambda: acquired.append(pool.acquire()))
+    waiter.start()
+    time.sleep(0.05)
+    assert not acquired
+    pool.release(held)
+    waiter.join(timeout=5)
+    assert acquired == [held]
+    assert pool.stats()['timeouts'] == 0
+    pool.release(held)
+    pool.dispose()
+
+
+def test_overflow_connection_is_closed_on_release(pool):
+    first, second = pool.acquire(), pool.acquire()
+    pool.release(first)
+    pool.release(second)
+    stats = pool.stats()
+    assert (stats['open'], stats['idle'], stats['in_use']) == (1, 1, 0)
+
+
+def test_release_rolls_back_uncommitted_writes(pool):
+    with VideoDatabase(pool=pool, verbose=False) as db:
+        db.connection.execute(
+            "INSERT INTO videos (video_id, video_title, video_url) VALUES (1, 't', 'u')")
+    with VideoDatabase(pool=pool, verbose=False) as db:
+        assert db.get_video(1) is None
+        db.insert_videos([make_video(2)])
+    with VideoDatabase(pool=pool, verbose=False) as db:
+        assert db.get_video(2)['video_title'] == '视频 2'
+
+
+def test_api_answers_503_when_no_connection_is_available(pool, monkeypatch):
+    import api_server
+    from response_cache import MemoryCache
+
+    monkeypatch.setattr(api_server, '_db_pool', pool)
+    monkeypatch.setattr(api_server, '_db_pool_pid', os.getpid())
+    monkeypatch.setattr(api_server, '_response_cache', MemoryCache(1 << 20, 60))
+    monkeypatch.setattr(api_server, '_response_cache_pid', os.getpid())
+    client = api_server.app.test_client()
+
+    held = [pool.acquire(), pool.acquire()]
+    response = client.get('/api/videos')
+    assert response.status_code == 503
+    assert response.get_json()['code'] == 503
+    for connection in held:
+        pool.release(connection)
+    assert client.get('/api/videos').status_code == 200
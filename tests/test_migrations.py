@@ -0,0 +1,100 @@
+"""迁移链: 旧版 (v1) 数据库按顺序升级到最新版本, 数据保留且派生数据被回填"""
+
+import sqlite3
+
+import pytest
+
+from video_database import VideoDatabase
+
+
+class _V1Database(VideoDatabase):
+    """只认识第一个迁移步骤的旧版代码"""
+    SCHEMA_MIGRATIONS = VideoDatabase.SCHEMA_MIGRATIONS[:1]
+
+
+LEGACY_ROWS = [
+    (1, '少年派 第1集', 'u1', '动作电影', '冒险,少年', '2023-05-01 10:00:00'),
+    (2, '少年派 第2集', 'u2', '动作电影', '冒险,少年', '2023-05-02 10:00:00'),
+    (3, '家有儿女', 'u3', '喜剧片', '家庭', '2022-01-01'),
+    (4, '无分类视频', 'u4', None, None, None),
+]
+
+
+@pytest.fixture
+def legacy_db_path(db_path):
+    legacy = _V1Database(use_mysql=False, db_path=db_path, verbose=False)
+    legacy.close()
+    connection = sqlite3.connect(db_path)
+    connection.executemany(
+        'INSERT INTO videos (video_id, video_title, video_url, video_category, video_tags, upload_time) '
+        'VALUES (?, ?, ?, ?, ?, ?)',
+        LEGACY_ROWS
+    )
+    # 早期版本创建过的排序索引, v5 起由 (分类, sort_date, created_at, video_id) 复合索引取代
+    connection.execute('CREATE INDEX idx_video_order ON videos(upload_time, created_at)')
+    connection.commit()
+    connection.close()
+    return db_path
+
+
+def _user_version(path):
+    connection = sqlite3.connect(path)
+    try:
+        return connection.execute('PRAGMA user_version').fetchone()[0]
+    finally:
+        connection.close()
+
+
+def test_v1_database_upgrades_to_latest_and_keeps_data(legacy_db_path):
+    assert _user_version(legacy_db_path) == 1
+    with VideoDatabase(use_mysql=False, db_path=legacy_db_path, verbose=False) as db:
+        assert _user_version(legacy_db_path) == VideoDatabase.schema_version_latest()
+        for video_id, title, url, category, _tags, _upload_time in LEGACY_ROWS:
+            video = db.get_video(video_id)
+            assert (video['video_title'], video['video_url'], video['video_category']) == (title, url, category)
+
+        cursor = db.connection.cursor()
+        cursor.execute('SELECT video_id, sort_date, title_norm, series_key FROM videos ORDER BY video_id')
+        derived = {row[0]: row[1:] for row in cursor.fetchall()}
+        assert derived[1][0] == VideoDatabase._sort_date('2023-05-01 10:00:00') > derived[3][0]
+        assert all(title_norm for _sort_date, title_norm, _series_key in derived.values())
+        assert derived[1][2] == derived[2][2] is not None
+
+        cursor.execute('SELECT video_category, video_count FROM category_stats')
+        counts = dict(cursor.fetchall())
+        assert counts['动作电影'] == 2 and counts['喜剧片'] == 1
+
+        cursor.execute('SELECT sample_rank FROM videos ORDER BY sample_rank')
+        assert [row[0] for row in cursor.fetchall()] == list(range(len(LEGACY_ROWS)))
+
+        cursor.execute('SELECT COUNT(DISTINCT video_id) FROM related_features')
+        assert cursor.fetchone()[0] == len(LEGACY_ROWS)
+
+        assert db.get_data_version()[0] >= 1
+        assert not db._index_exists(cursor, 'videos', 'idx_video_order')
+
+
+def test_reopening_latest_database_runs_no_migrations(db_path, monkeypatch):
+    VideoDatabase(use_mysql=False, db_path=db_path, verbose=False).close()
+
+    def fail(*_args, **_kwargs):
+        raise AssertionError('已是最新版本的数据库不应再执行迁移')
+
+    monkeypatch.setattr(VideoDatabase, '_apply_pending_migrations', fail)
+    with VideoDatabase(use_mysql=False, db_path=db_path, verbose=False) as db:
+        assert db.get_data_version()[0] >= 1
+
+
+def test_interrupted_upgrade_is_rolled_back_and_can_resume(legacy_db_path, monkeypatch):
+    def broken(self, cursor):
+        raise RuntimeError('迁移中断')
+
+    monkeypatch.setattr(VideoDatabase, '_migration_v9', broken)
+    with pytest.raises(RuntimeError):
+        VideoDatabase(use_mysql=False, db_path=legacy_db_path, verbose=False)
+    assert _user_version(legacy_db_path) == 1
+
+    monkeypatch.undo()
+    with VideoDatabase(use_mysql=False, db_path=legacy_db_path, verbose=False) as db:
+        assert db.get_video(3)['video_title'] == '家有儿女'
+    assert _user_version(legacy_db_path) == VideoDatabase.schema_version_latest()
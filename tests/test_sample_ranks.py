@@ -0,0 +1,71 @@
+"""随机抽样序号: sample_rank / category_rank 在增删改后保持连续的 0..n-1"""
+
+import pytest
+
+from conftest import make_video
+
+CATEGORIES = ('动作电影', '喜剧片')
+
+
+def _assert_contiguous(db):
+    cursor = db.connection.cursor()
+    cursor.execute('SELECT sample_rank FROM videos ORDER BY sample_rank')
+    ranks = [row[0] for row in cursor.fetchall()]
+    assert ranks == list(range(len(ranks)))
+    cursor.execute('SELECT video_category, category_rank FROM videos ORDER BY video_category, category_rank')
+    by_category = {}
+    for category, rank in cursor.fetchall():
+        by_category.setdefault(category, []).append(rank)
+    for category, category_ranks in by_category.items():
+        assert category_ranks == list(range(len(category_ranks))), category
+    return len(ranks)
+
+
+@pytest.fixture
+def populated(db):
+    db.insert_videos([make_video(i, video_category=CATEGORIES[i % 2]) for i in range(1, 21)])
+    return db
+
+
+def test_ranks_are_contiguous_after_inserts(populated):
+    assert _assert_contiguous(populated) == 20
+    populated.insert_videos([make_video(i, video_category='纪录片') for i in range(21, 24)])
+    assert _assert_contiguous(populated) == 23
+
+
+def test_deleting_middle_and_last_videos_fills_the_holes(populated):
+    cursor = populated.connection.cursor()
+    cursor.execute('SELECT video_id FROM videos ORDER BY sample_rank DESC LIMIT 1')
+    last_id = cursor.fetchone()[0]
+    assert populated.delete_video(5)
+    assert populated.delete_video(last_id)
+    assert _assert_contiguous(populated) == 18
+    assert populated.delete_videos([2, 3, 4, 11]) == 4
+    assert _assert_contiguous(populated) == 14
+    populated.insert_videos([make_video(30)])
+    assert _assert_contiguous(populated) == 15
+
+
+def test_category_change_moves_the_category_rank(populated):
+    assert populated.update_video(4, {'video_category': '喜剧片'})
+    assert populated.update_video(7, {'video_category': '纪录片'})
+    assert _assert_contiguous(populated) == 20
+    counts = {category: len(populated.get_random_videos(50, category=category))
+              for category in CATEGORIES + ('纪录片',)}
+    assert counts == {'动作电影': 9, '喜剧片': 10, '纪录片': 1}
+
+
+def test_random_sample_is_distinct_and_reproducible(populated):
+    sample = populated.get_random_videos(10, seed='abc')
+    ids = [video['video_id'] for video in sample]
+    assert len(ids) == len(set(ids)) == 10
+    assert [video['video_id'] for video in populated.get_random_videos(10, seed='abc')] == ids
+    assert 'sample_rank' not in sample[0]
+
+    next_page = populated.get_random_videos(10, seed='abc', offset=10)
+    assert not set(ids) & {video['video_id'] for video in next_page}
+    assert len(ids) + len(next_page) == 20
+
+    in_category = populated.get_random_videos(20, category='喜剧片')
+    assert len(in_category) == 10
+    assert {video['video_category'] for video in in_category} == {'喜剧片'}
@@ -0,0 +1,69 @@
+"""跨进程缓存失效: 同机多个 worker 通过共享 mmap 版本槽看到彼此的 invalidate"""
+
+import multiprocessing
+
+import pytest
+
+from response_cache import MemoryCache, SharedVersions
+
+# 版本槽的递增依赖 flock, 子进程用 fork 启动以继承 sys.path
+pytest.importorskip('fcntl')
+fork = multiprocessing.get_context('fork')
+
+
+def _worker(path, conn):
+    """子进程: 缓存两个条目, 等父进程失效其中一个标签后报告命中情况"""
+    cache = MemoryCache(1 << 20, 60, shared=SharedVersions(path))
+    cache.set('/api/videos/1', b'one', ['video:1'])
+    cache.set('/api/videos/2', b'two', ['video:2'])
+    generation = cache.generation()
+    conn.send('cached')
+    conn.recv()
+    conn.send({
+        'invalidated': cache.get('/api/videos/1'),
+        'untouched': cache.get('/api/videos/2').body,
+        'stale_set': cache.set('/api/videos/3', b'three', ['video:3'], generation=generation),
+        'fresh_set': cache.set('/api/videos/3', b'three', ['video:3'], generation=cache.generation()),
+    })
+
+
+def _bumper(path, rounds):
+    shared = SharedVersions(path)
+    for _ in range(rounds):
+        shared.bump(['video:1'])
+
+
+@pytest.fixture
+def shared_path(tmp_path):
+    return str(tmp_path / 'cache-versions')
+
+
+def test_invalidate_in_one_process_is_seen_by_another(shared_path):
+    shared = SharedVersions(shared_path)
+    assert shared.slot('video:1') != shared.slot('video:2')
+    parent_conn, child_conn = fork.Pipe()
+    child = fork.Process(target=_worker, args=(shared_path, child_conn))
+    child.start()
+    assert parent_conn.recv() == 'cached'
+
+    MemoryCache(1 << 20, 60, shared=shared).invalidate(['video:1'])
+    parent_conn.send('invalidated')
+    result = parent_conn.recv()
+    child.join(timeout=10)
+
+    assert child.exitcode == 0
+    assert result == {'invalidated': None, 'untouched': b'two', 'stale_set': False, 'fresh_set': True}
+
+
+def test_concurrent_bumps_lose_no_increments(shared_path):
+    processes, rounds = 4, 500
+    workers = [fork.Process(target=_bumper, args=(shared_path, rounds)) for _ in range(processes)]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join(timeout=30)
+        assert worker.exitcode == 0
+
+    shared = SharedVersions(shared_path)
+    assert shared.epoch() == processes * rounds
+    assert shared.read([shared.slot('video:1')]) == (processes * rounds,)
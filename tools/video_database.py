@@ -26,6 +26,20 @@ MySQL连接配置通过环境变量设置:
 SQLite配置:
 - SQLITE_DB_PATH: SQLite数据库文件路径 (默认: /app/data/videos.db)
 
+连接池配置 (ConnectionPool):
+- DB_POOL_SIZE: 常驻连接数 (默认: 4)
+- DB_POOL_MAX_OVERFLOW: 高峰时额外允许的连接数 (默认: 4)
+- DB_POOL_TIMEOUT: 等待空闲连接的超时秒数 (默认: 10)
+- DB_POOL_RECYCLE: 连接最长存活秒数, 超过后重建 (默认: 1800)
+
+批量写入配置:
+- DB_BULK_CHUNK_SIZE: insert_videos/upsert_videos 每个事务写入的行数 (默认: 500)
+
+播放数合并写入配置 (PlayCountAggregator):
+- PLAY_FLUSH_INTERVAL: 累积的播放数最长多少秒写入一次数据库 (默认: 2)
+- PLAY_FLUSH_THRESHOLD: 累积的播放次数达到该值时立即写入 (默认: 1000)
+- PLAY_UNIQUE_VIEWERS: 是否用 HyperLogLog 估算每个视频的独立观看人数 (默认: true)
+
 使用方法:
     from video_database import VideoDatabase
 
@@ -49,14 +63,144 @@ SQLite配置:
 import os
 import re
 import json
+import base64
+import hashlib
+import heapq
+import time
 import logging
+import math
+import random
 import sqlite3
+import threading
+import unicodedata
 from datetime import datetime
-from typing import Optional, List, Dict, Any, Tuple
+from typing import Optional, List, Dict, Any, Tuple, Callable, Set
 
 # 配置日志
 logger = logging.getLogger(__name__)
 
+# 全文检索分词: 第1组为中日韩文字 (假名/汉字/谚文) 连续片段, 第2组为其他字母数字词
+_CJK_CHARS = '\u3040-\u30ff\u3400-\u4dbf\u4e00-\u9fff\uf900-\ufaff\uac00-\ud7af'
+_SEARCH_TOKEN_RE = re.compile(f'([{_CJK_CHARS}]+)|([^\\W_{_CJK_CHARS}]+)')
+
+# 上架日期: 'YYYY-MM-DD', 'YYYY/M/D', 'YYYY年M月D日', 'YYYYMMDD' 等, 可带 'HH:MM[:SS]' 时间
+_UPLOAD_TIME_RE = re.compile(
+    r'(\d{4})\D{0,2}(\d{1,2})\D{0,2}(\d{1,2})(?:\D+(\d{1,2}):(\d{2})(?::(\d{2}))?)?'
+)
+
+# 用于切分系列名的分隔符: 空格/全角空格/中点/数字/英文字母等
+# (Delimiters used to derive a series base name from a video title:
+#  ASCII/full-width spaces, middle dots, digits and latin letters.)
+_SERIES_SPLIT_RE = re.compile(
+    r'[\s\u3000・·･:：.．,，、\-–—~〜/／|｜0-9０-９a-zA-Zａ-ｚＡ-Ｚ]'
+)
+# 自然排序: 把标题拆成数字块与文字块, 让 "Karte.1" < "Karte.2" < "Karte.5.5"
+_NATURAL_KEY_RE = re.compile(r'(\d+(?:\.\d+)?)')
+
+
+def _series_base(title: Optional[str]) -> str:
+    """
+    从视频标题推导"合集/系列"名 (Derive the collection/series base name).
+
+    取标题开头、遇到第一个分隔符 (空格/中点/数字/英文字母) 之前的部分。例如:
+        "黒獣 1"                       -> "黒獣"
+        "夜勤病棟 Karte.1"             -> "夜勤病棟"
+        "夜勤病棟・参 Experiment.1"    -> "夜勤病棟"
+    若开头即为分隔符 (无法提取有效前缀), 返回去除首尾空白的完整标题,
+    这样该视频只会与自身成为一个"合集" (即没有合集)。
+    """
+    if not title:
+        return ''
+    title = title.strip()
+    match = _SERIES_SPLIT_RE.search(title)
+    base = title[:match.start()] if match else title
+    base = base.strip()
+    return base if base else title
+
+
+def _natural_sort_key(title: str) -> List[Any]:
+    """把标题拆成 [文字, 数字, 文字, ...] 以便按集数自然排序。"""
+    parts = _NATURAL_KEY_RE.split(title or '')
+    key: List[Any] = []
+    for index, part in enumerate(parts):
+        if index % 2 == 1:  # 数字块
+            try:
+                key.append((1, float(part)))
+            except ValueError:
+                key.append((2, part))
+        else:  # 文字块
+            key.append((0, part))
+    return key
+
+
+# episode_key 中数字块的编码宽度: 整数部分 13 位 + 小数 6 位, 按字符串比较即按数值比较
+_EPISODE_NUMBER_FORMAT = '{:020.6f}'
+_EPISODE_NUMBER_MAX = 10 ** 13 - 1
+
+
+def _episode_key(title: Optional[str]) -> str:
+    """
+    把 _natural_sort_key 编码为可直接按二进制字符串比较的集数排序键
+
+    文字块原样保留并以 '\\x01' 结尾 (小于任何可见字符, 使 "abc" 排在 "abc " 之前),
+    数字块编码为定宽十进制。两个键的字符串大小关系与 _natural_sort_key 的列表比较一致,
+    数据库按 series_key + episode_key 索引即可直接返回按集数排好序的合集。
+    """
+    parts: List[str] = []
+    for index, (_, value) in enumerate(_natural_sort_key(title or '')):
+        if index % 2 == 1 and isinstance(value, float):
+            parts.append(_EPISODE_NUMBER_FORMAT.format(min(value, _EPISODE_NUMBER_MAX)))
+        else:
+            parts.append(re.sub(r'[\x00-\x1f]', '', str(value)) + '\x01')
+    return ''.join(parts)
+
+
+# 独立观看人数估算 (HyperLogLog): 2^8 = 256 个 1 字节寄存器, 标准误差约 6.5%
+_HLL_PRECISION = 8
+_HLL_REGISTERS = 1 << _HLL_PRECISION
+_HLL_ALPHA = 0.7213 / (1 + 1.079 / _HLL_REGISTERS)
+
+
+def _hll_new() -> bytearray:
+    """空的观看者草图 (empty viewer sketch)"""
+    return bytearray(_HLL_REGISTERS)
+
+
+def _hll_add(registers: bytearray, fingerprint: str) -> None:
+    """
+    把一个观看者指纹计入草图
+
+    指纹先做 64 位哈希: 低 8 位选择寄存器, 其余 56 位中首个 1 出现的位置
+    (从高位数起) 作为该寄存器的候选值, 寄存器只保留最大值。
+    """
+    digest = hashlib.blake2b(fingerprint.encode('utf-8'), digest_size=8).digest()
+    value = int.from_bytes(digest, 'big')
+    index = value & (_HLL_REGISTERS - 1)
+    rest = value >> _HLL_PRECISION
+    rank = (64 - _HLL_PRECISION) - rest.bit_length() + 1
+    if rank > registers[index]:
+        registers[index] = rank
+
+
+def _hll_merge(registers: bytearray, other: Optional[bytes]) -> None:
+    """按寄存器取最大值合并另一个草图 (结果与把两边的观看者合在一起计数相同)"""
+    if not other or len(other) != _HLL_REGISTERS:
+        return
+    for index, rank in enumerate(other):
+        if rank > registers[index]:
+            registers[index] = rank
+
+
+def _hll_estimate(registers: bytes) -> int:
+    """估算草图中的不同观看者数量 (小基数时使用线性计数修正)"""
+    total = sum(2.0 ** -rank for rank in registers)
+    estimate = _HLL_ALPHA * _HLL_REGISTERS * _HLL_REGISTERS / total
+    zeros = registers.count(0)
+    if estimate <= 2.5 * _HLL_REGISTERS and zeros:
+        estimate = _HLL_REGISTERS * math.log(_HLL_REGISTERS / zeros)
+    return int(round(estimate))
+
+
 # MySQL连接配置 - 从环境变量获取
 MYSQL_CONFIG = {
     'host': os.environ.get('MYSQL_HOST', 'localhost'),
@@ -75,6 +219,49 @@ except ImportError:
     MYSQL_AVAILABLE = False
     logger.warning("pymysql 未安装，将使用SQLite作为备用数据库")
 
+# 连接池配置 - 从环境变量获取 (Connection pool settings)
+POOL_CONFIG = {
+    'pool_size': int(os.environ.get('DB_POOL_SIZE', '4')),
+    'max_overflow': int(os.environ.get('DB_POOL_MAX_OVERFLOW', '4')),
+    'timeout': float(os.environ.get('DB_POOL_TIMEOUT', '10')),
+    'recycle': float(os.environ.get('DB_POOL_RECYCLE', '1800')),
+}
+
+# 批量写入时每个事务包含的行数 (Rows per transaction for bulk upserts)
+BULK_CHUNK_SIZE = int(os.environ.get('DB_BULK_CHUNK_SIZE', '500'))
+
+# 播放数合并写入配置 (Write-behind play counter settings)
+PLAY_COUNT_CONFIG = {
+    'flush_interval': float(os.environ.get('PLAY_FLUSH_INTERVAL', '2')),
+    'flush_threshold': int(os.environ.get('PLAY_FLUSH_THRESHOLD', '1000')),
+    'unique_viewers': os.environ.get('PLAY_UNIQUE_VIEWERS', 'true').lower() == 'true',
+}
+
+
+def _open_mysql_connection(mysql_config: Dict[str, Any]):
+    """建立一个新的 MySQL 连接 (不执行任何建表语句)"""
+    return pymysql.connect(
+        host=mysql_config['host'],
+        port=mysql_config['port'],
+        user=mysql_config['user'],
+        password=mysql_config['password'],
+        database=mysql_config['database'],
+        charset=mysql_config.get('charset', 'utf8mb4'),
+        cursorclass=pymysql.cursors.DictCursor
+    )
+
+
+def _open_sqlite_connection(db_path: str) -> sqlite3.Connection:
+    """
+    建立一个新的 SQLite 连接 (不执行任何建表语句)
+
+    连接池中的连接会被不同的请求线程依次借用 (同一时刻只属于一个线程),
+    因此关闭 check_same_thread 检查。
+    """
+    connection = sqlite3.connect(db_path, check_same_thread=False)
+    connection.row_factory = sqlite3.Row
+    return connection
+
 
 class VideoDatabase:
     """
@@ -87,11 +274,35 @@ class VideoDatabase:
 
     # 前端/后台视频列表排序: 优先按视频上架日期(upload_time, 即详情页显示的日期)倒序,
     # 缺失上架日期的视频回退到采集时间(created_at)倒序, 最后用 video_id 保证稳定排序。
-    # upload_time 存储格式为 'YYYY-MM-DD' 字符串, 可按字典序倒序得到最新日期在前。
-    _VIDEO_ORDER_BY = (
-        "(upload_time IS NULL OR upload_time = '') , "
-        "upload_time DESC, created_at DESC, video_id DESC"
+    # upload_time 在写入时归一化为整数 sort_date (YYYYMMDDHHMMSS, 缺失为 0), 三列
+    # 方向一致, 可直接按复合索引 (video_category, sort_date, created_at, video_id) 倒序读取,
+    # 不再需要对整个分类排序。
+    # 排序键为 (列, 方向) 元组, 游标分页按同一元组定位上一页最后一行。
+    _VIDEO_SORT_KEY: Tuple[Tuple[str, str], ...] = (
+        ('sort_date', 'DESC'),
+        ('created_at', 'DESC'),
+        ('video_id', 'DESC'),
     )
+    _VIDEO_ORDER_BY = ', '.join(f'{expr} {direction}' for expr, direction in _VIDEO_SORT_KEY)
+
+    @staticmethod
+    def _sort_date(upload_time: Any) -> int:
+        """
+        把 upload_time 归一化为可排序的整数 YYYYMMDDHHMMSS
+
+        缺失时为 0 (排在最后); 有值但无法识别日期时为 1, 排在有日期的视频之后、
+        缺失日期的视频之前 (与原先按字符串倒序时非空值在前的行为一致)。
+        """
+        text = str(upload_time or '').strip()
+        if not text:
+            return 0
+        match = _UPLOAD_TIME_RE.match(text)
+        if not match:
+            return 1
+        year, month, day, hour, minute, second = (int(part or 0) for part in match.groups())
+        if not (1 <= month <= 12 and 1 <= day <= 31):
+            return 1
+        return (((year * 100 + month) * 100 + day) * 100 + hour) * 10000 + minute * 100 + second
 
     @staticmethod
     def _get_default_db_path():
@@ -113,7 +324,9 @@ class VideoDatabase:
         return 'data/videos.db'
 
     def __init__(self, use_mysql: bool = True, db_path: Optional[str] = None,
-                 mysql_config: Optional[Dict[str, Any]] = None, verbose: bool = True):
+                 mysql_config: Optional[Dict[str, Any]] = None, verbose: bool = True,
+                 pool: Optional['ConnectionPool'] = None,
+                 on_change: Optional[Callable[[Set[str]], None]] = None):
         """
         初始化数据库连接
 
@@ -125,10 +338,22 @@ class VideoDatabase:
                      - 本地开发: data/videos.db
             mysql_config: MySQL连接配置，默认使用全局配置
             verbose: 是否输出日志信息，默认True
+            pool: 可选的连接池。提供时从池中借出已完成建表的连接,
+                  close() 时归还到池中, 不再重复执行建表/迁移语句
+            on_change: 可选回调, 每次提交写入后以变更的数据标签集合调用 (见 _commit)
         """
-        self.db_path = db_path or self._get_default_db_path()
         self.verbose = verbose
         self.connection = None
+        self._pool = pool
+        self._on_change = on_change
+        self._changed: Set[str] = set()
+        if pool is not None:
+            self.db_path = pool.db_path
+            self.use_mysql = pool.use_mysql
+            self.mysql_config = pool.mysql_config
+            self.connection = pool.acquire()
+            return
+        self.db_path = db_path or self._get_default_db_path()
         self.use_mysql = use_mysql and MYSQL_AVAILABLE
         self.mysql_config = mysql_config or MYSQL_CONFIG
         self._init_database()
@@ -143,93 +368,8 @@ class VideoDatabase:
     def _init_mysql(self) -> None:
         """初始化MySQL数据库"""
         try:
-            self.connection = pymysql.connect(
-                host=self.mysql_config['host'],
-                port=self.mysql_config['port'],
-                user=self.mysql_config['user'],
-                password=self.mysql_config['password'],
-                database=self.mysql_config['database'],
-                charset=self.mysql_config.get('charset', 'utf8mb4'),
-                cursorclass=pymysql.cursors.DictCursor
-            )
-
-            cursor = self.connection.cursor()
-
-            # 创建视频表
-            cursor.execute('''
-                CREATE TABLE IF NOT EXISTS videos (
-                    video_id INT PRIMARY KEY,
-                    video_url TEXT NOT NULL,
-                    video_url_backup TEXT,
-                    video_image TEXT,
-                    video_title VARCHAR(500) NOT NULL,
-                    video_category VARCHAR(100),
-                    video_tags TEXT,
-                    play_count INT DEFAULT 0,
-                    upload_time VARCHAR(50),
-                    video_duration VARCHAR(50),
-                    video_coins INT DEFAULT 0,
-                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP
-                ) CHARACTER SET utf8mb4 COLLATE utf8mb4_unicode_ci
-            ''')
-
-            # 兼容旧表结构: 补齐 video_tags 列
-            self._migrate_videos_mysql(cursor)
-
-            # 创建索引以提高查询效率
-            try:
-                cursor.execute('CREATE INDEX idx_video_category ON videos(video_category)')
-            except pymysql.err.OperationalError:
-                pass  # 索引已存在
-
-            try:
-                cursor.execute('CREATE INDEX idx_video_upload_time ON videos(upload_time)')
-            except pymysql.err.OperationalError:
-                pass
-
-            try:
-                cursor.execute('CREATE INDEX idx_video_play_count ON videos(play_count)')
-            except pymysql.err.OperationalError:
-                pass
-
-            try:
-                cursor.execute('CREATE INDEX idx_video_created_at ON videos(created_at)')
-            except pymysql.err.OperationalError:
-                pass
-
-            # 创建导航分类配置表 (Create nav_categories table for global admin settings)
-            cursor.execute('''
-                CREATE TABLE IF NOT EXISTS nav_categories (
-                    id INT PRIMARY KEY AUTO_INCREMENT,
-                    category_key VARCHAR(100) UNIQUE NOT NULL,
-                    label VARCHAR(100) NOT NULL,
-                    subcategories TEXT,
-                    sort_order INT DEFAULT 0,
-                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP
-                ) CHARACTER SET utf8mb4 COLLATE utf8mb4_unicode_ci
-            ''')
-
-            # 创建轮播图配置表 (Create carousel_items table for admin-managed home carousel)
-            # 轮播图支持两种条目：已有视频(item_type='video')与独立图片(item_type='image')
-            cursor.execute('''
-                CREATE TABLE IF NOT EXISTS carousel_items (
-                    id INT PRIMARY KEY AUTO_INCREMENT,
-                    item_type VARCHAR(20) DEFAULT 'video',
-                    video_id INT NULL,
-                    image_url TEXT,
-                    title VARCHAR(500),
-                    link_url TEXT,
-                    sort_order INT DEFAULT 0,
-                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-                ) CHARACTER SET utf8mb4 COLLATE utf8mb4_unicode_ci
-            ''')
-
-            # 兼容旧表结构：补齐独立图片所需的列，并允许 video_id 为空
-            self._migrate_carousel_items_mysql(cursor)
-
-            self.connection.commit()
+            self.connection = _open_mysql_connection(self.mysql_config)
+            self._ensure_schema()
             self._log(f"✅ MySQL数据库初始化完成: {self.mysql_config['database']}")
         except Exception as e:
             logger.error(f"MySQL连接失败: {e}")
@@ -252,11 +392,249 @@ class VideoDatabase:
             os.makedirs(db_dir, exist_ok=True)
             self._log(f"📂 创建数据库目录: {db_dir}")
 
-        self.connection = sqlite3.connect(self.db_path)
-        self.connection.row_factory = sqlite3.Row
+        self.connection = _open_sqlite_connection(self.db_path)
+        self._ensure_schema()
+        self._log(f"✅ 数据库初始化完成: {self.db_path}")
+
+    # ==================== 数据库迁移 (Schema Migrations) ====================
+
+    # 版本化迁移步骤: (版本号, 说明, 方法名), 按版本号顺序执行。
+    # 每一步都必须幂等 (先检查列/索引是否存在再创建), 以便中断后可安全重跑。
+    # 新增列或索引时, 在末尾追加一步并实现对应方法即可, 已升级的库启动时只做一次版本检查。
+    # 版本号保存在 SQLite 的 PRAGMA user_version / MySQL 的 schema_version 表中。
+    SCHEMA_MIGRATIONS: List[Tuple[int, str, str]] = [
+        (1, '基础表结构: videos / nav_categories / carousel_items 及索引', '_migration_v1'),
+        (2, '标签索引: tags 字典表与 video_tag 关联表', '_migration_v2'),
+        (3, '全文检索: SQLite FTS5 videos_fts / MySQL FULLTEXT ngram 索引', '_migration_v3'),
+        (4, '空迁移 (游标分页索引见 v5)', '_migration_v4'),
+        (5, '列表排序键: sort_date 列与 (分类, sort_date, created_at, video_id) 复合索引', '_migration_v5'),
+        (6, '分类统计: category_stats 计数表', '_migration_v6'),
+        (7, '标签统计: category_tag_stats 分类标签计数表与 tags.video_count', '_migration_v7'),
+        (8, '标题查重: title_norm 规范化标题列及索引', '_migration_v8'),
+        (9, '合集: series_key / episode_key 列及 (series_key, episode_key) 索引', '_migration_v9'),
+        (10, '独立观看: video_viewers 草图表与 videos.unique_viewers 列', '_migration_v10'),
+        (11, '热度榜: 按小时播放桶 video_play_hourly 与衰减热度表 video_trending', '_migration_v11'),
+        (12, '随机抽样: sample_rank / category_rank 连续序号列及索引', '_migration_v12'),
+        (13, '相关推荐: related_videos 近邻表与 related_dirty 待计算队列', '_migration_v13'),
+        (14, '数据版本: data_version 全站/分类写入计数表', '_migration_v14'),
+        (15, '相关推荐倒排表: related_features 特征->视频 与 related_feature_stats 特征文档数', '_migration_v15'),
+    ]
+
+    # MySQL 迁移互斥锁名称, 防止多个 worker 同时升级
+    _MIGRATION_LOCK_NAME = 'video_database_schema_migration'
+
+    @classmethod
+    def schema_version_latest(cls) -> int:
+        """代码中定义的最新 schema 版本号"""
+        return cls.SCHEMA_MIGRATIONS[-1][0]
+
+    def _get_schema_version(self, cursor) -> int:
+        """读取数据库当前的 schema 版本号 (全新数据库为 0)"""
+        if not self.use_mysql:
+            cursor.execute('PRAGMA user_version')
+            row = cursor.fetchone()
+            return int(row[0] or 0)
+        try:
+            cursor.execute('SELECT MAX(version) AS version FROM schema_version')
+        except pymysql.err.ProgrammingError:
+            # schema_version 表尚不存在: 全新数据库或迁移引擎引入前的旧库
+            return 0
+        row = cursor.fetchone()
+        return int((row or {}).get('version') or 0)
+
+    def _set_schema_version(self, cursor, version: int) -> None:
+        """记录已完成的 schema 版本号"""
+        if self.use_mysql:
+            cursor.execute('DELETE FROM schema_version')
+            cursor.execute('INSERT INTO schema_version (version) VALUES (%s)', (version,))
+        else:
+            # PRAGMA 不支持参数绑定, version 为代码中定义的整数
+            cursor.execute(f'PRAGMA user_version = {int(version)}')
+
+    def _ensure_schema(self) -> None:
+        """
+        确保数据库结构为最新版本
 
+        已是最新版本时只执行一次版本查询; 否则加锁后按顺序执行缺失的迁移步骤。
+        """
         cursor = self.connection.cursor()
+        if self._get_schema_version(cursor) >= self.schema_version_latest():
+            return
+        if self.use_mysql:
+            self._run_migrations_mysql(cursor)
+        else:
+            self._run_migrations_sqlite(cursor)
+
+    def _apply_pending_migrations(self, cursor, current: int) -> int:
+        """执行版本号大于 current 的迁移步骤, 返回最终版本号"""
+        for version, description, method_name in self.SCHEMA_MIGRATIONS:
+            if version <= current:
+                continue
+            self._log(f"🔧 执行数据库迁移 v{version}: {description}")
+            getattr(self, method_name)(cursor)
+            self._set_schema_version(cursor, version)
+            if self.use_mysql:
+                # MySQL 的 DDL 会隐式提交, 每一步单独记录版本便于中断后续跑
+                self.connection.commit()
+            current = version
+        return current
+
+    def _run_migrations_sqlite(self, cursor) -> None:
+        """SQLite: 在 BEGIN IMMEDIATE 事务中执行迁移 (DDL 可回滚, 并与其他进程互斥)"""
+        cursor.execute('BEGIN IMMEDIATE')
+        try:
+            # 拿到写锁后重新读取版本, 其他进程可能已完成升级
+            current = self._get_schema_version(cursor)
+            self._apply_pending_migrations(cursor, current)
+            self.connection.commit()
+        except Exception:
+            self.connection.rollback()
+            raise
+
+    def _run_migrations_mysql(self, cursor) -> None:
+        """MySQL: 通过 GET_LOCK 与其他进程互斥后执行迁移"""
+        cursor.execute('SELECT GET_LOCK(%s, 60) AS locked', (self._MIGRATION_LOCK_NAME,))
+        try:
+            cursor.execute('''
+                CREATE TABLE IF NOT EXISTS schema_version (
+                    version INT NOT NULL,
+                    applied_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+                )
+            ''')
+            current = self._get_schema_version(cursor)
+            self._apply_pending_migrations(cursor, current)
+            self.connection.commit()
+        finally:
+            cursor.execute('SELECT RELEASE_LOCK(%s)', (self._MIGRATION_LOCK_NAME,))
+
+    def _column_exists(self, cursor, table: str, column: str) -> bool:
+        """检查表中是否已存在指定列"""
+        if self.use_mysql:
+            cursor.execute(
+                'SELECT COUNT(*) AS cnt FROM information_schema.COLUMNS '
+                'WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = %s AND COLUMN_NAME = %s',
+                (table, column)
+            )
+            return int(cursor.fetchone()['cnt']) > 0
+        # 表名来自迁移代码中的常量, 不是用户输入
+        cursor.execute(f'PRAGMA table_info({table})')
+        return any(row[1] == column for row in cursor.fetchall())
+
+    def _index_exists(self, cursor, table: str, index: str) -> bool:
+        """检查表上是否已存在指定名称的索引"""
+        if self.use_mysql:
+            cursor.execute(
+                'SELECT COUNT(*) AS cnt FROM information_schema.STATISTICS '
+                'WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = %s AND INDEX_NAME = %s',
+                (table, index)
+            )
+            return int(cursor.fetchone()['cnt']) > 0
+        cursor.execute(
+            "SELECT COUNT(*) FROM sqlite_master WHERE type = 'index' AND tbl_name = ? AND name = ?",
+            (table, index)
+        )
+        return int(cursor.fetchone()[0]) > 0
+
+    def _add_column(self, cursor, table: str, column: str,
+                    sqlite_def: str, mysql_def: Optional[str] = None) -> None:
+        """列不存在时追加该列 (SQLite/MySQL 的 ADD COLUMN 均无需重建整表)"""
+        if self._column_exists(cursor, table, column):
+            return
+        definition = (mysql_def or sqlite_def) if self.use_mysql else sqlite_def
+        cursor.execute(f'ALTER TABLE {table} ADD COLUMN {column} {definition}')
+
+    def _create_index(self, cursor, table: str, index: str, columns: str,
+                      unique: bool = False) -> None:
+        """索引不存在时创建该索引"""
+        if self._index_exists(cursor, table, index):
+            return
+        kind = 'UNIQUE INDEX' if unique else 'INDEX'
+        cursor.execute(f'CREATE {kind} {index} ON {table}({columns})')
+
+    def _drop_index(self, cursor, table: str, index: str) -> None:
+        """索引存在时删除该索引"""
+        if not self._index_exists(cursor, table, index):
+            return
+        if self.use_mysql:
+            cursor.execute(f'DROP INDEX {index} ON {table}')
+        else:
+            cursor.execute(f'DROP INDEX {index}')
+
+    def _migration_v1(self, cursor) -> None:
+        """v1: 基础表结构, 兼容补齐旧版数据库缺失的列, 并创建常用索引"""
+        if self.use_mysql:
+            self._create_base_tables_mysql(cursor)
+        else:
+            self._create_base_tables_sqlite(cursor)
+
+        # 兼容旧表结构: 补齐 video_tags / video_url_backup 列
+        self._add_column(cursor, 'videos', 'video_tags', 'TEXT')
+        self._add_column(cursor, 'videos', 'video_url_backup', 'TEXT')
+
+        # 兼容旧表结构：补齐独立图片所需的列
+        if self.use_mysql:
+            self._migrate_carousel_items_mysql(cursor)
+        else:
+            self._migrate_carousel_items_sqlite(cursor)
+
+        # 创建索引以提高查询效率
+        self._create_index(cursor, 'videos', 'idx_video_category', 'video_category')
+        self._create_index(cursor, 'videos', 'idx_video_upload_time', 'upload_time')
+        self._create_index(cursor, 'videos', 'idx_video_play_count', 'play_count')
+        # 采集时间索引: 前端按采集时间(created_at)倒序展示最新视频
+        self._create_index(cursor, 'videos', 'idx_video_created_at', 'created_at')
+
+    def _create_base_tables_mysql(self, cursor) -> None:
+        """创建 MySQL 基础表 (已存在时跳过)"""
+        # 创建视频表
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS videos (
+                video_id INT PRIMARY KEY,
+                video_url TEXT NOT NULL,
+                video_url_backup TEXT,
+                video_image TEXT,
+                video_title VARCHAR(500) NOT NULL,
+                video_category VARCHAR(100),
+                video_tags TEXT,
+                play_count INT DEFAULT 0,
+                upload_time VARCHAR(50),
+                video_duration VARCHAR(50),
+                video_coins INT DEFAULT 0,
+                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP
+            ) CHARACTER SET utf8mb4 COLLATE utf8mb4_unicode_ci
+        ''')
+
+        # 创建导航分类配置表 (Create nav_categories table for global admin settings)
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS nav_categories (
+                id INT PRIMARY KEY AUTO_INCREMENT,
+                category_key VARCHAR(100) UNIQUE NOT NULL,
+                label VARCHAR(100) NOT NULL,
+                subcategories TEXT,
+                sort_order INT DEFAULT 0,
+                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP
+            ) CHARACTER SET utf8mb4 COLLATE utf8mb4_unicode_ci
+        ''')
 
+        # 创建轮播图配置表 (Create carousel_items table for admin-managed home carousel)
+        # 轮播图支持两种条目：已有视频(item_type='video')与独立图片(item_type='image')
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS carousel_items (
+                id INT PRIMARY KEY AUTO_INCREMENT,
+                item_type VARCHAR(20) DEFAULT 'video',
+                video_id INT NULL,
+                image_url TEXT,
+                title VARCHAR(500),
+                link_url TEXT,
+                sort_order INT DEFAULT 0,
+                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            ) CHARACTER SET utf8mb4 COLLATE utf8mb4_unicode_ci
+        ''')
+
+    def _create_base_tables_sqlite(self, cursor) -> None:
+        """创建 SQLite 基础表 (已存在时跳过)"""
         # 创建视频表 (使用video_coins代替video_price)
         cursor.execute('''
             CREATE TABLE IF NOT EXISTS videos (
@@ -276,31 +654,6 @@ class VideoDatabase:
             )
         ''')
 
-        # 兼容旧表结构: 补齐 video_tags 列
-        self._migrate_videos_sqlite(cursor)
-
-        # 创建索引以提高查询效率
-        cursor.execute('''
-            CREATE INDEX IF NOT EXISTS idx_video_category
-            ON videos(video_category)
-        ''')
-
-        cursor.execute('''
-            CREATE INDEX IF NOT EXISTS idx_video_upload_time
-            ON videos(upload_time)
-        ''')
-
-        cursor.execute('''
-            CREATE INDEX IF NOT EXISTS idx_video_play_count
-            ON videos(play_count)
-        ''')
-
-        # 采集时间索引: 前端按采集时间(created_at)倒序展示最新视频
-        cursor.execute('''
-            CREATE INDEX IF NOT EXISTS idx_video_created_at
-            ON videos(created_at)
-        ''')
-
         # 创建导航分类配置表 (Create nav_categories table for global admin settings)
         cursor.execute('''
             CREATE TABLE IF NOT EXISTS nav_categories (
@@ -330,67 +683,28 @@ class VideoDatabase:
             )
         ''')
 
-        # 兼容旧表结构：补齐独立图片所需的列
-        self._migrate_carousel_items_sqlite(cursor)
-
-        self.connection.commit()
-        self._log(f"✅ 数据库初始化完成: {self.db_path}")
-
-    def _migrate_videos_mysql(self, cursor) -> None:
-        """为旧版 MySQL videos 表补齐新增的列 (如 video_tags, video_url_backup)"""
-        column_defs = {
-            'video_tags': "ALTER TABLE videos ADD COLUMN video_tags TEXT",
-            'video_url_backup': "ALTER TABLE videos ADD COLUMN video_url_backup TEXT",
-        }
-        for sql in column_defs.values():
-            try:
-                cursor.execute(sql)
-            except Exception:
-                # 列已存在
-                pass
-
-    def _migrate_videos_sqlite(self, cursor) -> None:
-        """为旧版 SQLite videos 表补齐新增的列 (如 video_tags, video_url_backup)"""
-        cursor.execute('PRAGMA table_info(videos)')
-        existing = {row[1] for row in cursor.fetchall()}
-        if 'video_tags' not in existing:
-            try:
-                cursor.execute('ALTER TABLE videos ADD COLUMN video_tags TEXT')
-            except Exception:
-                pass
-        if 'video_url_backup' not in existing:
-            try:
-                cursor.execute('ALTER TABLE videos ADD COLUMN video_url_backup TEXT')
-            except Exception:
-                pass
-
     def _migrate_carousel_items_mysql(self, cursor) -> None:
         """为旧版 MySQL carousel_items 表补齐独立图片所需的列并放宽 video_id 约束"""
-        column_defs = {
-            'item_type': "ALTER TABLE carousel_items ADD COLUMN item_type VARCHAR(20) DEFAULT 'video'",
-            'image_url': "ALTER TABLE carousel_items ADD COLUMN image_url TEXT",
-            'title': "ALTER TABLE carousel_items ADD COLUMN title VARCHAR(500)",
-            'link_url': "ALTER TABLE carousel_items ADD COLUMN link_url TEXT",
-        }
-        for sql in column_defs.values():
-            try:
-                cursor.execute(sql)
-            except Exception:
-                # 列已存在
-                pass
+        self._add_column(cursor, 'carousel_items', 'item_type', "VARCHAR(20) DEFAULT 'video'")
+        self._add_column(cursor, 'carousel_items', 'image_url', 'TEXT')
+        self._add_column(cursor, 'carousel_items', 'title', 'VARCHAR(500)')
+        self._add_column(cursor, 'carousel_items', 'link_url', 'TEXT')
         # 允许 video_id 为空（独立图片没有关联视频）
-        try:
+        cursor.execute(
+            "SELECT IS_NULLABLE FROM information_schema.COLUMNS "
+            "WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = 'carousel_items' "
+            "AND COLUMN_NAME = 'video_id'"
+        )
+        row = cursor.fetchone()
+        if row and row.get('IS_NULLABLE') == 'NO':
             cursor.execute('ALTER TABLE carousel_items MODIFY COLUMN video_id INT NULL')
-        except Exception:
-            pass
 
     def _migrate_carousel_items_sqlite(self, cursor) -> None:
         """为旧版 SQLite carousel_items 表补齐独立图片所需的列"""
         cursor.execute('PRAGMA table_info(carousel_items)')
         info = cursor.fetchall()
-        existing = {row[1] for row in info}
         # 旧表将 video_id 定义为 NOT NULL，SQLite 无法直接放宽该约束，
-        # 独立图片条目需要 video_id 为空，因此重建表并迁移数据。
+        # 独立图片条目需要 video_id 为空，因此重建表并迁移数据 (仅在升级时执行一次)。
         video_id_not_null = any(row[1] == 'video_id' and row[3] == 1 for row in info)
         if video_id_not_null:
             cursor.execute('ALTER TABLE carousel_items RENAME TO carousel_items_old')
@@ -413,118 +727,1850 @@ class VideoDatabase:
             cursor.execute('DROP TABLE carousel_items_old')
             return
 
-        column_defs = {
-            'item_type': "ALTER TABLE carousel_items ADD COLUMN item_type TEXT DEFAULT 'video'",
-            'image_url': "ALTER TABLE carousel_items ADD COLUMN image_url TEXT",
-            'title': "ALTER TABLE carousel_items ADD COLUMN title TEXT",
-            'link_url': "ALTER TABLE carousel_items ADD COLUMN link_url TEXT",
-        }
-        for column, sql in column_defs.items():
-            if column not in existing:
-                try:
-                    cursor.execute(sql)
-                except Exception:
-                    pass
-
-    def _log(self, message: str) -> None:
-        """输出日志信息"""
-        if self.verbose:
-            print(message)
-        logger.info(message)
+        self._add_column(cursor, 'carousel_items', 'item_type', "TEXT DEFAULT 'video'")
+        self._add_column(cursor, 'carousel_items', 'image_url', 'TEXT')
+        self._add_column(cursor, 'carousel_items', 'title', 'TEXT')
+        self._add_column(cursor, 'carousel_items', 'link_url', 'TEXT')
 
-    def insert_video(self, video_data: Dict[str, Any]) -> bool:
-        """
-        插入单个视频记录
+    def _migration_v2(self, cursor) -> None:
+        """v2: 标签字典表 tags 与视频-标签关联表 video_tag, 并从 video_tags 回填"""
+        if self.use_mysql:
+            # tag_name 使用二进制排序规则, 与原 LIKE ',tag,' 的精确匹配语义一致
+            cursor.execute('''
+                CREATE TABLE IF NOT EXISTS tags (
+                    tag_id INT PRIMARY KEY AUTO_INCREMENT,
+                    tag_name VARCHAR(191) CHARACTER SET utf8mb4 COLLATE utf8mb4_bin NOT NULL,
+                    UNIQUE KEY uk_tag_name (tag_name)
+                ) CHARACTER SET utf8mb4 COLLATE utf8mb4_unicode_ci
+            ''')
+            cursor.execute('''
+                CREATE TABLE IF NOT EXISTS video_tag (
+                    tag_id INT NOT NULL,
+                    video_id BIGINT NOT NULL,
+                    PRIMARY KEY (tag_id, video_id),
+                    KEY idx_video_tag_video (video_id)
+                )
+            ''')
+        else:
+            cursor.execute('''
+                CREATE TABLE IF NOT EXISTS tags (
+                    tag_id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    tag_name TEXT NOT NULL UNIQUE
+                )
+            ''')
+            cursor.execute('''
+                CREATE TABLE IF NOT EXISTS video_tag (
+                    tag_id INTEGER NOT NULL,
+                    video_id INTEGER NOT NULL,
+                    PRIMARY KEY (tag_id, video_id)
+                ) WITHOUT ROWID
+            ''')
+            self._create_index(cursor, 'video_tag', 'idx_video_tag_video', 'video_id')
 
-        Args:
-            video_data: 视频数据字典，包含以下字段:
-                - video_id: 视频ID (必需)
-                - video_url: 视频链接 (必需)
-                - video_image: 视频图片
-                - video_title: 视频标题 (必需)
-                - video_category: 视频分类
-                - video_tags: 视频标签 (逗号分隔)
-                - play_count: 播放数
-                - upload_time: 上传时间
-                - video_duration: 视频时长
-                - video_coins: 视频金币
+        # 回填: 只在升级时执行一次, 之后由写入路径增量维护
+        for rows in self._iter_video_rows(cursor, ('video_id', 'video_tags')):
+            self._sync_tag_index(cursor, {}, {row['video_id']: row for row in rows})
 
-        Returns:
-            插入成功返回True，失败返回False
-        """
-        required_fields = ['video_id', 'video_url', 'video_title']
-        for field in required_fields:
-            if field not in video_data or video_data[field] is None:
-                self._log(f"❌ 缺少必需字段: {field}")
-                return False
+    def _migration_v3(self, cursor) -> None:
+        """v3: 标题与标签的全文索引 (search_videos 使用)"""
+        if self.use_mysql:
+            # ngram 解析器按 ngram_token_size (默认 2) 切分中日文, 由 MySQL 自动维护
+            if not self._index_exists(cursor, 'videos', 'ft_videos_title_tags'):
+                cursor.execute(
+                    'ALTER TABLE videos ADD FULLTEXT INDEX ft_videos_title_tags '
+                    '(video_title, video_tags) WITH PARSER ngram'
+                )
+            return
 
         try:
-            cursor = self.connection.cursor()
-
-            if self.use_mysql:
-                # MySQL使用 REPLACE INTO
-                cursor.execute('''
-                    REPLACE INTO videos
-                    (video_id, video_url, video_url_backup, video_image, video_title, video_category,
-                     video_tags, play_count, upload_time, video_duration, video_coins)
-                    VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
-                ''', (
-                    video_data.get('video_id'),
-                    video_data.get('video_url'),
-                    video_data.get('video_url_backup', ''),
-                    video_data.get('video_image', ''),
-                    video_data.get('video_title'),
-                    video_data.get('video_category', ''),
-                    video_data.get('video_tags', ''),
-                    video_data.get('play_count', 0),
-                    video_data.get('upload_time', ''),
-                    video_data.get('video_duration', ''),
-                    video_data.get('video_coins', 0)
-                ))
-            else:
-                # SQLite使用 INSERT OR REPLACE
-                cursor.execute('''
-                    INSERT OR REPLACE INTO videos
-                    (video_id, video_url, video_url_backup, video_image, video_title, video_category,
-                     video_tags, play_count, upload_time, video_duration, video_coins, updated_at)
-                    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-                ''', (
-                    video_data.get('video_id'),
-                    video_data.get('video_url'),
-                    video_data.get('video_url_backup', ''),
-                    video_data.get('video_image', ''),
-                    video_data.get('video_title'),
-                    video_data.get('video_category', ''),
-                    video_data.get('video_tags', ''),
-                    video_data.get('play_count', 0),
-                    video_data.get('upload_time', ''),
-                    video_data.get('video_duration', ''),
-                    video_data.get('video_coins', 0),
-                    datetime.now().isoformat()
-                ))
-
-            self.connection.commit()
-            return True
-        except Exception as e:
-            logger.error(f"插入视频失败: {e}")
-            self._log(f"❌ 插入视频失败: {e}")
-            return False
+            # 存入 _search_document 切好的词 (空格分隔), unicode61 只负责按空格拆分
+            cursor.execute('''
+                CREATE VIRTUAL TABLE IF NOT EXISTS videos_fts USING fts5(
+                    title, tags, tokenize = 'unicode61'
+                )
+            ''')
+        except sqlite3.OperationalError as e:
+            # SQLite 未编译 FTS5 时保留 LIKE 搜索
+            logger.warning(f"FTS5 不可用, 搜索将回退为 LIKE 匹配: {e}")
+            return
+        self._fts_tables[self.db_path] = True
+        cursor.execute('DELETE FROM videos_fts')
+        for rows in self._iter_video_rows(cursor, ('video_id', 'video_title', 'video_tags')):
+            self._sync_search_index(cursor, {}, {row['video_id']: row for row in rows})
 
-    def insert_videos(self, videos: List[Dict[str, Any]]) -> int:
+    def _migration_v4(self, cursor) -> None:
         """
-        批量插入视频记录
+        v4: 空迁移, 保留版本号
 
-        Args:
-            videos: 视频数据列表
+        列表排序键是 COALESCE(upload_time, ...) 表达式, upload_time 上的复合索引无法用于排序,
+        游标分页所需的索引改由 v5 在持久化的 sort_date 列上建立。
+        """
 
-        Returns:
+    def _migration_v5(self, cursor) -> None:
+        """v5: 持久化排序键 sort_date, 列表查询按复合索引顺序读取前 N 行而无需排序"""
+        self._add_column(cursor, 'videos', 'sort_date', 'INTEGER NOT NULL DEFAULT 0',
+                         'BIGINT NOT NULL DEFAULT 0')
+        placeholder = '%s' if self.use_mysql else '?'
+        for rows in self._iter_video_rows(cursor, ('video_id', 'upload_time')):
+            updates = [(self._sort_date(row['upload_time']), row['video_id'])
+                       for row in rows if self._sort_date(row['upload_time'])]
+            if updates:
+                cursor.executemany(
+                    f'UPDATE videos SET sort_date = {placeholder} WHERE video_id = {placeholder}',
+                    updates
+                )
+        self._create_index(cursor, 'videos', 'idx_video_category_sort',
+                           'video_category, sort_date, created_at, video_id')
+        self._create_index(cursor, 'videos', 'idx_video_sort',
+                           'sort_date, created_at, video_id')
+        # 早期版本的 v4 在 upload_time 上建过这两个索引, 已升级过的数据库在此删除
+        self._drop_index(cursor, 'videos', 'idx_video_category_order')
+        self._drop_index(cursor, 'videos', 'idx_video_order')
+
+    def _migration_v6(self, cursor) -> None:
+        """v6: 按分类维护的视频数/播放总数/示例图片, 并从 videos 全量构建一次"""
+        if self.use_mysql:
+            # 与 videos.video_category 相同的排序规则, 分组语义与原 GROUP BY 一致
+            cursor.execute('''
+                CREATE TABLE IF NOT EXISTS category_stats (
+                    video_category VARCHAR(100) NOT NULL PRIMARY KEY,
+                    video_count BIGINT NOT NULL DEFAULT 0,
+                    play_total BIGINT NOT NULL DEFAULT 0,
+                    sample_image TEXT
+                ) CHARACTER SET utf8mb4 COLLATE utf8mb4_unicode_ci
+            ''')
+        else:
+            cursor.execute('''
+                CREATE TABLE IF NOT EXISTS category_stats (
+                    video_category TEXT NOT NULL PRIMARY KEY,
+                    video_count INTEGER NOT NULL DEFAULT 0,
+                    play_total INTEGER NOT NULL DEFAULT 0,
+                    sample_image TEXT
+                )
+            ''')
+        self._rebuild_category_stats(cursor)
+
+    def _migration_v7(self, cursor) -> None:
+        """v7: (分类, 标签) -> 视频数 与 全站标签视频数, 并从 video_tag 全量构建一次"""
+        if self.use_mysql:
+            cursor.execute('''
+                CREATE TABLE IF NOT EXISTS category_tag_stats (
+                    video_category VARCHAR(100) NOT NULL,
+                    tag_id INT NOT NULL,
+                    video_count INT NOT NULL DEFAULT 0,
+                    PRIMARY KEY (video_category, tag_id)
+                ) CHARACTER SET utf8mb4 COLLATE utf8mb4_unicode_ci
+            ''')
+        else:
+            cursor.execute('''
+                CREATE TABLE IF NOT EXISTS category_tag_stats (
+                    video_category TEXT NOT NULL,
+                    tag_id INTEGER NOT NULL,
+                    video_count INTEGER NOT NULL DEFAULT 0,
+                    PRIMARY KEY (video_category, tag_id)
+                ) WITHOUT ROWID
+            ''')
+        # 按数量倒序读取前 N 个标签时直接沿索引顺序, 无需排序
+        self._create_index(cursor, 'category_tag_stats', 'idx_category_tag_stats_count',
+                           'video_category, video_count DESC, tag_id')
+        self._add_column(cursor, 'tags', 'video_count', 'INTEGER NOT NULL DEFAULT 0')
+        self._create_index(cursor, 'tags', 'idx_tags_video_count', 'video_count DESC, tag_id')
+        self._rebuild_category_tag_stats(cursor)
+
+    def _migration_v8(self, cursor) -> None:
+        """v8: 写入时计算的规范化标题 title_norm, 供标题查重与按标题查找走索引"""
+        self._add_column(cursor, 'videos', 'title_norm', "TEXT NOT NULL DEFAULT ''",
+                         "VARCHAR(500) NOT NULL DEFAULT ''")
+        placeholder = '%s' if self.use_mysql else '?'
+        for rows in self._iter_video_rows(cursor, ('video_id', 'video_title')):
+            cursor.executemany(
+                f'UPDATE videos SET title_norm = {placeholder} WHERE video_id = {placeholder}',
+                [(self._normalize_title(row['video_title']), row['video_id']) for row in rows]
+            )
+        self._create_index(cursor, 'videos', 'idx_video_title_norm', 'title_norm')
+
+    def _migration_v9(self, cursor) -> None:
+        """v9: 写入时推导的系列名与集数排序键, 合集查询按索引范围读取且无需排序"""
+        # 二进制排序规则: 与 Python 中按字符串精确比较/排序的语义一致
+        self._add_column(cursor, 'videos', 'series_key', "TEXT NOT NULL DEFAULT ''",
+                         "VARCHAR(191) CHARACTER SET utf8mb4 COLLATE utf8mb4_bin NOT NULL DEFAULT ''")
+        self._add_column(cursor, 'videos', 'episode_key', "TEXT NOT NULL DEFAULT ''",
+                         "VARCHAR(512) CHARACTER SET utf8mb4 COLLATE utf8mb4_bin NOT NULL DEFAULT ''")
+        self._backfill_derived_columns(cursor, ('series_key', 'episode_key'))
+        self._create_index(cursor, 'videos', 'idx_video_series', 'series_key, episode_key')
+
+    def _migration_v10(self, cursor) -> None:
+        """v10: 每个视频一个 HyperLogLog 观看者草图 (256 字节), 估算值冗余到 videos.unique_viewers"""
+        if self.use_mysql:
+            cursor.execute('''
+                CREATE TABLE IF NOT EXISTS video_viewers (
+                    video_id BIGINT NOT NULL PRIMARY KEY,
+                    sketch VARBINARY(256) NOT NULL
+                )
+            ''')
+        else:
+            cursor.execute('''
+                CREATE TABLE IF NOT EXISTS video_viewers (
+                    video_id INTEGER NOT NULL PRIMARY KEY,
+                    sketch BLOB NOT NULL
+                )
+            ''')
+        self._add_column(cursor, 'videos', 'unique_viewers', 'INTEGER NOT NULL DEFAULT 0')
+
+    def _migration_v11(self, cursor) -> None:
+        """v11: 按小时的播放桶、前向衰减热度分数及其基准时间 (已有播放数没有时间信息, 不回填)"""
+        score_columns = [column for column, _ in self.TRENDING_WINDOWS.values()]
+        if self.use_mysql:
+            cursor.execute('''
+                CREATE TABLE IF NOT EXISTS video_play_hourly (
+                    video_id BIGINT NOT NULL,
+                    bucket_hour INT NOT NULL,
+                    plays INT NOT NULL DEFAULT 0,
+                    PRIMARY KEY (video_id, bucket_hour)
+                )
+            ''')
+            scores = ', '.join(f'{column} DOUBLE NOT NULL DEFAULT 0' for column in score_columns)
+            cursor.execute(f'''
+                CREATE TABLE IF NOT EXISTS video_trending (
+                    video_id BIGINT NOT NULL PRIMARY KEY,
+                    video_category VARCHAR(100) NOT NULL DEFAULT '',
+                    {scores}
+                ) CHARACTER SET utf8mb4 COLLATE utf8mb4_unicode_ci
+            ''')
+            cursor.execute('''
+                CREATE TABLE IF NOT EXISTS trending_meta (
+                    id INT NOT NULL PRIMARY KEY,
+                    landmark BIGINT NOT NULL
+                )
+            ''')
+            cursor.execute('INSERT IGNORE INTO trending_meta (id, landmark) VALUES (1, %s)',
+                           (self._trending_hour() * 3600,))
+        else:
+            cursor.execute('''
+                CREATE TABLE IF NOT EXISTS video_play_hourly (
+                    video_id INTEGER NOT NULL,
+                    bucket_hour INTEGER NOT NULL,
+                    plays INTEGER NOT NULL DEFAULT 0,
+                    PRIMARY KEY (video_id, bucket_hour)
+                ) WITHOUT ROWID
+            ''')
+            scores = ', '.join(f'{column} REAL NOT NULL DEFAULT 0' for column in score_columns)
+            cursor.execute(f'''
+                CREATE TABLE IF NOT EXISTS video_trending (
+                    video_id INTEGER NOT NULL PRIMARY KEY,
+                    video_category TEXT NOT NULL DEFAULT '',
+                    {scores}
+                )
+            ''')
+            cursor.execute('''
+                CREATE TABLE IF NOT EXISTS trending_meta (
+                    id INTEGER NOT NULL PRIMARY KEY,
+                    landmark INTEGER NOT NULL
+                )
+            ''')
+            cursor.execute('INSERT OR IGNORE INTO trending_meta (id, landmark) VALUES (1, ?)',
+                           (self._trending_hour() * 3600,))
+        self._create_index(cursor, 'video_play_hourly', 'idx_play_hourly_hour', 'bucket_hour')
+        # 榜单直接沿分数索引倒序读取前 K 行
+        for column in score_columns:
+            self._create_index(cursor, 'video_trending', f'idx_trending_{column}', f'{column} DESC')
+            self._create_index(cursor, 'video_trending', f'idx_trending_category_{column}',
+                               f'video_category, {column} DESC')
+
+    def _migration_v12(self, cursor) -> None:
+        """v12: 全站与分类内的连续序号 (0..n-1), 随机抽样按序号直接定位, 无需全表排序"""
+        self._add_column(cursor, 'videos', 'sample_rank', 'INTEGER NOT NULL DEFAULT -1')
+        self._add_column(cursor, 'videos', 'category_rank', 'INTEGER NOT NULL DEFAULT -1')
+        self._rebuild_sample_ranks(cursor)
+        self._create_index(cursor, 'videos', 'idx_video_sample_rank', 'sample_rank')
+        self._create_index(cursor, 'videos', 'idx_video_category_rank', 'video_category, category_rank')
+
+    def _migration_v13(self, cursor) -> None:
+        """v13: 预先计算的相关视频近邻表; 已有视频全部加入待计算队列, 由 --update-related 计算"""
+        if self.use_mysql:
+            cursor.execute('''
+                CREATE TABLE IF NOT EXISTS related_videos (
+                    video_id BIGINT NOT NULL,
+                    related_id BIGINT NOT NULL,
+                    score DOUBLE NOT NULL,
+                    PRIMARY KEY (video_id, related_id)
+                )
+            ''')
+            cursor.execute('''
+                CREATE TABLE IF NOT EXISTS related_dirty (
+                    video_id BIGINT NOT NULL PRIMARY KEY
+                )
+            ''')
+            cursor.execute('INSERT IGNORE INTO related_dirty (video_id) SELECT video_id FROM videos')
+        else:
+            cursor.execute('''
+                CREATE TABLE IF NOT EXISTS related_videos (
+                    video_id INTEGER NOT NULL,
+                    related_id INTEGER NOT NULL,
+                    score REAL NOT NULL,
+                    PRIMARY KEY (video_id, related_id)
+                ) WITHOUT ROWID
+            ''')
+            cursor.execute('''
+                CREATE TABLE IF NOT EXISTS related_dirty (
+                    video_id INTEGER NOT NULL PRIMARY KEY
+                )
+            ''')
+            cursor.execute('INSERT OR IGNORE INTO related_dirty (video_id) SELECT video_id FROM videos')
+        self._create_index(cursor, 'related_videos', 'idx_related_score', 'video_id, score DESC')
+        self._create_index(cursor, 'related_videos', 'idx_related_target', 'related_id')
+
+    def _migration_v14(self, cursor) -> None:
+        """v14: 数据版本计数 (scope 为 global 或 category:<分类>), 写入时在同一事务内递增"""
+        if self.use_mysql:
+            cursor.execute('''
+                CREATE TABLE IF NOT EXISTS data_version (
+                    scope VARCHAR(150) NOT NULL PRIMARY KEY,
+                    version BIGINT NOT NULL DEFAULT 0,
+                    updated_at BIGINT NOT NULL DEFAULT 0
+                ) CHARACTER SET utf8mb4 COLLATE utf8mb4_unicode_ci
+            ''')
+            cursor.execute(
+                "INSERT IGNORE INTO data_version (scope, version, updated_at) VALUES ('global', 1, %s)",
+                (int(time.time()),)
+            )
+        else:
+            cursor.execute('''
+                CREATE TABLE IF NOT EXISTS data_version (
+                    scope TEXT NOT NULL PRIMARY KEY,
+                    version INTEGER NOT NULL DEFAULT 0,
+                    updated_at INTEGER NOT NULL DEFAULT 0
+                ) WITHOUT ROWID
+            ''')
+            cursor.execute(
+                "INSERT OR IGNORE INTO data_version (scope, version, updated_at) VALUES ('global', 1, ?)",
+                (int(time.time()),)
+            )
+
+    def _migration_v15(self, cursor) -> None:
+        """v15: 相关推荐的持久倒排表 (特征 -> 视频及基础权重) 与各特征的视频数, 从 videos 全量构建一次"""
+        if self.use_mysql:
+            # 特征区分大小写与全半角 (与 Python 中的字符串比较一致), 使用二进制排序规则
+            cursor.execute('''
+                CREATE TABLE IF NOT EXISTS related_features (
+                    feature VARCHAR(100) NOT NULL,
+                    video_id BIGINT NOT NULL,
+                    weight DOUBLE NOT NULL,
+                    PRIMARY KEY (feature, video_id)
+                ) CHARACTER SET utf8mb4 COLLATE utf8mb4_bin
+            ''')
+            cursor.execute('''
+                CREATE TABLE IF NOT EXISTS related_feature_stats (
+                    feature VARCHAR(100) NOT NULL PRIMARY KEY,
+                    video_count INT NOT NULL DEFAULT 0
+                ) CHARACTER SET utf8mb4 COLLATE utf8mb4_bin
+            ''')
+        else:
+            cursor.execute('''
+                CREATE TABLE IF NOT EXISTS related_features (
+                    feature TEXT NOT NULL,
+                    video_id INTEGER NOT NULL,
+                    weight REAL NOT NULL,
+                    PRIMARY KEY (feature, video_id)
+                ) WITHOUT ROWID
+            ''')
+            cursor.execute('''
+                CREATE TABLE IF NOT EXISTS related_feature_stats (
+                    feature TEXT NOT NULL PRIMARY KEY,
+                    video_count INTEGER NOT NULL DEFAULT 0
+                ) WITHOUT ROWID
+            ''')
+        self._create_index(cursor, 'related_features', 'idx_related_features_video', 'video_id')
+        self._rebuild_related_features(cursor)
+
+    # ==================== 派生索引维护 (Derived index maintenance) ====================
+
+    # 派生结构 (标签索引等) 依赖的 videos 列, 写入前后各取一次快照用于计算增量
+    _INDEX_SNAPSHOT_COLUMNS: Tuple[str, ...] = (
+        'video_id', 'video_title', 'video_tags', 'video_category', 'play_count', 'video_image',
+        'sample_rank', 'category_rank'
+    )
+
+    # 单条 IN (...) 查询的最大参数个数 (SQLite 旧版本上限为 999)
+    _IN_CHUNK_SIZE = 500
+
+    @staticmethod
+    def _int_ids(values: Any) -> List[int]:
+        """归一化为去重后的整数ID列表 (保持顺序), 过滤无效值"""
+        ids: List[int] = []
+        seen = set()
+        for value in values or []:
+            try:
+                iv = int(value)
+            except (TypeError, ValueError):
+                continue
+            if iv not in seen:
+                seen.add(iv)
+                ids.append(iv)
+        return ids
+
+    @staticmethod
+    def _parse_tags(raw: Optional[str]) -> List[str]:
+        """把逗号分隔的 video_tags 拆成去重、去空白的标签列表"""
+        tags: List[str] = []
+        for tag in str(raw or '').split(','):
+            tag = tag.strip()[:191]
+            if tag and tag not in tags:
+                tags.append(tag)
+        return tags
+
+    def _iter_video_rows(self, cursor, columns: Tuple[str, ...],
+                         batch_size: int = 1000):
+        """按 video_id 顺序分页遍历 videos 表 (用于回填, 避免一次性载入全表)"""
+        placeholder = '%s' if self.use_mysql else '?'
+        last_id = None
+        while True:
+            if last_id is None:
+                cursor.execute(
+                    f"SELECT {', '.join(columns)} FROM videos ORDER BY video_id LIMIT {placeholder}",
+                    (batch_size,)
+                )
+            else:
+                cursor.execute(
+                    f"SELECT {', '.join(columns)} FROM videos WHERE video_id > {placeholder} "
+                    f"ORDER BY video_id LIMIT {placeholder}",
+                    (last_id, batch_size)
+                )
+            rows = [dict(row) for row in cursor.fetchall()]
+            if not rows:
+                return
+            yield rows
+            last_id = rows[-1]['video_id']
+
+    def _snapshot_videos(self, cursor, video_ids: Any) -> Dict[int, Dict[str, Any]]:
+        """读取派生结构所依赖的列, 返回 {video_id: row}"""
+        ids = self._int_ids(video_ids)
+        placeholder = '%s' if self.use_mysql else '?'
+        snapshot: Dict[int, Dict[str, Any]] = {}
+        for start in range(0, len(ids), self._IN_CHUNK_SIZE):
+            chunk = ids[start:start + self._IN_CHUNK_SIZE]
+            cursor.execute(
+                f"SELECT {', '.join(self._INDEX_SNAPSHOT_COLUMNS)} FROM videos "
+                f"WHERE video_id IN ({', '.join([placeholder] * len(chunk))})",
+                chunk
+            )
+            for row in cursor.fetchall():
+                row = dict(row)
+                snapshot[int(row['video_id'])] = row
+        return snapshot
+
+    def _reindex_videos(self, cursor, before: Dict[int, Dict[str, Any]],
+                        after: Dict[int, Dict[str, Any]]) -> None:
+        """
+        根据写入前后的快照增量维护所有派生结构 (与写入处于同一事务)
+
+        before 中有而 after 中没有的视频视为已删除; 前后一致的视频不做任何写入。
+        """
+        self._note_video_changes(before, after)
+        changed_before = {vid: row for vid, row in before.items() if after.get(vid) != row}
+        changed_after = {vid: row for vid, row in after.items() if before.get(vid) != row}
+        if not changed_before and not changed_after:
+            return
+        self._sync_tag_index(cursor, changed_before, changed_after)
+        self._sync_search_index(cursor, changed_before, changed_after)
+        self._sync_category_stats(cursor, changed_before, changed_after)
+        self._sync_category_tag_stats(cursor, changed_before, changed_after)
+        self._sync_trending(cursor, changed_before, changed_after)
+        self._sync_sample_ranks(cursor, changed_before, changed_after)
+        self._sync_related(cursor, changed_before, changed_after)
+        deleted = [vid for vid in before if vid not in after]
+        if deleted:
+            self._drop_play_stats(cursor, deleted)
+
+    def _note_video_changes(self, before: Dict[int, Dict[str, Any]],
+                            after: Dict[int, Dict[str, Any]]) -> None:
+        """
+        记录本事务写入的视频涉及的数据标签, 提交后由 _commit 通知 on_change
+
+        快照只含派生结构依赖的列, 其余列 (如播放地址、时长) 的修改看不出来,
+        因此写入过的视频一律记为已变更。
+        """
+        self._changed.add('videos')
+        for vid in set(before) | set(after):
+            self._changed.add(f'video:{vid}')
+            old_category = before[vid]['video_category'] if vid in before else None
+            new_category = after[vid]['video_category'] if vid in after else None
+            for category in (old_category, new_category):
+                if category:
+                    self._changed.add(f'category:{category}')
+            if vid not in before or vid not in after or old_category != new_category:
+                self._changed.add('categories')
+
+    def _commit(self) -> None:
+        """
+        递增数据版本并提交事务, 然后把本事务变更的数据标签交给 on_change (用于缓存失效)
+
+        标签: videos (任意视频写入)、video:<ID>、category:<分类>、
+        categories (分类成员变化: 新增/删除/改分类)、nav_categories、carousel。
+        播放数的批量写入 (apply_play_counts) 不产生标签, 依赖缓存 TTL (单条的 update_play_count 除外)。
+        """
+        changed, self._changed = self._changed, set()
+        if changed:
+            self._bump_data_versions(self.connection.cursor(), changed)
+        self.connection.commit()
+        if changed and self._on_change is not None:
+            try:
+                self._on_change(changed)
+            except Exception as e:
+                logger.warning(f"变更通知失败 (on_change failed): {e}")
+
+    def _bump_data_versions(self, cursor, changed: Set[str]) -> None:
+        """递增 global 以及变更涉及的 category:<分类> 的数据版本 (与写入处于同一事务)"""
+        scopes = ['global'] + sorted(tag for tag in changed if tag.startswith('category:'))
+        now = int(time.time())
+        if self.use_mysql:
+            sql = ('INSERT INTO data_version (scope, version, updated_at) VALUES (%s, 1, %s) '
+                   'ON DUPLICATE KEY UPDATE version = version + 1, updated_at = VALUES(updated_at)')
+        else:
+            sql = ('INSERT INTO data_version (scope, version, updated_at) VALUES (?, 1, ?) '
+                   'ON CONFLICT(scope) DO UPDATE SET version = version + 1, updated_at = excluded.updated_at')
+        cursor.executemany(sql, [(scope, now) for scope in scopes])
+
+    def get_data_version(self, scope: str = 'global') -> Tuple[int, int]:
+        """
+        读取数据版本 (Read a data version counter)
+
+        Args:
+            scope: global 或 category:<分类>
+
+        Returns:
+            (版本号, 最后写入的 Unix 时间戳), 从未写入过的 scope 为 (0, 0)
+        """
+        placeholder = '%s' if self.use_mysql else '?'
+        cursor = self.connection.cursor()
+        cursor.execute(
+            f'SELECT version, updated_at FROM data_version WHERE scope = {placeholder}', (scope,)
+        )
+        row = cursor.fetchone()
+        if not row:
+            return 0, 0
+        row = dict(row)
+        return int(row['version']), int(row['updated_at'])
+
+    def _last_sample_rank(self, cursor, category: Optional[str] = None,
+                          for_update: bool = False) -> int:
+        """
+        当前最大序号 (没有时为 -1), 沿序号索引读取一行
+
+        for_update 供分配/回填序号的写入使用: MySQL 上以锁定读锁住索引末尾,
+        并发写入不会分配到相同的序号; 抽样读取不加锁。
+        """
+        placeholder = '%s' if self.use_mysql else '?'
+        lock = ' FOR UPDATE' if for_update and self.use_mysql else ''
+        if category is None:
+            cursor.execute(f'SELECT sample_rank AS r FROM videos ORDER BY sample_rank DESC LIMIT 1{lock}')
+        else:
+            cursor.execute(
+                f'SELECT category_rank AS r FROM videos WHERE video_category = {placeholder} '
+                f'ORDER BY category_rank DESC LIMIT 1{lock}',
+                (category,)
+            )
+        row = cursor.fetchone()
+        return int(row['r']) if row else -1
+
+    def _fill_rank_holes(self, cursor, holes: List[int], category: Optional[str] = None) -> None:
+        """
+        删除/移出若干视频后保持序号连续: 把排在末尾的视频移到空出的序号上
+
+        holes 为已移出视频原来的序号。移出前共有 n 个序号, 移出后应为 0..n-len(holes)-1,
+        大于等于新长度的剩余视频正好填满新长度以内的空位。
+        """
+        if not holes:
+            return
+        placeholder = '%s' if self.use_mysql else '?'
+        column = 'sample_rank' if category is None else 'category_rank'
+        where = '' if category is None else f'video_category = {placeholder} AND '
+        scope: List[Any] = [] if category is None else [category]
+
+        size = max(self._last_sample_rank(cursor, category, for_update=True), max(holes)) + 1 - len(holes)
+        targets = sorted(hole for hole in holes if 0 <= hole < size)
+        cursor.execute(
+            f'SELECT video_id FROM videos WHERE {where}{column} >= {placeholder} ORDER BY {column}',
+            scope + [size]
+        )
+        movers = [int(row['video_id']) for row in cursor.fetchall()]
+        cursor.executemany(
+            f'UPDATE videos SET {column} = {placeholder} WHERE video_id = {placeholder}',
+            list(zip(targets, movers))
+        )
+
+    def _append_ranks(self, cursor, video_ids: List[int], category: Optional[str] = None) -> None:
+        """为新加入 (全站或某分类) 的视频分配末尾的序号"""
+        if not video_ids:
+            return
+        placeholder = '%s' if self.use_mysql else '?'
+        column = 'sample_rank' if category is None else 'category_rank'
+        start = self._last_sample_rank(cursor, category, for_update=True) + 1
+        cursor.executemany(
+            f'UPDATE videos SET {column} = {placeholder} WHERE video_id = {placeholder}',
+            [(start + offset, vid) for offset, vid in enumerate(sorted(video_ids))]
+        )
+
+    def _sync_sample_ranks(self, cursor, before: Dict[int, Dict[str, Any]],
+                           after: Dict[int, Dict[str, Any]]) -> None:
+        """
+        维护随机抽样使用的连续序号: 新增视频追加到末尾, 删除视频由末尾视频补位,
+        改分类的视频从原分类移出并追加到新分类末尾。每次写入只改动 O(变更数) 行。
+        """
+        placeholder = '%s' if self.use_mysql else '?'
+        removed: Dict[str, List[int]] = {}
+        added: Dict[str, List[int]] = {}
+        moved: List[int] = []
+        for vid, old in before.items():
+            new = after.get(vid)
+            old_category = old.get('video_category') or ''
+            if new is not None and (new.get('video_category') or '') == old_category:
+                continue
+            if int(old.get('category_rank', -1)) >= 0:
+                removed.setdefault(old_category, []).append(int(old['category_rank']))
+            if new is not None:
+                moved.append(vid)
+                added.setdefault(new.get('video_category') or '', []).append(vid)
+        inserted = [vid for vid in after if vid not in before]
+        for vid in inserted:
+            added.setdefault(after[vid].get('video_category') or '', []).append(vid)
+
+        # 先把改分类视频的旧序号作废, 以免被计入新分类的末尾
+        cursor.executemany(f'UPDATE videos SET category_rank = -1 WHERE video_id = {placeholder}',
+                           [(vid,) for vid in moved])
+        self._fill_rank_holes(cursor, [int(row.get('sample_rank', -1)) for vid, row in before.items()
+                                       if vid not in after and int(row.get('sample_rank', -1)) >= 0])
+        for category, holes in removed.items():
+            self._fill_rank_holes(cursor, holes, category)
+        self._append_ranks(cursor, inserted)
+        for category, video_ids in added.items():
+            self._append_ranks(cursor, video_ids, category)
+
+    def _rebuild_sample_ranks(self, cursor) -> None:
+        """按 video_id 顺序重新编排全站与分类内的连续序号"""
+        placeholder = '%s' if self.use_mysql else '?'
+        next_rank = 0
+        category_next: Dict[str, int] = {}
+        for rows in self._iter_video_rows(cursor, ('video_id', 'video_category')):
+            updates = []
+            for row in rows:
+                category = row['video_category'] or ''
+                updates.append((next_rank, category_next.get(category, 0), row['video_id']))
+                category_next[category] = category_next.get(category, 0) + 1
+                next_rank += 1
+            cursor.executemany(
+                f'UPDATE videos SET sample_rank = {placeholder}, category_rank = {placeholder} '
+                f'WHERE video_id = {placeholder}',
+                updates
+            )
+
+    def _sync_related(self, cursor, before: Dict[int, Dict[str, Any]],
+                      after: Dict[int, Dict[str, Any]]) -> None:
+        """
+        相关推荐的增量维护: 标题/标签/分类变化或新增的视频加入待计算队列;
+        删除的视频立即从近邻表移除, 原先把它列为近邻的视频也加入队列
+        """
+        placeholder = '%s' if self.use_mysql else '?'
+        fields = ('video_title', 'video_tags', 'video_category')
+        dirty = [vid for vid, row in after.items()
+                 if vid not in before or any(before[vid].get(f) != row.get(f) for f in fields)]
+        deleted = [vid for vid in before if vid not in after]
+        for start in range(0, len(deleted), self._IN_CHUNK_SIZE):
+            chunk = deleted[start:start + self._IN_CHUNK_SIZE]
+            in_list = ', '.join([placeholder] * len(chunk))
+            cursor.execute(f'SELECT DISTINCT video_id FROM related_videos WHERE related_id IN ({in_list})',
+                           chunk)
+            dirty.extend(int(row['video_id']) for row in cursor.fetchall())
+            cursor.execute(f'DELETE FROM related_videos WHERE video_id IN ({in_list})', chunk)
+            cursor.execute(f'DELETE FROM related_videos WHERE related_id IN ({in_list})', chunk)
+            cursor.execute(f'DELETE FROM related_dirty WHERE video_id IN ({in_list})', chunk)
+        dirty = [vid for vid in dict.fromkeys(dirty) if vid not in before or vid in after]
+        if dirty:
+            insert = 'INSERT IGNORE INTO' if self.use_mysql else 'INSERT OR IGNORE INTO'
+            cursor.executemany(f'{insert} related_dirty (video_id) VALUES ({placeholder})',
+                               [(vid,) for vid in dirty])
+        self._sync_related_features(cursor, before, after)
+
+    def _sync_related_features(self, cursor, before: Dict[int, Dict[str, Any]],
+                               after: Dict[int, Dict[str, Any]]) -> None:
+        """按标题/标签变化增量维护倒排表 related_features 与 related_feature_stats"""
+        placeholder = '%s' if self.use_mysql else '?'
+        removed: List[Tuple[str, int]] = []
+        added: List[Tuple[str, int, float]] = []
+        deltas: Dict[str, int] = {}
+        for vid in set(before) | set(after):
+            old, new = before.get(vid) or {}, after.get(vid) or {}
+            if (bool(old) == bool(new) and old.get('video_title') == new.get('video_title')
+                    and old.get('video_tags') == new.get('video_tags')):
+                continue
+            old_features = self._related_features(old) if old else {}
+            new_features = self._related_features(new) if new else {}
+            for feature in old_features.keys() - new_features.keys():
+                removed.append((feature, vid))
+                deltas[feature] = deltas.get(feature, 0) - 1
+            for feature in new_features.keys() - old_features.keys():
+                added.append((feature, vid, new_features[feature]))
+                deltas[feature] = deltas.get(feature, 0) + 1
+        if removed:
+            cursor.executemany(
+                f'DELETE FROM related_features WHERE feature = {placeholder} AND video_id = {placeholder}',
+                removed
+            )
+        if added:
+            insert = 'INSERT IGNORE INTO' if self.use_mysql else 'INSERT OR IGNORE INTO'
+            cursor.executemany(
+                f'{insert} related_features (feature, video_id, weight) '
+                f'VALUES ({placeholder}, {placeholder}, {placeholder})',
+                added
+            )
+        deltas = {feature: delta for feature, delta in deltas.items() if delta}
+        if deltas:
+            if self.use_mysql:
+                sql = ('INSERT INTO related_feature_stats (feature, video_count) VALUES (%s, %s) '
+                       'ON DUPLICATE KEY UPDATE video_count = video_count + VALUES(video_count)')
+            else:
+                sql = ('INSERT INTO related_feature_stats (feature, video_count) VALUES (?, ?) '
+                       'ON CONFLICT(feature) DO UPDATE SET video_count = video_count + excluded.video_count')
+            cursor.executemany(sql, list(deltas.items()))
+            cursor.execute('DELETE FROM related_feature_stats WHERE video_count <= 0')
+
+    def _rebuild_related_features(self, cursor) -> None:
+        """从 videos 全量重建 related_features 与 related_feature_stats"""
+        placeholder = '%s' if self.use_mysql else '?'
+        cursor.execute('DELETE FROM related_features')
+        cursor.execute('DELETE FROM related_feature_stats')
+        counts: Dict[str, int] = {}
+        for rows in self._iter_video_rows(cursor, ('video_id', 'video_title', 'video_tags')):
+            postings = []
+            for row in rows:
+                for feature, weight in self._related_features(row).items():
+                    postings.append((feature, row['video_id'], weight))
+                    counts[feature] = counts.get(feature, 0) + 1
+            if postings:
+                cursor.executemany(
+                    f'INSERT INTO related_features (feature, video_id, weight) '
+                    f'VALUES ({placeholder}, {placeholder}, {placeholder})',
+                    postings
+                )
+        items = list(counts.items())
+        for start in range(0, len(items), BULK_CHUNK_SIZE):
+            cursor.executemany(
+                f'INSERT INTO related_feature_stats (feature, video_count) VALUES ({placeholder}, {placeholder})',
+                items[start:start + BULK_CHUNK_SIZE]
+            )
+
+    def _drop_play_stats(self, cursor, video_ids: List[int]) -> None:
+        """删除已删除视频的观看者草图与热度 (播放桶过期后自然清理)"""
+        placeholder = '%s' if self.use_mysql else '?'
+        for start in range(0, len(video_ids), self._IN_CHUNK_SIZE):
+            chunk = video_ids[start:start + self._IN_CHUNK_SIZE]
+            in_list = ', '.join([placeholder] * len(chunk))
+            cursor.execute(f'DELETE FROM video_viewers WHERE video_id IN ({in_list})', chunk)
+            cursor.execute(f'DELETE FROM video_trending WHERE video_id IN ({in_list})', chunk)
+
+    def _sync_trending(self, cursor, before: Dict[int, Dict[str, Any]],
+                       after: Dict[int, Dict[str, Any]]) -> None:
+        """视频改分类时同步热度表中冗余的分类"""
+        placeholder = '%s' if self.use_mysql else '?'
+        moved = [((row.get('video_category') or ''), vid) for vid, row in after.items()
+                 if vid in before and (before[vid].get('video_category') or '') !=
+                 (row.get('video_category') or '')]
+        if moved:
+            cursor.executemany(
+                f'UPDATE video_trending SET video_category = {placeholder} '
+                f'WHERE video_id = {placeholder}',
+                moved
+            )
+
+    def _ensure_tag_ids(self, cursor, names: List[str]) -> Dict[str, int]:
+        """查询 (不存在时创建) 标签ID, 返回 {tag_name: tag_id}"""
+        if not names:
+            return {}
+        if self.use_mysql:
+            cursor.executemany('INSERT IGNORE INTO tags (tag_name) VALUES (%s)',
+                               [(name,) for name in names])
+        else:
+            cursor.executemany('INSERT OR IGNORE INTO tags (tag_name) VALUES (?)',
+                               [(name,) for name in names])
+        return self._lookup_tag_ids(cursor, names)
+
+    def _lookup_tag_ids(self, cursor, names: List[str]) -> Dict[str, int]:
+        """查询已存在的标签ID, 返回 {tag_name: tag_id} (不存在的标签不在结果中)"""
+        placeholder = '%s' if self.use_mysql else '?'
+        found: Dict[str, int] = {}
+        names = list(dict.fromkeys(names))
+        for start in range(0, len(names), self._IN_CHUNK_SIZE):
+            chunk = names[start:start + self._IN_CHUNK_SIZE]
+            cursor.execute(
+                f"SELECT tag_id, tag_name FROM tags "
+                f"WHERE tag_name IN ({', '.join([placeholder] * len(chunk))})",
+                chunk
+            )
+            for row in cursor.fetchall():
+                found[row['tag_name']] = int(row['tag_id'])
+        return found
+
+    def _sync_tag_index(self, cursor, before: Dict[int, Dict[str, Any]],
+                        after: Dict[int, Dict[str, Any]]) -> None:
+        """按标签增减维护 video_tag 关联表"""
+        removed: List[Tuple[int, str]] = []
+        added: List[Tuple[int, str]] = []
+        for vid in set(before) | set(after):
+            old_tags = self._parse_tags((before.get(vid) or {}).get('video_tags'))
+            new_tags = self._parse_tags((after.get(vid) or {}).get('video_tags'))
+            if old_tags == new_tags:
+                continue
+            removed.extend((vid, tag) for tag in old_tags if tag not in new_tags)
+            added.extend((vid, tag) for tag in new_tags if tag not in old_tags)
+
+        placeholder = '%s' if self.use_mysql else '?'
+        if removed:
+            tag_ids = self._lookup_tag_ids(cursor, [tag for _, tag in removed])
+            cursor.executemany(
+                f'DELETE FROM video_tag WHERE tag_id = {placeholder} AND video_id = {placeholder}',
+                [(tag_ids[tag], vid) for vid, tag in removed if tag in tag_ids]
+            )
+        if added:
+            tag_ids = self._ensure_tag_ids(cursor, [tag for _, tag in added])
+            insert = 'INSERT IGNORE INTO' if self.use_mysql else 'INSERT OR IGNORE INTO'
+            cursor.executemany(
+                f'{insert} video_tag (tag_id, video_id) VALUES ({placeholder}, {placeholder})',
+                [(tag_ids[tag], vid) for vid, tag in added]
+            )
+
+    @staticmethod
+    def _search_tokens(text: Optional[str], query: bool = False) -> List[List[str]]:
+        """
+        全文检索分词: 返回词组列表, 每个词组对应原文中连续的一段文字
+
+        中日韩文字切成重叠的二元组 (bigram), 建索引时每段末尾再补一个单字,
+        使单字查询也能命中段尾; 其余文字按字母数字切词。全角字符经 NFKC 归一化并转小写。
+        """
+        groups: List[List[str]] = []
+        normalized = unicodedata.normalize('NFKC', str(text or '')).lower()
+        for match in _SEARCH_TOKEN_RE.finditer(normalized):
+            cjk, word = match.group(1), match.group(2)
+            if word:
+                groups.append([word])
+            elif len(cjk) == 1:
+                groups.append([cjk])
+            else:
+                grams = [cjk[i:i + 2] for i in range(len(cjk) - 1)]
+                if not query:
+                    grams.append(cjk[-1])
+                groups.append(grams)
+        return groups
+
+    @classmethod
+    def _search_document(cls, text: Optional[str]) -> str:
+        """把标题/标签切词后以空格拼接, 作为 videos_fts 的列内容"""
+        return ' '.join(token for group in cls._search_tokens(text) for token in group)
+
+    @classmethod
+    def _fts_match_expression(cls, keyword: str) -> Optional[str]:
+        """
+        把搜索关键词转换为 FTS5 MATCH 表达式, 无可检索内容时返回 None
+
+        多字的中日文片段转为二元组短语 (要求在原文中连续出现, 等价于子串匹配);
+        单字和字母数字词按前缀匹配; 各片段之间为 AND。
+        """
+        terms = []
+        for group in cls._search_tokens(keyword, query=True):
+            if len(group) == 1 and (len(group[0]) == 1 or _SEARCH_TOKEN_RE.fullmatch(group[0]).group(2)):
+                terms.append(f'"{group[0]}"*')
+            else:
+                terms.append('"' + ' '.join(group) + '"')
+        return ' AND '.join(terms) if terms else None
+
+    @staticmethod
+    def _mysql_match_expression(keyword: str) -> Optional[str]:
+        """把搜索关键词转换为 MySQL BOOLEAN MODE 表达式, 无可检索内容时返回 None"""
+        normalized = unicodedata.normalize('NFKC', str(keyword or '')).lower()
+        terms = []
+        for term in re.findall(r'[^\W_]+', normalized):
+            # ngram 短语要求各 n 元组连续出现; 短于 ngram_token_size 的词只能前缀匹配
+            terms.append(f'+{term}*' if len(term) < 2 else f'+"{term}"')
+        return ' '.join(terms) if terms else None
+
+    # 各 SQLite 文件是否已建立 videos_fts (FTS5 未编译时迁移会跳过建表)
+    _fts_tables: Dict[str, bool] = {}
+
+    def _has_search_index(self, cursor) -> bool:
+        """当前数据库是否可用全文索引"""
+        if self.use_mysql:
+            return True
+        ready = self._fts_tables.get(self.db_path)
+        if ready is None:
+            cursor.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'videos_fts'")
+            ready = cursor.fetchone() is not None
+            self._fts_tables[self.db_path] = ready
+        return ready
+
+    def _sync_search_index(self, cursor, before: Dict[int, Dict[str, Any]],
+                           after: Dict[int, Dict[str, Any]]) -> None:
+        """按标题/标签变化维护 SQLite 的 videos_fts (MySQL FULLTEXT 索引由数据库自动维护)"""
+        if self.use_mysql or not self._has_search_index(cursor):
+            return
+        deleted: List[Tuple[int]] = []
+        inserted: List[Tuple[int, str, str]] = []
+        for vid in set(before) | set(after):
+            old, new = before.get(vid), after.get(vid)
+            if old and new and (old.get('video_title'), old.get('video_tags')) == \
+                    (new.get('video_title'), new.get('video_tags')):
+                continue
+            if old:
+                deleted.append((vid,))
+            if new:
+                inserted.append((vid, self._search_document(new.get('video_title')),
+                                 self._search_document(new.get('video_tags'))))
+        if deleted:
+            cursor.executemany('DELETE FROM videos_fts WHERE rowid = ?', deleted)
+        if inserted:
+            cursor.executemany('INSERT INTO videos_fts (rowid, title, tags) VALUES (?, ?, ?)',
+                               inserted)
+
+    def _sync_category_stats(self, cursor, before: Dict[int, Dict[str, Any]],
+                             after: Dict[int, Dict[str, Any]]) -> None:
+        """按视频的分类/播放数/封面变化增量维护 category_stats"""
+        deltas: Dict[str, List[int]] = {}
+        resample = set()
+        for vid in set(before) | set(after):
+            old, new = before.get(vid), after.get(vid)
+            for row, sign in ((old, -1), (new, 1)):
+                if not row:
+                    continue
+                delta = deltas.setdefault(row.get('video_category') or '', [0, 0])
+                delta[0] += sign
+                delta[1] += sign * int(row.get('play_count') or 0)
+            # 新增/删除, 或分类、封面变化时才可能影响示例图片
+            if not old or not new or (old.get('video_category'), old.get('video_image')) != \
+                    (new.get('video_category'), new.get('video_image')):
+                resample.update((row.get('video_category') or '') for row in (old, new) if row)
+
+        rows = [(category, count, plays) for category, (count, plays) in deltas.items()
+                if count or plays]
+        if rows:
+            if self.use_mysql:
+                sql = ('INSERT INTO category_stats (video_category, video_count, play_total) '
+                       'VALUES (%s, %s, %s) ON DUPLICATE KEY UPDATE '
+                       'video_count = video_count + VALUES(video_count), '
+                       'play_total = play_total + VALUES(play_total)')
+            else:
+                sql = ('INSERT INTO category_stats (video_category, video_count, play_total) '
+                       'VALUES (?, ?, ?) ON CONFLICT(video_category) DO UPDATE SET '
+                       'video_count = video_count + excluded.video_count, '
+                       'play_total = play_total + excluded.play_total')
+            cursor.executemany(sql, rows)
+            cursor.execute('DELETE FROM category_stats WHERE video_count <= 0')
+        self._refresh_category_samples(cursor, [category for category in resample if category])
+
+    def _refresh_category_samples(self, cursor, categories: List[str]) -> None:
+        """
+        重新选取分类的示例图片: 按列表排序第一个有封面的视频
+
+        沿 idx_video_category_sort 倒序读取, 通常读几行即可命中。
+        """
+        if not categories:
+            return
+        placeholder = '%s' if self.use_mysql else '?'
+        cursor.executemany(
+            f"UPDATE category_stats SET sample_image = ("
+            f"SELECT video_image FROM videos WHERE video_category = {placeholder} "
+            f"AND video_image IS NOT NULL AND video_image != '' "
+            f"ORDER BY {self._VIDEO_ORDER_BY} LIMIT 1"
+            f") WHERE video_category = {placeholder}",
+            [(category, category) for category in categories]
+        )
+
+    def _rebuild_category_stats(self, cursor) -> None:
+        """从 videos 全量重建 category_stats (迁移与修复时使用)"""
+        cursor.execute('DELETE FROM category_stats')
+        cursor.execute('''
+            INSERT INTO category_stats (video_category, video_count, play_total)
+            SELECT COALESCE(video_category, ''), COUNT(*), COALESCE(SUM(play_count), 0)
+            FROM videos
+            GROUP BY COALESCE(video_category, '')
+        ''')
+        cursor.execute("SELECT video_category FROM category_stats WHERE video_category != ''")
+        self._refresh_category_samples(cursor, [row['video_category'] for row in cursor.fetchall()])
+
+    def _sync_category_tag_stats(self, cursor, before: Dict[int, Dict[str, Any]],
+                                 after: Dict[int, Dict[str, Any]]) -> None:
+        """按视频的分类/标签变化增量维护 category_tag_stats 与 tags.video_count"""
+        pair_deltas: Dict[Tuple[str, str], int] = {}
+        tag_deltas: Dict[str, int] = {}
+        for vid in set(before) | set(after):
+            old, new = before.get(vid) or {}, after.get(vid) or {}
+            old_category, new_category = old.get('video_category') or '', new.get('video_category') or ''
+            old_tags = self._parse_tags(old.get('video_tags'))
+            new_tags = self._parse_tags(new.get('video_tags'))
+            if (old_category, old_tags) == (new_category, new_tags) and bool(old) == bool(new):
+                continue
+            for tag in old_tags:
+                pair_deltas[(old_category, tag)] = pair_deltas.get((old_category, tag), 0) - 1
+            for tag in new_tags:
+                pair_deltas[(new_category, tag)] = pair_deltas.get((new_category, tag), 0) + 1
+            for tag in set(old_tags) ^ set(new_tags):
+                tag_deltas[tag] = tag_deltas.get(tag, 0) + (1 if tag in new_tags else -1)
+
+        pair_deltas = {key: delta for key, delta in pair_deltas.items() if delta}
+        tag_deltas = {tag: delta for tag, delta in tag_deltas.items() if delta}
+        if not pair_deltas and not tag_deltas:
+            return
+        # 标签在此之前已由 _sync_tag_index 写入 tags 字典表
+        tag_ids = self._lookup_tag_ids(cursor, [tag for _, tag in pair_deltas] + list(tag_deltas))
+        placeholder = '%s' if self.use_mysql else '?'
+        if pair_deltas:
+            if self.use_mysql:
+                sql = ('INSERT INTO category_tag_stats (video_category, tag_id, video_count) '
+                       'VALUES (%s, %s, %s) ON DUPLICATE KEY UPDATE '
+                       'video_count = video_count + VALUES(video_count)')
+            else:
+                sql = ('INSERT INTO category_tag_stats (video_category, tag_id, video_count) '
+                       'VALUES (?, ?, ?) ON CONFLICT(video_category, tag_id) DO UPDATE SET '
+                       'video_count = video_count + excluded.video_count')
+            cursor.executemany(sql, [(category, tag_ids[tag], delta)
+                                     for (category, tag), delta in pair_deltas.items()
+                                     if tag in tag_ids])
+            cursor.execute('DELETE FROM category_tag_stats WHERE video_count <= 0')
+        if tag_deltas:
+            cursor.executemany(
+                f'UPDATE tags SET video_count = video_count + {placeholder} WHERE tag_id = {placeholder}',
+                [(delta, tag_ids[tag]) for tag, delta in tag_deltas.items() if tag in tag_ids]
+            )
+
+    def _rebuild_category_tag_stats(self, cursor) -> None:
+        """从 video_tag 全量重建 category_tag_stats 与 tags.video_count"""
+        cursor.execute('DELETE FROM category_tag_stats')
+        cursor.execute('''
+            INSERT INTO category_tag_stats (video_category, tag_id, video_count)
+            SELECT COALESCE(v.video_category, ''), vt.tag_id, COUNT(*)
+            FROM video_tag vt JOIN videos v ON v.video_id = vt.video_id
+            GROUP BY COALESCE(v.video_category, ''), vt.tag_id
+        ''')
+        cursor.execute('''
+            UPDATE tags SET video_count = (
+                SELECT COUNT(*) FROM video_tag WHERE video_tag.tag_id = tags.tag_id
+            )
+        ''')
+
+    def rebuild_category_stats(self) -> bool:
+        """
+        全量重建分类统计表 (Rebuild category_stats and category_tag_stats)
+
+        正常情况下由写入路径增量维护, 直接改库导致统计偏差时用于修复。
+        随机抽样使用的全站/分类序号同时重新编排。
+
+        Returns:
+            成功返回True，失败返回False
+        """
+        try:
+            cursor = self.connection.cursor()
+            self._rebuild_category_stats(cursor)
+            self._rebuild_category_tag_stats(cursor)
+            self._rebuild_sample_ranks(cursor)
+            self.connection.commit()
+            self._log("✅ 分类统计已重建")
+            return True
+        except Exception as e:
+            self.connection.rollback()
+            logger.error(f"重建分类统计失败: {e}")
+            self._log(f"❌ 重建分类统计失败: {e}")
+            return False
+
+    # ==================== 热度榜 (Trending) ====================
+
+    # 热度榜时间窗口: 窗口名 -> (分数列, 衰减时间常数秒)。
+    # 一次播放对分数的贡献按 exp(-已过去时间 / 时间常数) 衰减。
+    TRENDING_WINDOWS: Dict[str, Tuple[str, int]] = {
+        '24h': ('score_24h', 24 * 3600),
+        '7d': ('score_7d', 7 * 24 * 3600),
+    }
+
+    # 播放桶保留的小时数 (最长窗口 + 1 天), 用于重建分数与统计窗口内的播放次数
+    _TRENDING_BUCKET_HOURS = 8 * 24
+
+    # 前向衰减的权重 exp((t - landmark) / 时间常数) 超过 e^500 时整体重设基准, 防止浮点溢出
+    _TRENDING_REBASE_EXPONENT = 500.0
+
+    @staticmethod
+    def _trending_hour(now: Optional[float] = None) -> int:
+        """Unix 时间所在的小时序号 (播放桶的键)"""
+        return int((time.time() if now is None else now) // 3600)
+
+    def _trending_window(self, window: str) -> Tuple[str, int]:
+        if window not in self.TRENDING_WINDOWS:
+            raise ValueError(
+                f"无效的时间窗口 (Invalid window): {window}, "
+                f"可选 {', '.join(self.TRENDING_WINDOWS)}"
+            )
+        return self.TRENDING_WINDOWS[window]
+
+    def _trending_landmark(self, cursor, for_update: bool = False) -> int:
+        """读取前向衰减的基准时间 (写入时在 MySQL 上锁定该行, 串行化基准重设)"""
+        lock = ' FOR UPDATE' if for_update and self.use_mysql else ''
+        cursor.execute(f'SELECT landmark FROM trending_meta WHERE id = 1{lock}')
+        row = cursor.fetchone()
+        if row is None:
+            landmark = self._trending_hour() * 3600
+            placeholder = '%s' if self.use_mysql else '?'
+            cursor.execute(
+                f'INSERT INTO trending_meta (id, landmark) VALUES (1, {placeholder})', (landmark,)
+            )
+            return landmark
+        return int(row['landmark'])
+
+    def _rebase_trending(self, cursor, landmark: int, new_landmark: int) -> None:
+        """把所有分数换算到新的基准时间 (分数整体乘以同一系数, 排名不变)"""
+        placeholder = '%s' if self.use_mysql else '?'
+        assignments = ', '.join(f'{column} = {column} * {placeholder}'
+                                for column, _ in self.TRENDING_WINDOWS.values())
+        cursor.execute(
+            f'UPDATE video_trending SET {assignments}',
+            [math.exp(-(new_landmark - landmark) / tau) for _, tau in self.TRENDING_WINDOWS.values()]
+        )
+        cursor.execute(f'UPDATE trending_meta SET landmark = {placeholder} WHERE id = 1',
+                       (new_landmark,))
+
+    def _record_trending(self, cursor, plays: List[Tuple[int, int, str]],
+                         now: Optional[float] = None) -> None:
+        """
+        记录一批播放: 累加到当前小时的播放桶, 并把按前向衰减加权的增量加到热度分数上
+
+        前向衰减: 时刻 t 的播放权重为 exp((t - landmark) / 时间常数), 分数只增不减,
+        任意时刻按分数排序都等价于按"当前衰减后的热度"排序, 因此每次播放的代价是常数,
+        无需定时重算。调用方负责提交。
+
+        Args:
+            plays: [(video_id, 播放次数, 分类)]
+        """
+        if not plays:
+            return
+        now = time.time() if now is None else now
+        hour = self._trending_hour(now)
+        placeholder = '%s' if self.use_mysql else '?'
+
+        landmark = self._trending_landmark(cursor, for_update=True)
+        min_tau = min(tau for _, tau in self.TRENDING_WINDOWS.values())
+        if (now - landmark) / min_tau > self._TRENDING_REBASE_EXPONENT:
+            self._rebase_trending(cursor, landmark, hour * 3600)
+            landmark = hour * 3600
+        weights = [math.exp((now - landmark) / tau) for _, tau in self.TRENDING_WINDOWS.values()]
+
+        columns = [column for column, _ in self.TRENDING_WINDOWS.values()]
+        values = ', '.join([placeholder] * (len(columns) + 2))
+        if self.use_mysql:
+            bucket_sql = ('INSERT INTO video_play_hourly (video_id, bucket_hour, plays) '
+                          'VALUES (%s, %s, %s) ON DUPLICATE KEY UPDATE plays = plays + VALUES(plays)')
+            updates = ', '.join(f'{column} = {column} + VALUES({column})' for column in columns)
+            trending_sql = (f"INSERT INTO video_trending (video_id, video_category, {', '.join(columns)}) "
+                            f"VALUES ({values}) ON DUPLICATE KEY UPDATE "
+                            f"video_category = VALUES(video_category), {updates}")
+        else:
+            bucket_sql = ('INSERT INTO video_play_hourly (video_id, bucket_hour, plays) '
+                          'VALUES (?, ?, ?) ON CONFLICT(video_id, bucket_hour) '
+                          'DO UPDATE SET plays = plays + excluded.plays')
+            updates = ', '.join(f'{column} = {column} + excluded.{column}' for column in columns)
+            trending_sql = (f"INSERT INTO video_trending (video_id, video_category, {', '.join(columns)}) "
+                            f"VALUES ({values}) ON CONFLICT(video_id) DO UPDATE SET "
+                            f"video_category = excluded.video_category, {updates}")
+
+        cursor.executemany(bucket_sql, [(vid, hour, inc) for vid, inc, _ in plays])
+        cursor.executemany(
+            trending_sql,
+            [(vid, category, *[inc * weight for weight in weights]) for vid, inc, category in plays]
+        )
+        cursor.execute(f'DELETE FROM video_play_hourly WHERE bucket_hour < {placeholder}',
+                       (hour - self._TRENDING_BUCKET_HOURS,))
+
+    def get_trending_videos(self, window: str = '24h', category: Optional[str] = None,
+                            limit: int = 20) -> List[Dict[str, Any]]:
+        """
+        获取热度榜 (Get trending videos)
+
+        沿 (分类,) 分数索引倒序读取前 limit 行, 读取代价只与 limit 有关。
+
+        Args:
+            window: 时间窗口 ('24h' 或 '7d')
+            category: 只看某个分类 (可选)
+            limit: 返回数量
+
+        Returns:
+            视频列表, 每项附带 trending_score (按当前时刻衰减后的加权播放数)
+            与 window_plays (窗口内的实际播放次数)
+
+        Raises:
+            ValueError: 时间窗口无效
+        """
+        column, tau = self._trending_window(window)
+        cursor = self.connection.cursor()
+        placeholder = '%s' if self.use_mysql else '?'
+        where = f't.{column} > 0'
+        params: List[Any] = []
+        if category:
+            where += f' AND t.video_category = {placeholder}'
+            params.append(category)
+        cursor.execute(
+            f'SELECT {self._select_list(None, "v.")}, t.{column} AS trending_score FROM video_trending t '
+            f'JOIN videos v ON v.video_id = t.video_id '
+            f'WHERE {where} ORDER BY t.{column} DESC LIMIT {placeholder}',
+            params + [limit]
+        )
+        videos = [dict(row) for row in cursor.fetchall()]
+        if not videos:
+            return videos
+
+        now = time.time()
+        decay = math.exp(-(now - self._trending_landmark(cursor)) / tau)
+        ids = [video['video_id'] for video in videos]
+        cursor.execute(
+            f"SELECT video_id, SUM(plays) AS plays FROM video_play_hourly "
+            f"WHERE video_id IN ({', '.join([placeholder] * len(ids))}) "
+            f"AND bucket_hour > {placeholder} GROUP BY video_id",
+            ids + [self._trending_hour(now) - tau // 3600]
+        )
+        window_plays = {int(row['video_id']): int(row['plays']) for row in cursor.fetchall()}
+        for video in videos:
+            video['trending_score'] = round(float(video['trending_score']) * decay, 3)
+            video['window_plays'] = window_plays.get(int(video['video_id']), 0)
+        return videos
+
+    def rebuild_trending(self) -> bool:
+        """
+        从播放桶全量重建热度分数 (Rebuild trending scores from hourly buckets)
+
+        播放桶只保留最近 _TRENDING_BUCKET_HOURS 小时, 更早的播放在 7d 窗口中的
+        残余贡献会被舍弃。用于修复或调整时间常数后重新计算。
+
+        Returns:
+            成功返回True，失败返回False
+        """
+        try:
+            cursor = self.connection.cursor()
+            placeholder = '%s' if self.use_mysql else '?'
+            landmark = self._trending_hour() * 3600
+            cursor.execute('DELETE FROM video_trending')
+            cursor.execute(f'UPDATE trending_meta SET landmark = {placeholder} WHERE id = 1',
+                           (landmark,))
+            cursor.execute(
+                "SELECT h.video_id, h.bucket_hour, h.plays, "
+                "COALESCE(v.video_category, '') AS video_category "
+                "FROM video_play_hourly h JOIN videos v ON v.video_id = h.video_id"
+            )
+            # 每个桶按该小时的中点计权, 一次写入所有视频的分数
+            columns = [column for column, _ in self.TRENDING_WINDOWS.values()]
+            scores: Dict[int, List[Any]] = {}
+            for row in cursor.fetchall():
+                entry = scores.setdefault(int(row['video_id']),
+                                          [row['video_category']] + [0.0] * len(columns))
+                middle = int(row['bucket_hour']) * 3600 + 1800
+                for index, (_, tau) in enumerate(self.TRENDING_WINDOWS.values()):
+                    entry[index + 1] += int(row['plays']) * math.exp((middle - landmark) / tau)
+            if scores:
+                values = ', '.join([placeholder] * (len(columns) + 2))
+                cursor.executemany(
+                    f"INSERT INTO video_trending (video_id, video_category, {', '.join(columns)}) "
+                    f"VALUES ({values})",
+                    [(vid, *entry) for vid, entry in scores.items()]
+                )
+            self.connection.commit()
+            self._log(f"✅ 热度榜已重建: {len(scores)} 个视频")
+            return True
+        except Exception as e:
+            self.connection.rollback()
+            logger.error(f"重建热度榜失败: {e}")
+            self._log(f"❌ 重建热度榜失败: {e}")
+            return False
+
+    # ==================== 相关推荐 (Related videos) ====================
+
+    # 每个视频保存的近邻数
+    _RELATED_NEIGHBORS = 20
+    # 标题词相对标签的权重 (标题二元组噪声较大)
+    _RELATED_TITLE_WEIGHT = 0.5
+    # 出现在超过该数量视频中的特征区分度很低, 计算时跳过, 控制倒排表扫描量
+    _RELATED_MAX_POSTINGS = 1000
+    # 每个视频最多扫描的倒排项数 (按特征权重从高到低), 保证单个视频的计算代价有上限
+    _RELATED_SCAN_LIMIT = 3000
+    # 同分类视频的相似度加成
+    _RELATED_CATEGORY_BOOST = 0.25
+    # 低于该相似度的候选不保存
+    _RELATED_MIN_SCORE = 0.02
+    # 特征的最大长度 (related_features.feature 列宽)
+    _RELATED_FEATURE_LEN = 100
+    # 待计算队列超过视频总数的该比例时, 增量计算改为一次全表构建
+    _RELATED_FULL_BUILD_RATIO = 0.25
+
+    @classmethod
+    def _related_features(cls, row: Dict[str, Any]) -> Dict[str, float]:
+        """视频的特征及基础权重: 标签 (t:) 与标题分词 (w:, 与全文检索相同的二元组/单词)"""
+        features: Dict[str, float] = {}
+        for tag in cls._parse_tags(row.get('video_tags')):
+            features[('t:' + unicodedata.normalize('NFKC', tag).lower())[:cls._RELATED_FEATURE_LEN]] = 1.0
+        for group in cls._search_tokens(row.get('video_title'), query=True):
+            for token in group:
+                features.setdefault(('w:' + token)[:cls._RELATED_FEATURE_LEN], cls._RELATED_TITLE_WEIGHT)
+        return features
+
+    def _build_related_index(self, cursor) -> Dict[str, Any]:
+        """
+        扫描全表构建内存倒排表: 特征 -> 视频列表, 以及每个视频的特征、范数、分类、系列
+
+        特征权重 = 基础权重 * idf (log(N / 包含该特征的视频数)); 超过 _RELATED_MAX_POSTINGS
+        的特征视为停用特征, 既不参与候选生成也不计入范数。
+        """
+        feature_ids: Dict[str, int] = {}
+        postings: List[List[int]] = []
+        base_weights: List[float] = []
+        videos: Dict[int, Tuple[List[int], str, str]] = {}
+        for rows in self._iter_video_rows(cursor, ('video_id', 'video_title', 'video_tags',
+                                                   'video_category', 'series_key')):
+            for row in rows:
+                vid = int(row['video_id'])
+                ids = []
+                for feature, weight in self._related_features(row).items():
+                    fid = feature_ids.get(feature)
+                    if fid is None:
+                        fid = feature_ids[feature] = len(postings)
+                        postings.append([])
+                        base_weights.append(weight)
+                    postings[fid].append(vid)
+                    ids.append(fid)
+                videos[vid] = (ids, row['video_category'] or '', row['series_key'] or '')
+
+        total = max(len(videos), 1)
+        weights = [
+            base * math.log(1 + total / len(posting)) if len(posting) <= self._RELATED_MAX_POSTINGS else 0.0
+            for base, posting in zip(base_weights, postings)
+        ]
+        norms = {vid: sum(weights[fid] for fid in ids) for vid, (ids, _, _) in videos.items()}
+        return {'postings': postings, 'weights': weights, 'videos': videos, 'norms': norms}
+
+    def _load_related_index(self, cursor, video_ids: List[int]) -> Dict[str, Any]:
+        """
+        从持久倒排表读取计算这些视频的近邻所需的部分倒排表 (结构同 _build_related_index)
+
+        只读取这些视频的特征的倒排列表 (停用特征除外), 以及出现在其中的候选视频的特征
+        (用于计算范数), 代价与待计算视频数和倒排列表长度有关, 与视频总数无关。
+        idf 使用 related_feature_stats 中维护的视频数, 与全表构建的结果一致。
+        """
+        placeholder = '%s' if self.use_mysql else '?'
+
+        def select_in(sql: str, values: List[Any]) -> List[Dict[str, Any]]:
+            rows: List[Dict[str, Any]] = []
+            for start in range(0, len(values), self._IN_CHUNK_SIZE):
+                chunk = values[start:start + self._IN_CHUNK_SIZE]
+                cursor.execute(sql.format(in_list=', '.join([placeholder] * len(chunk))), chunk)
+                rows.extend(dict(row) for row in cursor.fetchall())
+            return rows
+
+        cursor.execute('SELECT COALESCE(SUM(video_count), 0) AS total FROM category_stats')
+        total = max(int(cursor.fetchone()['total']), 1)
+        feature_ids: Dict[str, int] = {}
+        base_weights: List[float] = []
+        counts: Dict[str, int] = {}
+        video_features: Dict[int, List[int]] = {}
+
+        def load_features(ids: List[int]) -> None:
+            rows = select_in('SELECT video_id, feature, weight FROM related_features '
+                             'WHERE video_id IN ({in_list})', ids)
+            for vid in ids:
+                video_features.setdefault(vid, [])
+            new_features = []
+            for row in rows:
+                feature = row['feature']
+                fid = feature_ids.get(feature)
+                if fid is None:
+                    fid = feature_ids[feature] = len(base_weights)
+                    base_weights.append(float(row['weight']))
+                    new_features.append(feature)
+                video_features[int(row['video_id'])].append(fid)
+            for row in select_in('SELECT feature, video_count FROM related_feature_stats '
+                                 'WHERE feature IN ({in_list})', new_features):
+                counts[row['feature']] = int(row['video_count'])
+
+        load_features(list(video_ids))
+        scan_features = [feature for feature in feature_ids
+                         if 0 < counts.get(feature, 0) <= self._RELATED_MAX_POSTINGS]
+        postings: List[List[int]] = [[] for _ in base_weights]
+        for row in select_in('SELECT feature, video_id FROM related_features '
+                             'WHERE feature IN ({in_list})', scan_features):
+            postings[feature_ids[row['feature']]].append(int(row['video_id']))
+        load_features(sorted({vid for posting in postings for vid in posting} - video_features.keys()))
+
+        features_by_id = list(feature_ids)
+        weights = []
+        for fid, base in enumerate(base_weights):
+            count = counts.get(features_by_id[fid], 0)
+            weights.append(base * math.log(1 + total / count)
+                           if 0 < count <= self._RELATED_MAX_POSTINGS else 0.0)
+        videos: Dict[int, Tuple[List[int], str, str]] = {}
+        for row in select_in('SELECT video_id, video_category, series_key FROM videos '
+                             'WHERE video_id IN ({in_list})', list(video_features)):
+            vid = int(row['video_id'])
+            videos[vid] = (video_features[vid], row['video_category'] or '', row['series_key'] or '')
+        norms = {vid: sum(weights[fid] for fid in ids) for vid, (ids, _, _) in videos.items()}
+        return {'postings': postings, 'weights': weights, 'videos': videos, 'norms': norms}
+
+    def _related_candidates(self, index: Dict[str, Any], video_id: int) -> List[Tuple[float, int]]:
+        """
+        按加权 Jaccard 相似度 (交集权重 / 并集权重) 给与该视频有共同特征的视频打分
+
+        只遍历该视频各特征的倒排列表 (权重高、文档频率低的特征优先, 最多
+        _RELATED_SCAN_LIMIT 项), 代价与视频总数无关。同系列的视频已在"合集"中展示,
+        不作为相关推荐。
+
+        Returns:
+            [(相似度, video_id)], 未排序
+        """
+        entry = index['videos'].get(video_id)
+        if not entry:
+            return []
+        ids, category, series = entry
+        weights, postings, videos, norms = index['weights'], index['postings'], index['videos'], index['norms']
+        overlap: Dict[int, float] = {}
+        scanned = 0
+        for fid in sorted(ids, key=lambda fid: -weights[fid]):
+            weight = weights[fid]
+            if weight <= 0 or scanned >= self._RELATED_SCAN_LIMIT:
+                break
+            scanned += len(postings[fid])
+            for other in postings[fid]:
+                if other != video_id:
+                    overlap[other] = overlap.get(other, 0.0) + weight
+
+        norm = norms[video_id]
+        scored = []
+        for other, shared in overlap.items():
+            _, other_category, other_series = videos[other]
+            if series and other_series == series:
+                continue
+            score = shared / (norm + norms[other] - shared)
+            if category and other_category == category:
+                score *= 1 + self._RELATED_CATEGORY_BOOST
+            if score >= self._RELATED_MIN_SCORE:
+                scored.append((round(score, 6), other))
+        return scored
+
+    @classmethod
+    def _top_related(cls, scored: List[Tuple[float, int]]) -> List[Tuple[float, int]]:
+        """取分数最高的 _RELATED_NEIGHBORS 个 (同分时 video_id 小的优先)"""
+        return heapq.nlargest(cls._RELATED_NEIGHBORS, scored, key=lambda item: (item[0], -item[1]))
+
+    def _write_related(self, cursor, neighbors: Dict[int, List[Tuple[float, int]]]) -> None:
+        """替换一批视频的近邻列表"""
+        placeholder = '%s' if self.use_mysql else '?'
+        ids = list(neighbors)
+        for start in range(0, len(ids), self._IN_CHUNK_SIZE):
+            chunk = ids[start:start + self._IN_CHUNK_SIZE]
+            cursor.execute(
+                f"DELETE FROM related_videos WHERE video_id IN ({', '.join([placeholder] * len(chunk))})",
+                chunk
+            )
+        cursor.executemany(
+            f'INSERT INTO related_videos (video_id, related_id, score) '
+            f'VALUES ({placeholder}, {placeholder}, {placeholder})',
+            [(vid, other, score) for vid, items in neighbors.items() for score, other in items]
+        )
+
+    def _merge_related(self, cursor, candidates: Dict[int, List[Tuple[float, int]]]) -> None:
+        """
+        把重新计算的视频 (candidates 的键) 的相似度反向合并进其他视频的近邻列表
+
+        相似度是对称的: 原先列出这些视频的列表按新分数重排 (分数过低则移出),
+        新分数能进入前 N 的列表则加入; 其余列表不受影响, 不做写入。
+        """
+        placeholder = '%s' if self.use_mysql else '?'
+        changed = list(candidates)
+        incoming: Dict[int, Dict[int, float]] = {}
+        for vid, items in candidates.items():
+            for score, other in items:
+                if other not in candidates:
+                    incoming.setdefault(other, {})[vid] = score
+
+        # 原先包含这些视频的列表必须重写 (旧分数已失效)
+        targets = set()
+        for start in range(0, len(changed), self._IN_CHUNK_SIZE):
+            chunk = changed[start:start + self._IN_CHUNK_SIZE]
+            cursor.execute(
+                f"SELECT DISTINCT video_id FROM related_videos "
+                f"WHERE related_id IN ({', '.join([placeholder] * len(chunk))})",
+                chunk
+            )
+            targets.update(int(row['video_id']) for row in cursor.fetchall()
+                           if int(row['video_id']) not in candidates)
+
+        # 其余列表只有在未满或新分数高于当前最低分时才需要改写
+        others = [vid for vid in incoming if vid not in targets]
+        for start in range(0, len(others), self._IN_CHUNK_SIZE):
+            chunk = others[start:start + self._IN_CHUNK_SIZE]
+            cursor.execute(
+                f"SELECT video_id, MIN(score) AS low, COUNT(*) AS n FROM related_videos "
+                f"WHERE video_id IN ({', '.join([placeholder] * len(chunk))}) GROUP BY video_id",
+                chunk
+            )
+            bounds = {int(row['video_id']): (float(row['low']), int(row['n'])) for row in cursor.fetchall()}
+            for vid in chunk:
+                low, count = bounds.get(vid, (0.0, 0))
+                if count < self._RELATED_NEIGHBORS or max(incoming[vid].values()) > low:
+                    targets.add(vid)
+
+        rewritten: Dict[int, List[Tuple[float, int]]] = {}
+        for target in targets:
+            cursor.execute(
+                f'SELECT related_id, score FROM related_videos WHERE video_id = {placeholder}',
+                (target,)
+            )
+            current = {int(row['related_id']): float(row['score']) for row in cursor.fetchall()
+                       if int(row['related_id']) not in candidates}
+            current.update(incoming.get(target, {}))
+            rewritten[target] = self._top_related([(score, other) for other, score in current.items()])
+        self._write_related(cursor, rewritten)
+
+    def rebuild_related_videos(self) -> int:
+        """
+        全量计算所有视频的相关推荐 (Rebuild related_videos for every video)
+
+        每 BULK_CHUNK_SIZE 个视频提交一次, 计算期间读取方看到的是新旧混合的结果。
+
+        Returns:
+            计算的视频数, 失败返回 -1
+        """
+        try:
+            cursor = self.connection.cursor()
+            index = self._build_related_index(cursor)
+            ids = sorted(index['videos'])
+            for start in range(0, len(ids), BULK_CHUNK_SIZE):
+                chunk = ids[start:start + BULK_CHUNK_SIZE]
+                self._write_related(
+                    cursor, {vid: self._top_related(self._related_candidates(index, vid)) for vid in chunk}
+                )
+                self.connection.commit()
+            cursor.execute('DELETE FROM related_dirty')
+            self.connection.commit()
+            self._log(f"✅ 相关推荐已重建: {len(ids)} 个视频")
+            return len(ids)
+        except Exception as e:
+            self.connection.rollback()
+            logger.error(f"重建相关推荐失败: {e}")
+            self._log(f"❌ 重建相关推荐失败: {e}")
+            return -1
+
+    def update_related_videos(self) -> int:
+        """
+        增量计算相关推荐 (Recompute related videos for queued videos only)
+
+        只重新计算 related_dirty 队列中的视频 (新增、改过标题/标签/分类, 或其近邻被删除),
+        并把新的相似关系反向合并进对方的列表。适合由定时任务频繁执行。
+        每批只从持久倒排表读取该批视频所需的部分 (_load_related_index); 队列超过视频总数的
+        _RELATED_FULL_BUILD_RATIO 时 (如首次迁移后) 改为一次全表构建。
+
+        Returns:
+            计算的视频数, 失败返回 -1
+        """
+        try:
+            cursor = self.connection.cursor()
+            cursor.execute('SELECT video_id FROM related_dirty')
+            dirty = [int(row['video_id']) for row in cursor.fetchall()]
+            if not dirty:
+                return 0
+            cursor.execute('SELECT COALESCE(SUM(video_count), 0) AS total FROM category_stats')
+            full_build = len(dirty) >= int(cursor.fetchone()['total']) * self._RELATED_FULL_BUILD_RATIO
+            index = self._build_related_index(cursor) if full_build else None
+            placeholder = '%s' if self.use_mysql else '?'
+            for start in range(0, len(dirty), BULK_CHUNK_SIZE):
+                chunk = dirty[start:start + BULK_CHUNK_SIZE]
+                if not full_build:
+                    index = self._load_related_index(cursor, chunk)
+                candidates = {vid: self._related_candidates(index, vid)
+                              for vid in chunk if vid in index['videos']}
+                self._write_related(cursor, {vid: self._top_related(items)
+                                             for vid, items in candidates.items()})
+                self._merge_related(cursor, candidates)
+                cursor.executemany(f'DELETE FROM related_dirty WHERE video_id = {placeholder}',
+                                   [(vid,) for vid in chunk])
+                self.connection.commit()
+            self._log(f"✅ 相关推荐已更新: {len(dirty)} 个视频")
+            return len(dirty)
+        except Exception as e:
+            self.connection.rollback()
+            logger.error(f"更新相关推荐失败: {e}")
+            self._log(f"❌ 更新相关推荐失败: {e}")
+            return -1
+
+    def _log(self, message: str) -> None:
+        """输出日志信息"""
+        if self.verbose:
+            print(message)
+        logger.info(message)
+
+    # 写入 videos 表的列及插入时的缺省值 (None 表示必需字段)
+    _VIDEO_WRITE_COLUMNS: List[Tuple[str, Any]] = [
+        ('video_id', None),
+        ('video_url', None),
+        ('video_url_backup', ''),
+        ('video_image', ''),
+        ('video_title', None),
+        ('video_category', ''),
+        ('video_tags', ''),
+        ('play_count', 0),
+        ('upload_time', ''),
+        ('video_duration', ''),
+        ('video_coins', 0),
+    ]
+
+    # 写入时由源列推导的派生列: (列名, 源列, 推导方法名), 调用方无需提供;
+    # 源列被写入时派生列随之更新
+    _DERIVED_WRITE_COLUMNS: List[Tuple[str, str, str]] = [
+        ('sort_date', 'upload_time', '_sort_date'),
+        ('title_norm', 'video_title', '_normalize_title'),
+        ('series_key', 'video_title', '_series_key'),
+        ('episode_key', 'video_title', '_episode_sort_key'),
+    ]
+
+    @staticmethod
+    def _series_key(title: Any) -> str:
+        """系列名 (见 _series_base), 截断到索引列长度"""
+        return _series_base(str(title or ''))[:191]
+
+    @staticmethod
+    def _episode_sort_key(title: Any) -> str:
+        """集数排序键 (见 _episode_key), 截断到索引列长度"""
+        return _episode_key(str(title or ''))[:512]
+
+    def _backfill_derived_columns(self, cursor,
+                                  columns: Optional[Tuple[str, ...]] = None) -> int:
+        """按当前推导规则重新计算已有记录的派生列, 只写入值有变化的行, 返回更新行数"""
+        derived = [item for item in self._DERIVED_WRITE_COLUMNS
+                   if columns is None or item[0] in columns]
+        sources = tuple(dict.fromkeys(source for _, source, _ in derived))
+        placeholder = '%s' if self.use_mysql else '?'
+        sql = (f"UPDATE videos SET {', '.join(f'{name} = {placeholder}' for name, _, _ in derived)} "
+               f"WHERE video_id = {placeholder}")
+        updated = 0
+        for rows in self._iter_video_rows(cursor, ('video_id',) + sources
+                                          + tuple(name for name, _, _ in derived)):
+            params = []
+            for row in rows:
+                values = [getattr(self, method)(row[source]) for _, source, method in derived]
+                if values != [row[name] for name, _, _ in derived]:
+                    params.append(tuple(values) + (row['video_id'],))
+            if params:
+                cursor.executemany(sql, params)
+                updated += len(params)
+        return updated
+
+    def backfill_derived_columns(self) -> int:
+        """
+        重新计算所有记录的派生列 (sort_date / title_norm / series_key / episode_key)
+
+        迁移时已回填一次; 推导规则调整后, 或数据被直接改库后用于修复。
+
+        Returns:
+            更新的记录数, 失败返回 -1
+        """
+        try:
+            cursor = self.connection.cursor()
+            updated = self._backfill_derived_columns(cursor)
+            self.connection.commit()
+            self._log(f"✅ 派生列回填完成, 更新 {updated} 条记录")
+            return updated
+        except Exception as e:
+            self.connection.rollback()
+            logger.error(f"回填派生列失败: {e}")
+            self._log(f"❌ 回填派生列失败: {e}")
+            return -1
+
+    def _missing_required_field(self, video_data: Dict[str, Any]) -> Optional[str]:
+        """返回第一个缺失的必需字段名, 字段齐全时返回 None"""
+        for field in ('video_id', 'video_url', 'video_title'):
+            if field not in video_data or video_data[field] is None:
+                return field
+        return None
+
+    def _video_update_columns(self, video_data: Dict[str, Any]) -> Tuple[str, ...]:
+        """记录已存在时需要更新的列: 仅限调用方显式提供的字段 (video_id 除外)"""
+        columns = tuple(name for name, _ in self._VIDEO_WRITE_COLUMNS[1:] if name in video_data)
+        return columns + tuple(name for name, source, _ in self._DERIVED_WRITE_COLUMNS
+                               if source in columns)
+
+    def _video_write_sql(self, update_columns: Tuple[str, ...]) -> str:
+        """
+        构建写入单行视频记录的 upsert SQL (同一条语句供 execute 与 executemany 使用)
+
+        不再使用 REPLACE INTO / INSERT OR REPLACE (先删后插会重写所有索引项并重置
+        created_at), 而是:
+          - 新记录: 按缺省值插入全部列
+          - 已存在: 只更新 update_columns 中的列, 保留 created_at 与未提供的列;
+            所有列都未变化时不产生任何写入 (SQLite 通过 DO UPDATE ... WHERE 跳过,
+            MySQL 对值未变的 ON DUPLICATE KEY UPDATE 本身不写行, updated_at 也不变)
+        """
+        columns = [name for name, _ in self._VIDEO_WRITE_COLUMNS]
+        columns += [name for name, _, _ in self._DERIVED_WRITE_COLUMNS]
+        if self.use_mysql:
+            placeholders = ', '.join(['%s'] * len(columns))
+            assignments = ', '.join(f"{col} = VALUES({col})" for col in update_columns)
+            return (
+                f"INSERT INTO videos ({', '.join(columns)}) VALUES ({placeholders}) "
+                f"ON DUPLICATE KEY UPDATE {assignments}"
+            )
+        columns.append('updated_at')
+        placeholders = ', '.join(['?'] * len(columns))
+        assignments = ', '.join(f"{col} = excluded.{col}" for col in update_columns)
+        changed = ' OR '.join(f"videos.{col} IS NOT excluded.{col}" for col in update_columns)
+        return (
+            f"INSERT INTO videos ({', '.join(columns)}) VALUES ({placeholders}) "
+            f"ON CONFLICT(video_id) DO UPDATE SET {assignments}, updated_at = excluded.updated_at "
+            f"WHERE {changed}"
+        )
+
+    def _video_write_params(self, video_data: Dict[str, Any], now: str) -> Tuple[Any, ...]:
+        """把视频数据字典转换为 _video_write_sql 对应的参数元组"""
+        values = [video_data.get(name, default) for name, default in self._VIDEO_WRITE_COLUMNS]
+        values += [getattr(self, method)(video_data.get(source))
+                   for _, source, method in self._DERIVED_WRITE_COLUMNS]
+        if not self.use_mysql:
+            values.append(now)
+        return tuple(values)
+
+    def insert_video(self, video_data: Dict[str, Any]) -> bool:
+        """
+        插入单个视频记录 (已存在时只更新提供的字段, 保留 created_at)
+
+        Args:
+            video_data: 视频数据字典，包含以下字段:
+                - video_id: 视频ID (必需)
+                - video_url: 视频链接 (必需)
+                - video_image: 视频图片
+                - video_title: 视频标题 (必需)
+                - video_category: 视频分类
+                - video_tags: 视频标签 (逗号分隔)
+                - play_count: 播放数
+                - upload_time: 上传时间
+                - video_duration: 视频时长
+                - video_coins: 视频金币
+
+        Returns:
+            插入成功返回True，失败返回False
+        """
+        missing = self._missing_required_field(video_data)
+        if missing:
+            self._log(f"❌ 缺少必需字段: {missing}")
+            return False
+
+        try:
+            cursor = self.connection.cursor()
+            before = self._snapshot_videos(cursor, [video_data['video_id']])
+            cursor.execute(
+                self._video_write_sql(self._video_update_columns(video_data)),
+                self._video_write_params(video_data, datetime.now().isoformat())
+            )
+            after = self._snapshot_videos(cursor, [video_data['video_id']])
+            self._reindex_videos(cursor, before, after)
+            self._commit()
+            return True
+        except Exception as e:
+            self.connection.rollback()
+            logger.error(f"插入视频失败: {e}")
+            self._log(f"❌ 插入视频失败: {e}")
+            return False
+
+    def upsert_videos(self, videos: List[Dict[str, Any]],
+                      chunk_size: Optional[int] = None) -> Dict[str, Any]:
+        """
+        批量写入视频记录 (Bulk upsert)
+
+        按 chunk_size 分批, 每批用一条 executemany 语句在同一个事务中写入,
+        只在批末提交一次。某一批执行失败时回滚该批, 再逐行重试以定位失败的行,
+        其余行照常写入, 不会因个别坏数据中断整个导入。
+        写入语义同 insert_video: 已存在的记录只更新提供的字段, 未变化时不写入。
+
+        Args:
+            videos: 视频数据列表 (字段同 insert_video)
+            chunk_size: 每批写入的行数, 默认取 DB_BULK_CHUNK_SIZE 环境变量 (500)
+
+        Returns:
+            {'total': 总数, 'succeeded': 成功写入数,
+             'failed': [{'index': 下标, 'video_id': ID, 'error': 原因}, ...]}
+        """
+        chunk_size = max(1, chunk_size or BULK_CHUNK_SIZE)
+        failed: List[Dict[str, Any]] = []
+        succeeded = 0
+
+        now = datetime.now().isoformat()
+        # 按"需更新的列"分组, 每组共用一条 upsert 语句 (通常所有行字段一致, 只有一组)
+        groups: Dict[Tuple[str, ...], List[Tuple[int, Tuple[Any, ...]]]] = {}
+        for index, video in enumerate(videos):
+            missing = self._missing_required_field(video)
+            if missing:
+                failed.append({'index': index, 'video_id': video.get('video_id'),
+                               'error': f"缺少必需字段: {missing}"})
+                continue
+            groups.setdefault(self._video_update_columns(video), []).append(
+                (index, self._video_write_params(video, now)))
+
+        cursor = self.connection.cursor()
+        batches = [
+            (self._video_write_sql(update_columns), rows[start:start + chunk_size])
+            for update_columns, rows in groups.items()
+            for start in range(0, len(rows), chunk_size)
+        ]
+        for sql, chunk in batches:
+            chunk_ids = [videos[index]['video_id'] for index, _ in chunk]
+            try:
+                before = self._snapshot_videos(cursor, chunk_ids)
+                cursor.executemany(sql, [params for _, params in chunk])
+                self._reindex_videos(cursor, before, self._snapshot_videos(cursor, chunk_ids))
+                self._commit()
+                succeeded += len(chunk)
+                continue
+            except Exception as e:
+                self.connection.rollback()
+                logger.warning(f"批量写入失败, 逐行重试定位失败记录: {e}")
+
+            written: List[int] = []
+            try:
+                before = self._snapshot_videos(cursor, chunk_ids)
+                for index, params in chunk:
+                    try:
+                        cursor.execute(sql, params)
+                        written.append(index)
+                    except Exception as e:
+                        failed.append({'index': index, 'video_id': videos[index].get('video_id'),
+                                       'error': str(e)})
+                self._reindex_videos(cursor, before, self._snapshot_videos(cursor, chunk_ids))
+                self._commit()
+                succeeded += len(written)
+            except Exception as e:
+                # 索引维护或提交失败时整批回滚, 本批逐行写入成功的记录也计为失败, 继续处理后续批次
+                self.connection.rollback()
+                logger.warning(f"逐行重试后提交失败, 本批回滚: {e}")
+                failed.extend({'index': index, 'video_id': videos[index].get('video_id'),
+                               'error': str(e)} for index in written)
+
+        failed.sort(key=lambda item: item['index'])
+        return {'total': len(videos), 'succeeded': succeeded, 'failed': failed}
+
+    def insert_videos(self, videos: List[Dict[str, Any]],
+                      chunk_size: Optional[int] = None) -> int:
+        """
+        批量插入视频记录 (分批事务写入, 见 upsert_videos)
+
+        Args:
+            videos: 视频数据列表
+            chunk_size: 每批写入的行数, 默认取 DB_BULK_CHUNK_SIZE 环境变量
+
+        Returns:
             成功插入的视频数量
         """
-        success_count = 0
-        for video in videos:
-            if self.insert_video(video):
-                success_count += 1
+        result = self.upsert_videos(videos, chunk_size=chunk_size)
+        for failure in result['failed'][:20]:
+            logger.warning(
+                f"写入视频失败 (第{failure['index']}条, video_id={failure['video_id']}): "
+                f"{failure['error']}"
+            )
 
+        success_count = result['succeeded']
         self._log(f"✅ 批量插入完成: 成功 {success_count}/{len(videos)} 个")
         return success_count
 
@@ -540,13 +2586,57 @@ class VideoDatabase:
         """
         cursor = self.connection.cursor()
         placeholder = '%s' if self.use_mysql else '?'
-        cursor.execute(f'SELECT * FROM videos WHERE video_id = {placeholder}', (video_id,))
+        cursor.execute(f'SELECT {self._select_list(None)} FROM videos WHERE video_id = {placeholder}',
+                       (video_id,))
         row = cursor.fetchone()
 
         if row:
             return dict(row) if isinstance(row, dict) else dict(row)
         return None
 
+    def get_videos(self, video_ids: List[int],
+                   fields: Optional[Tuple[str, ...]] = None) -> List[Optional[Dict[str, Any]]]:
+        """
+        按ID批量获取视频 (Get many videos by id)
+
+        每 _IN_CHUNK_SIZE 个ID执行一次主键 IN (...) 查询, 代替逐个调用 get_video。
+
+        Args:
+            video_ids: 视频ID列表 (可重复)
+            fields: 只读取这些列 (见 VIDEO_FIELDS), 默认读取全部列
+
+        Returns:
+            与 video_ids 一一对应的列表, 不存在的视频为 None
+        """
+        ids = self._int_ids(video_ids)
+        placeholder = '%s' if self.use_mysql else '?'
+        columns = self._select_list(fields)
+        cursor = self.connection.cursor()
+        found: Dict[int, Dict[str, Any]] = {}
+        for start in range(0, len(ids), self._IN_CHUNK_SIZE):
+            chunk = ids[start:start + self._IN_CHUNK_SIZE]
+            cursor.execute(
+                f"SELECT {columns} FROM videos WHERE video_id IN ({', '.join([placeholder] * len(chunk))})",
+                chunk
+            )
+            for row in cursor.fetchall():
+                row = dict(row)
+                found[int(row['video_id'])] = row
+        result: List[Optional[Dict[str, Any]]] = []
+        for vid in video_ids:
+            try:
+                result.append(found.get(int(vid)))
+            except (TypeError, ValueError):
+                result.append(None)
+        return result
+
+    def video_exists(self, video_id: int) -> bool:
+        """视频是否存在 (只读主键, 不取整行)"""
+        cursor = self.connection.cursor()
+        placeholder = '%s' if self.use_mysql else '?'
+        cursor.execute(f'SELECT 1 FROM videos WHERE video_id = {placeholder}', (video_id,))
+        return cursor.fetchone() is not None
+
     def get_video_by_title(self, title: str) -> Optional[Dict[str, Any]]:
         """
         根据标题(名称)获取视频信息
@@ -566,10 +2656,12 @@ class VideoDatabase:
 
         cursor = self.connection.cursor()
         placeholder = '%s' if self.use_mysql else '?'
+        # 先按 title_norm 走索引缩小范围, 再精确比较原始标题
         cursor.execute(
-            f'SELECT * FROM videos WHERE video_title = {placeholder} '
+            f'SELECT {self._select_list(None)} FROM videos '
+            f'WHERE title_norm = {placeholder} AND video_title = {placeholder} '
             f'ORDER BY created_at ASC, video_id ASC LIMIT 1',
-            (title,)
+            (self._normalize_title(title), title)
         )
         row = cursor.fetchone()
 
@@ -577,63 +2669,229 @@ class VideoDatabase:
             return dict(row) if isinstance(row, dict) else dict(row)
         return None
 
-    def get_all_videos(self, limit: Optional[int] = None,
-                       offset: int = 0) -> List[Dict[str, Any]]:
+    def get_series_videos(self, video: Dict[str, Any],
+                          limit: int = 50) -> List[Dict[str, Any]]:
         """
-        获取所有视频
+        获取与指定视频同系列的视频, 按集数自然排序 (Get videos of the same series)
+
+        按 idx_video_series (series_key, episode_key) 范围读取, 数据库返回的顺序即集数顺序。
+        结果始终包含该视频本身。
 
         Args:
-            limit: 限制返回数量
-            offset: 偏移量
+            video: 当前视频 (get_video 的返回值)
+            limit: 除当前视频外最多返回的同系列视频数
 
         Returns:
             视频列表
         """
+        # series_key / episode_key 是内部列, 按写入时相同的规则由标题推导
+        series_key = self._series_key(video.get('video_title'))
+        if not series_key:
+            return [video]
+
         cursor = self.connection.cursor()
         placeholder = '%s' if self.use_mysql else '?'
+        cursor.execute(
+            f'SELECT {self._select_list(None)} FROM videos WHERE series_key = {placeholder} '
+            f'ORDER BY episode_key, video_id LIMIT {placeholder}',
+            (series_key, limit + 1)
+        )
+        collection = [dict(row) for row in cursor.fetchall()]
+        if all(row['video_id'] != video['video_id'] for row in collection):
+            collection = collection[:limit] + [video]
+            collection.sort(key=lambda row: (self._episode_sort_key(row.get('video_title')), row['video_id']))
+        return collection
+
+    def get_related_videos(self, video: Dict[str, Any],
+                           limit: int = 6) -> List[Dict[str, Any]]:
+        """
+        获取相关视频 (Get related videos)
 
-        if limit:
-            cursor.execute(
-                f'SELECT * FROM videos ORDER BY {self._VIDEO_ORDER_BY} LIMIT {placeholder} OFFSET {placeholder}',
-                (limit, offset)
-            )
-        else:
-            cursor.execute(f'SELECT * FROM videos ORDER BY {self._VIDEO_ORDER_BY}')
+        优先读取预先计算的近邻 (related_videos 按 (video_id, score) 索引读取),
+        近邻不足 limit 个时 (尚未计算或标签过少) 用同分类的最新视频补足。
 
-        rows = cursor.fetchall()
-        return [dict(row) if isinstance(row, dict) else dict(row) for row in rows]
+        Args:
+            video: 当前视频 (get_video 的返回值)
+            limit: 返回数量
 
-    def count_all_videos(self) -> int:
-        """获取视频总数 (Get total number of videos)"""
+        Returns:
+            视频列表 (不含当前视频)
+        """
+        video_id = video['video_id']
         cursor = self.connection.cursor()
-        cursor.execute('SELECT COUNT(*) as cnt FROM videos')
-        row = cursor.fetchone()
-        return int(row['cnt'] if isinstance(row, dict) else row[0])
+        placeholder = '%s' if self.use_mysql else '?'
+        cursor.execute(
+            f'SELECT {self._select_list(None, "v.")} FROM related_videos r '
+            f'JOIN videos v ON v.video_id = r.related_id '
+            f'WHERE r.video_id = {placeholder} ORDER BY r.score DESC, r.related_id LIMIT {placeholder}',
+            (video_id, limit)
+        )
+        related = [dict(row) for row in cursor.fetchall()]
+
+        category = video.get('video_category') or ''
+        if len(related) < limit and category:
+            seen = {video_id} | {row['video_id'] for row in related}
+            for row in self.get_videos_by_category(category, limit=limit + len(seen), offset=0):
+                if row['video_id'] not in seen:
+                    related.append(row)
+                    seen.add(row['video_id'])
+                    if len(related) >= limit:
+                        break
+        return related
+
+    # ==================== 游标分页 (Keyset pagination) ====================
+
+    @staticmethod
+    def _sort_key_values(row: Dict[str, Any]) -> List[Any]:
+        """
+        按 _VIDEO_SORT_KEY 取出一行视频的排序键取值
+
+        sort_date 是内部列, 不在返回的视频数据中, 按写入时相同的规则由 upload_time 推导。
+        """
+        created_at = row.get('created_at')
+        if created_at is not None and not isinstance(created_at, str):
+            # MySQL 返回 datetime, 按 'YYYY-MM-DD HH:MM:SS' 传回可与 TIMESTAMP 列比较
+            created_at = str(created_at)
+        return [VideoDatabase._sort_date(row.get('upload_time')), created_at, int(row['video_id'])]
+
+    @classmethod
+    def encode_list_cursor(cls, row: Dict[str, Any]) -> str:
+        """把列表中最后一行的排序键编码为不透明的游标字符串"""
+        payload = json.dumps(cls._sort_key_values(row), ensure_ascii=False, separators=(',', ':'))
+        return base64.urlsafe_b64encode(payload.encode('utf-8')).decode('ascii').rstrip('=')
+
+    @classmethod
+    def decode_list_cursor(cls, token: str) -> List[Any]:
+        """
+        解析游标字符串为排序键取值
+
+        Raises:
+            ValueError: 游标格式无效
+        """
+        try:
+            padded = token + '=' * (-len(token) % 4)
+            values = json.loads(base64.urlsafe_b64decode(padded.encode('ascii')).decode('utf-8'))
+        except (ValueError, UnicodeError):
+            raise ValueError("无效的分页游标 (Invalid cursor)")
+        if (not isinstance(values, list) or len(values) != len(cls._VIDEO_SORT_KEY)
+                or not isinstance(values[0], int) or not isinstance(values[-1], int)):
+            raise ValueError("无效的分页游标 (Invalid cursor)")
+        return values
+
+    def _keyset_clause(self, values: List[Any]) -> Tuple[str, List[Any]]:
+        """
+        构建 "排在游标之后" 的条件
+
+        排序键各列方向一致 (均为 DESC), 使用行值比较 (a, b, c) < (?, ?, ?),
+        SQLite 与 MySQL 都能据此在复合索引上直接定位起点。
+        """
+        placeholder = '%s' if self.use_mysql else '?'
+        columns = ', '.join(expr for expr, _ in self._VIDEO_SORT_KEY)
+        placeholders = ', '.join([placeholder] * len(self._VIDEO_SORT_KEY))
+        return f'({columns}) < ({placeholders})', list(values)
+
+    # ==================== 字段投影 (Field projection) ====================
+
+    # 可通过 fields 参数选择的列 (写入时派生的内部列不对外)
+    VIDEO_FIELDS: Tuple[str, ...] = tuple(name for name, _ in _VIDEO_WRITE_COLUMNS) + (
+        'unique_viewers', 'created_at', 'updated_at'
+    )
+
+    # 写入时派生、只供索引/排序/抽样使用的内部列, 不出现在返回的视频数据中
+    _INTERNAL_COLUMNS: Tuple[str, ...] = tuple(name for name, _, _ in _DERIVED_WRITE_COLUMNS) + (
+        'sample_rank', 'category_rank'
+    )
+
+    # 列表卡片默认返回的列 (VideoCard / CategorySection 渲染所需)
+    VIDEO_CARD_FIELDS: Tuple[str, ...] = (
+        'video_id', 'video_title', 'video_image', 'video_duration', 'play_count',
+        'upload_time', 'video_category', 'video_coins'
+    )
+
+    def _select_list(self, fields: Optional[Tuple[str, ...]], prefix: str = '',
+                     required: Tuple[str, ...] = ()) -> str:
+        """
+        把 fields 转为 SELECT 列清单, fields 为 None 时选择 VIDEO_FIELDS 全部列
+
+        video_id 始终包含; required 为调用方内部需要的列 (如排序键), 其中的内部列
+        由调用方在返回前用 _public_video 去掉。
+
+        Raises:
+            ValueError: 包含不可选择的列
+        """
+        if fields is None:
+            fields = self.VIDEO_FIELDS
+        unknown = [field for field in fields if field not in self.VIDEO_FIELDS]
+        if unknown:
+            raise ValueError(f"未知字段 (Unknown fields): {', '.join(unknown)}")
+        columns = dict.fromkeys(('video_id',) + tuple(fields) + tuple(required))
+        return ', '.join(prefix + column for column in columns)
+
+    @classmethod
+    def _public_video(cls, row: Any) -> Dict[str, Any]:
+        """把一行视频转为字典并去掉内部列 (_INTERNAL_COLUMNS)"""
+        video = dict(row)
+        for column in cls._INTERNAL_COLUMNS:
+            video.pop(column, None)
+        return video
+
+    def _list_videos(self, where: str, params: List[Any], limit: Optional[int],
+                     offset: int, cursor: Optional[str],
+                     fields: Optional[Tuple[str, ...]] = None) -> List[Dict[str, Any]]:
+        """
+        按列表排序取视频; 提供 cursor 时从游标处直接定位, 忽略 offset
 
-    def _tag_filter_clause(self, tag: str) -> Tuple[str, str]:
+        指定 fields 时只读取这些列, 外加生成下一页游标所需的排序键列。
         """
-        构建按标签过滤的 SQL 片段 (Build a SQL fragment for filtering by an exact tag)
+        placeholder = '%s' if self.use_mysql else '?'
+        conditions = [where] if where else []
+        params = list(params)
+        if cursor:
+            clause, cursor_params = self._keyset_clause(self.decode_list_cursor(cursor))
+            conditions.append(clause)
+            params.extend(cursor_params)
+            offset = 0
+
+        # 生成下一页游标所需的列 (sort_date 由 upload_time 推导)
+        sql = f'SELECT {self._select_list(fields, required=("upload_time", "created_at"))} FROM videos'
+        if conditions:
+            sql += ' WHERE ' + ' AND '.join(conditions)
+        sql += f' ORDER BY {self._VIDEO_ORDER_BY}'
+        if limit:
+            sql += f' LIMIT {placeholder} OFFSET {placeholder}'
+            params.extend([limit, offset])
+
+        db_cursor = self.connection.cursor()
+        db_cursor.execute(sql, tuple(params))
+        return [dict(row) for row in db_cursor.fetchall()]
 
-        video_tags 以逗号分隔存储 (如 "碧池,巨乳"), 为避免子串误匹配,
-        使用逗号边界匹配: 在两侧补上逗号后用 LIKE '%,tag,%' 精确匹配单个标签。
+    def get_all_videos(self, limit: Optional[int] = None,
+                       offset: int = 0,
+                       cursor: Optional[str] = None,
+                       fields: Optional[Tuple[str, ...]] = None) -> List[Dict[str, Any]]:
+        """
+        获取所有视频
 
         Args:
-            tag: 标签名称
+            limit: 限制返回数量
+            offset: 偏移量
+            cursor: 上一页返回的游标 (encode_list_cursor), 提供时忽略 offset
+            fields: 只读取这些列 (见 VIDEO_FIELDS), 默认读取全部列
 
         Returns:
-            (SQL条件片段, LIKE匹配参数)
+            视频列表
         """
-        placeholder = '%s' if self.use_mysql else '?'
-        # 逗号拼接: MySQL 用 CONCAT, SQLite 用 || 运算符
-        if self.use_mysql:
-            wrapped = "CONCAT(',', COALESCE(video_tags, ''), ',')"
-        else:
-            wrapped = "(',' || COALESCE(video_tags, '') || ',')"
-        clause = f"{wrapped} LIKE {placeholder}"
-        return clause, f"%,{tag},%"
+        return self._list_videos('', [], limit, offset, cursor, fields)
+
+    def count_all_videos(self) -> int:
+        """获取视频总数 (Get total number of videos)"""
+        cursor = self.connection.cursor()
+        cursor.execute('SELECT COUNT(*) as cnt FROM videos')
+        row = cursor.fetchone()
+        return int(row['cnt'] if isinstance(row, dict) else row[0])
 
     def _tags_filter_clause(self, tags: List[str],
-                            match_any: bool = False) -> Tuple[str, List[str]]:
+                            match_any: bool = False) -> Tuple[str, List[Any]]:
         """
         构建按多个标签过滤的 SQL 片段 (Build a SQL fragment for filtering by multiple tags)
 
@@ -641,29 +2899,42 @@ class VideoDatabase:
         - match_any=False (默认, 精准): 影片需同时包含所有选择的标签 (AND)
         - match_any=True  (广泛配对): 影片包含任意一个选择的标签即可 (OR)
 
+        标签先在 tags 字典表中解析为整数ID, 再通过 video_tag 关联表的主键
+        (tag_id, video_id) 取出视频ID, 不再对 video_tags 做无法走索引的
+        LIKE '%,tag,%' 全表扫描。
+
         Args:
             tags: 标签名称列表
             match_any: 是否为"广泛配对"(OR)模式
 
         Returns:
-            (SQL条件片段, LIKE匹配参数列表)
+            (SQL条件片段, 参数列表)
         """
-        clauses: List[str] = []
-        params: List[str] = []
-        for tag in tags:
-            tag = (tag or '').strip()
-            if not tag:
-                continue
-            clause, like_param = self._tag_filter_clause(tag)
-            clauses.append(clause)
-            params.append(like_param)
-
-        if not clauses:
+        names = [tag.strip() for tag in tags if tag and tag.strip()]
+        if not names:
             return '', []
 
-        joiner = ' OR ' if match_any else ' AND '
-        combined = '(' + joiner.join(clauses) + ')'
-        return combined, params
+        placeholder = '%s' if self.use_mysql else '?'
+        tag_ids = self._lookup_tag_ids(self.connection.cursor(), names)
+        if match_any:
+            ids = [tag_ids[name] for name in names if name in tag_ids]
+            if not ids:
+                return '1 = 0', []
+            clause = (
+                f"video_id IN (SELECT video_id FROM video_tag "
+                f"WHERE tag_id IN ({', '.join([placeholder] * len(ids))}))"
+            )
+            return clause, ids
+
+        # 精准模式: 任一标签不存在时不可能有匹配的视频
+        if any(name not in tag_ids for name in names):
+            return '1 = 0', []
+        ids = [tag_ids[name] for name in names]
+        clauses = [
+            f"video_id IN (SELECT video_id FROM video_tag WHERE tag_id = {placeholder})"
+            for _ in ids
+        ]
+        return '(' + ' AND '.join(clauses) + ')', ids
 
     @staticmethod
     def _normalize_tags(tag: Optional[str],
@@ -681,7 +2952,9 @@ class VideoDatabase:
                                offset: int = 0,
                                tag: Optional[str] = None,
                                tags: Optional[List[str]] = None,
-                               match_any: bool = False) -> List[Dict[str, Any]]:
+                               match_any: bool = False,
+                               cursor: Optional[str] = None,
+                               fields: Optional[Tuple[str, ...]] = None) -> List[Dict[str, Any]]:
         """
         按分类获取视频
 
@@ -692,35 +2965,75 @@ class VideoDatabase:
             tag: 可选的单个视频标签, 仅返回包含该标签的视频 (向后兼容)
             tags: 可选的多个视频标签列表
             match_any: 广泛配对模式 (True=任意匹配 OR, False=全部匹配 AND)
+            cursor: 上一页返回的游标 (encode_list_cursor), 提供时忽略 offset
+            fields: 只读取这些列 (见 VIDEO_FIELDS), 默认读取全部列
 
         Returns:
             视频列表
         """
-        cursor = self.connection.cursor()
         placeholder = '%s' if self.use_mysql else '?'
 
         where = f'video_category = {placeholder}'
         params: List[Any] = [category]
         selected = self._normalize_tags(tag, tags)
         if selected:
-            clause, like_params = self._tags_filter_clause(selected, match_any)
+            clause, tag_params = self._tags_filter_clause(selected, match_any)
             if clause:
                 where += f' AND {clause}'
-                params.extend(like_params)
+                params.extend(tag_params)
 
-        if limit:
-            cursor.execute(
-                f'SELECT * FROM videos WHERE {where} ORDER BY {self._VIDEO_ORDER_BY} LIMIT {placeholder} OFFSET {placeholder}',
-                (*params, limit, offset)
-            )
-        else:
+        return self._list_videos(where, params, limit, offset, cursor, fields)
+
+    # 单条 UNION ALL 语句最多合并的分类数 (SQLite 复合查询默认上限为 500)
+    _HEADS_CHUNK_SIZE = 100
+
+    def get_category_heads(self, categories: List[str], per_category: int,
+                           fields: Optional[Tuple[str, ...]] = None) -> Dict[str, List[Dict[str, Any]]]:
+        """
+        一次查询取多个分类各自的第一页 (First page of many categories at once)
+
+        每个分类是一个 ORDER BY ... LIMIT 子查询, 用 UNION ALL 合并为一条语句;
+        各分支沿 (video_category, sort_date, created_at, video_id) 索引只读取前
+        per_category 行。ROW_NUMBER() OVER (PARTITION BY video_category) 需要先给
+        这些分类的全部视频编号再过滤, 分类越大越慢, 因此不采用。
+
+        Args:
+            categories: 分类名称列表 (重复项只查询一次)
+            per_category: 每个分类返回的数量
+            fields: 只读取这些列 (见 VIDEO_FIELDS), 默认读取全部列
+
+        Returns:
+            {分类: 视频列表}, 每个请求的分类都有键 (没有视频时为空列表)
+        """
+        names = list(dict.fromkeys(category for category in categories if category))
+        result: Dict[str, List[Dict[str, Any]]] = {name: [] for name in names}
+        if not names or per_category <= 0:
+            return result
+
+        placeholder = '%s' if self.use_mysql else '?'
+        sort_columns = tuple(column for column, _ in self._VIDEO_SORT_KEY)
+        columns = self._select_list(fields, required=('video_category',) + sort_columns)
+        branch = (
+            f'SELECT * FROM (SELECT {columns} FROM videos '
+            f'WHERE video_category = {placeholder} '
+            f'ORDER BY {self._VIDEO_ORDER_BY} LIMIT {placeholder}) AS head_{{index}}'
+        )
+        cursor = self.connection.cursor()
+        for start in range(0, len(names), self._HEADS_CHUNK_SIZE):
+            chunk = names[start:start + self._HEADS_CHUNK_SIZE]
+            params: List[Any] = []
+            for name in chunk:
+                params.extend([name, per_category])
+            # UNION ALL 不保证各分支的行序, 外层再按排序键排一次 (只涉及已取出的行)
             cursor.execute(
-                f'SELECT * FROM videos WHERE {where} ORDER BY {self._VIDEO_ORDER_BY}',
+                ' UNION ALL '.join(branch.format(index=index) for index in range(len(chunk)))
+                + f' ORDER BY video_category, {self._VIDEO_ORDER_BY}',
                 tuple(params)
             )
-
-        rows = cursor.fetchall()
-        return [dict(row) if isinstance(row, dict) else dict(row) for row in rows]
+            for row in cursor.fetchall():
+                video = self._public_video(row)
+                result[row['video_category']].append(video)
+        return result
 
     def count_videos_by_category(self, category: str,
                                  tag: Optional[str] = None,
@@ -741,10 +3054,10 @@ class VideoDatabase:
         params: List[Any] = [category]
         selected = self._normalize_tags(tag, tags)
         if selected:
-            clause, like_params = self._tags_filter_clause(selected, match_any)
+            clause, tag_params = self._tags_filter_clause(selected, match_any)
             if clause:
                 where += f' AND {clause}'
-                params.extend(like_params)
+                params.extend(tag_params)
 
         cursor.execute(
             f'SELECT COUNT(*) as cnt FROM videos WHERE {where}',
@@ -753,13 +3066,16 @@ class VideoDatabase:
         row = cursor.fetchone()
         return int(row['cnt'] if isinstance(row, dict) else row[0])
 
-    def get_category_tags(self, category: str,
+    def get_category_tags(self, category: Optional[str],
                           limit: int = 60) -> List[Dict[str, Any]]:
         """
         获取指定分类下的视频标签及其数量 (按出现频率降序)
 
+        读取增量维护的 category_tag_stats (分类为空时读取 tags.video_count,
+        即全站标签统计), 沿 (video_category, video_count DESC, tag_id) 索引顺序取前 N 个。
+
         Args:
-            category: 视频分类
+            category: 视频分类, 为空时统计全站
             limit: 最多返回的标签数量
 
         Returns:
@@ -767,63 +3083,130 @@ class VideoDatabase:
         """
         cursor = self.connection.cursor()
         placeholder = '%s' if self.use_mysql else '?'
-        cursor.execute(
-            f"SELECT video_tags FROM videos WHERE video_category = {placeholder} "
-            f"AND video_tags IS NOT NULL AND video_tags != ''",
-            (category,)
-        )
-        rows = cursor.fetchall()
+        if category:
+            sql = (f"SELECT t.tag_name, s.video_count FROM category_tag_stats s "
+                   f"JOIN tags t ON t.tag_id = s.tag_id "
+                   f"WHERE s.video_category = {placeholder} "
+                   f"ORDER BY s.video_count DESC, s.tag_id")
+            params: List[Any] = [category]
+        else:
+            sql = ("SELECT tag_name, video_count FROM tags WHERE video_count > 0 "
+                   "ORDER BY video_count DESC, tag_id")
+            params = []
+        if limit and limit > 0:
+            sql += f' LIMIT {placeholder}'
+            params.append(limit)
+        cursor.execute(sql, tuple(params))
+        return [{"tag": row['tag_name'], "count": int(row['video_count'])}
+                for row in cursor.fetchall()]
 
-        counts: Dict[str, int] = {}
-        for row in rows:
-            raw = row['video_tags'] if isinstance(row, dict) else row[0]
-            if not raw:
-                continue
-            for tag in str(raw).split(','):
-                tag = tag.strip()
-                if not tag:
-                    continue
-                counts[tag] = counts.get(tag, 0) + 1
+    # 搜索排序: 相关度 + 热度加成, 热度按 play_count / (play_count + PIVOT) 饱和到 [0, 1)
+    _SEARCH_POPULARITY_WEIGHT = 1.0
+    _SEARCH_POPULARITY_PIVOT = 1000
 
-        ordered = sorted(counts.items(), key=lambda kv: (-kv[1], kv[0]))
-        if limit and limit > 0:
-            ordered = ordered[:limit]
-        return [{"tag": tag, "count": cnt} for tag, cnt in ordered]
+    def _search_query(self, keyword: str) -> Optional[Tuple[str, str, Tuple[Any, ...]]]:
+        """
+        构造全文检索查询, 返回 (FROM/WHERE 子句, 排序表达式, 参数); 无法使用全文索引时返回 None
+
+        SQLite 的 bm25() 越小越相关, MySQL 的 MATCH 相关度越大越相关,
+        排序表达式统一为 "越小越靠前"。
+        """
+        cursor = self.connection.cursor()
+        if not self._has_search_index(cursor):
+            return None
+        popularity = (f'{self._SEARCH_POPULARITY_WEIGHT} * COALESCE(v.play_count, 0) / '
+                      f'(COALESCE(v.play_count, 0) + {self._SEARCH_POPULARITY_PIVOT})')
+        if self.use_mysql:
+            expression = self._mysql_match_expression(keyword)
+            if not expression:
+                return None
+            match = 'MATCH(v.video_title, v.video_tags) AGAINST (%s IN BOOLEAN MODE)'
+            return (f'FROM videos v WHERE {match}',
+                    f'-({match} + {popularity})',
+                    (expression,))
+        expression = self._fts_match_expression(keyword)
+        if not expression:
+            return None
+        # 标题命中的权重为标签的 2 倍
+        return ('FROM videos_fts JOIN videos v ON v.video_id = videos_fts.rowid '
+                'WHERE videos_fts MATCH ?',
+                f'bm25(videos_fts, 2.0, 1.0) - {popularity}',
+                (expression,))
 
     def search_videos(self, keyword: str,
                       limit: Optional[int] = None,
-                      offset: int = 0) -> List[Dict[str, Any]]:
+                      offset: int = 0,
+                      fields: Optional[Tuple[str, ...]] = None) -> List[Dict[str, Any]]:
         """
-        搜索视频标题
+        搜索视频标题和标签
+
+        使用全文索引 (SQLite FTS5 / MySQL FULLTEXT ngram), 结果按相关度与播放量综合排序;
+        关键词中没有可检索的文字或全文索引不可用时回退为标题 LIKE 匹配。
 
         Args:
             keyword: 搜索关键词
             limit: 限制返回数量
             offset: 偏移量
+            fields: 只读取这些列 (见 VIDEO_FIELDS), 默认读取全部列
 
         Returns:
             匹配的视频列表
         """
+        search = self._search_query(keyword)
+        if search is None:
+            return self._search_videos_like(keyword, limit, offset, fields)
+
+        clause, rank, params = search
+        cursor = self.connection.cursor()
+        placeholder = '%s' if self.use_mysql else '?'
+        sql = f'SELECT {self._select_list(fields, "v.")} {clause} ORDER BY {rank}, v.video_id DESC'
+        if self.use_mysql:
+            # ORDER BY 中的 MATCH 需要再绑定一次关键词
+            params = params + params
+        if limit:
+            sql += f' LIMIT {placeholder} OFFSET {placeholder}'
+            params = params + (limit, offset)
+        cursor.execute(sql, params)
+        return [dict(row) for row in cursor.fetchall()]
+
+    def count_search_videos(self, keyword: str) -> int:
+        """获取搜索结果的视频总数 (Get total number of videos matching a keyword)"""
+        search = self._search_query(keyword)
+        if search is None:
+            return self._count_search_videos_like(keyword)
+
+        clause, _, params = search
+        cursor = self.connection.cursor()
+        cursor.execute(f'SELECT COUNT(*) as cnt {clause}', params)
+        row = cursor.fetchone()
+        return int(row['cnt'] if isinstance(row, dict) else row[0])
+
+    def _search_videos_like(self, keyword: str,
+                            limit: Optional[int] = None,
+                            offset: int = 0,
+                            fields: Optional[Tuple[str, ...]] = None) -> List[Dict[str, Any]]:
+        """标题 LIKE 搜索 (全文索引不可用时的回退路径)"""
         cursor = self.connection.cursor()
         search_pattern = f"%{keyword}%"
         placeholder = '%s' if self.use_mysql else '?'
+        columns = self._select_list(fields)
 
         if limit:
             cursor.execute(
-                f'SELECT * FROM videos WHERE video_title LIKE {placeholder} ORDER BY play_count DESC LIMIT {placeholder} OFFSET {placeholder}',
+                f'SELECT {columns} FROM videos WHERE video_title LIKE {placeholder} ORDER BY play_count DESC LIMIT {placeholder} OFFSET {placeholder}',
                 (search_pattern, limit, offset)
             )
         else:
             cursor.execute(
-                f'SELECT * FROM videos WHERE video_title LIKE {placeholder} ORDER BY play_count DESC',
+                f'SELECT {columns} FROM videos WHERE video_title LIKE {placeholder} ORDER BY play_count DESC',
                 (search_pattern,)
             )
 
         rows = cursor.fetchall()
-        return [dict(row) if isinstance(row, dict) else dict(row) for row in rows]
+        return [dict(row) for row in rows]
 
-    def count_search_videos(self, keyword: str) -> int:
-        """获取搜索结果的视频总数 (Get total number of videos matching a keyword)"""
+    def _count_search_videos_like(self, keyword: str) -> int:
+        """标题 LIKE 搜索的结果总数 (全文索引不可用时的回退路径)"""
         cursor = self.connection.cursor()
         search_pattern = f"%{keyword}%"
         placeholder = '%s' if self.use_mysql else '?'
@@ -852,7 +3235,8 @@ class VideoDatabase:
         cursor = self.connection.cursor()
         placeholder = '%s' if self.use_mysql else '?'
         cursor.execute(
-            f'SELECT * FROM videos WHERE play_count > 0 ORDER BY play_count DESC LIMIT {placeholder}',
+            f'SELECT {self._select_list(None)} FROM videos WHERE play_count > 0 '
+            f'ORDER BY play_count DESC LIMIT {placeholder}',
             (limit,)
         )
         rows = cursor.fetchall()
@@ -862,7 +3246,8 @@ class VideoDatabase:
         # videos so the carousel still displays content instead of being empty.
         if not videos:
             cursor.execute(
-                f'SELECT * FROM videos ORDER BY created_at DESC, video_id DESC LIMIT {placeholder}',
+                f'SELECT {self._select_list(None)} FROM videos '
+                f'ORDER BY created_at DESC, video_id DESC LIMIT {placeholder}',
                 (limit,)
             )
             rows = cursor.fetchall()
@@ -870,6 +3255,70 @@ class VideoDatabase:
 
         return videos
 
+    @staticmethod
+    def _sample_positions(size: int, start: int, stop: int, seed: Optional[str] = None) -> List[int]:
+        """
+        均匀随机排列 0..size-1 中第 start..stop-1 个位置 (稀疏 Fisher-Yates 洗牌)
+
+        只记录被交换过的位置, 代价为 O(stop) 而与 size 无关。相同 seed 下,
+        不同分页取到的是同一个排列的不同片段, 页与页之间不会重复。
+        """
+        rng = random.Random(seed)
+        swapped: Dict[int, int] = {}
+        positions: List[int] = []
+        for index in range(min(stop, size)):
+            target = rng.randrange(index, size)
+            current, picked = swapped.get(index, index), swapped.get(target, target)
+            swapped[target] = current
+            if index >= start:
+                positions.append(picked)
+        return positions
+
+    def get_random_videos(self, limit: int = 10, category: Optional[str] = None,
+                          seed: Optional[str] = None, offset: int = 0) -> List[Dict[str, Any]]:
+        """
+        从全站或某个分类中均匀随机抽取视频 (Uniform random sample)
+
+        每个视频都有全站序号 sample_rank 与分类内序号 category_rank (均为连续的 0..n-1),
+        抽样时先在 [0, n) 中抽取不重复的序号, 再按序号索引读取对应视频,
+        代价为 O(limit) 次索引查找, 不需要 ORDER BY RANDOM() 全表排序。
+
+        Args:
+            limit: 返回数量
+            category: 只在该分类中抽样 (可选)
+            seed: 随机种子 (可选); 提供时结果可复现, 配合 offset 翻页
+            offset: 在 seed 确定的随机排列中的起始位置
+
+        Returns:
+            视频列表 (按抽样顺序)
+        """
+        cursor = self.connection.cursor()
+        placeholder = '%s' if self.use_mysql else '?'
+        size = self._last_sample_rank(cursor, category) + 1
+        if size <= 0:
+            return []
+        ranks = self._sample_positions(size, offset, offset + limit, seed)
+        if not ranks:
+            return []
+
+        in_list = ', '.join([placeholder] * len(ranks))
+        if category is None:
+            column = 'sample_rank'
+            cursor.execute(
+                f'SELECT {self._select_list(None, required=(column,))} FROM videos '
+                f'WHERE sample_rank IN ({in_list})',
+                ranks
+            )
+        else:
+            column = 'category_rank'
+            cursor.execute(
+                f'SELECT {self._select_list(None, required=(column,))} FROM videos '
+                f'WHERE video_category = {placeholder} AND category_rank IN ({in_list})',
+                [category] + ranks
+            )
+        by_rank = {int(row[column]): self._public_video(row) for row in cursor.fetchall()}
+        return [by_rank[rank] for rank in ranks if rank in by_rank]
+
     def update_video(self, video_id: int,
                      updates: Dict[str, Any]) -> bool:
         """
@@ -901,6 +3350,10 @@ class VideoDatabase:
             if field in allowed_fields:
                 set_clauses.append(f"{field} = {placeholder}")
                 values.append(value)
+        for name, source, method in self._DERIVED_WRITE_COLUMNS:
+            if source in updates:
+                set_clauses.append(f"{name} = {placeholder}")
+                values.append(getattr(self, method)(updates[source]))
 
         if not set_clauses:
             return False
@@ -913,11 +3366,15 @@ class VideoDatabase:
 
         try:
             cursor = self.connection.cursor()
+            before = self._snapshot_videos(cursor, [video_id])
             sql = f"UPDATE videos SET {', '.join(set_clauses)} WHERE video_id = {placeholder}"
             cursor.execute(sql, values)
-            self.connection.commit()
-            return cursor.rowcount > 0
+            updated = cursor.rowcount > 0
+            self._reindex_videos(cursor, before, self._snapshot_videos(cursor, [video_id]))
+            self._commit()
+            return updated
         except Exception as e:
+            self.connection.rollback()
             logger.error(f"更新视频失败: {e}")
             self._log(f"❌ 更新视频失败: {e}")
             return False
@@ -927,6 +3384,9 @@ class VideoDatabase:
         """
         增加视频播放数
 
+        单条写入, 与 apply_play_counts 相同地计入分类播放总数与热度榜, 并通过 _commit
+        递增数据版本、失效该视频的缓存。API 的点击走 PlayCountAggregator 批量写入。
+
         Args:
             video_id: 视频ID
             increment: 增加的数量，默认为1
@@ -934,26 +3394,130 @@ class VideoDatabase:
         Returns:
             更新成功返回True
         """
+        try:
+            return self.apply_play_counts({video_id: increment}, notify=True) > 0
+        except Exception as e:
+            self._log(f"❌ 更新播放数失败: {e}")
+            return False
+
+    def apply_play_counts(self, increments: Dict[int, int],
+                          viewers: Optional[Dict[int, bytes]] = None,
+                          notify: bool = False) -> int:
+        """
+        批量累加播放数 (Apply coalesced play-count increments)
+
+        每批视频只执行一条 UPDATE ... SET play_count = play_count + CASE video_id ... END,
+        并在同一事务内把增量计入 category_stats.play_total 与热度榜。供 PlayCountAggregator
+        定时写入合并后的点击, 避免每次点击都单独占用一次写锁。
+
+        viewers 为同一批点击的 HyperLogLog 观看者草图, 与库中已有草图按寄存器取最大值
+        合并后写回, 并刷新 videos.unique_viewers。
+
+        批量写入默认不产生数据标签 (缓存依赖 TTL); notify=True 时为更新的视频产生 video:<ID>
+        标签, 提交时递增数据版本并失效对应缓存。
+
+        Args:
+            increments: {video_id: 增量}
+            viewers: {video_id: 观看者草图} (可选)
+            notify: 是否产生 video:<ID> 标签
+
+        Returns:
+            实际更新的视频数 (不存在的视频被忽略)
+        """
+        items = [(int(vid), int(inc)) for vid, inc in increments.items() if inc]
+        viewers = viewers or {}
+        if not items:
+            return 0
+        placeholder = '%s' if self.use_mysql else '?'
+        now = datetime.now().isoformat()
+        updated = 0
         try:
             cursor = self.connection.cursor()
-            placeholder = '%s' if self.use_mysql else '?'
+            # 每个视频占用 3 个参数 (CASE 中 2 个 + IN 中 1 个)
+            chunk_size = self._IN_CHUNK_SIZE // 2
+            for start in range(0, len(items), chunk_size):
+                chunk = items[start:start + chunk_size]
+                ids = [vid for vid, _ in chunk]
+                in_list = ', '.join([placeholder] * len(ids))
 
-            if self.use_mysql:
                 cursor.execute(
-                    f'UPDATE videos SET play_count = play_count + {placeholder} WHERE video_id = {placeholder}',
-                    (increment, video_id)
+                    f"SELECT video_id, COALESCE(video_category, '') AS video_category "
+                    f"FROM videos WHERE video_id IN ({in_list})",
+                    ids
                 )
-            else:
+                categories = {int(row['video_id']): row['video_category'] for row in cursor.fetchall()}
+                if not categories:
+                    continue
+
+                cases = ' '.join([f'WHEN {placeholder} THEN {placeholder}'] * len(chunk))
+                params: List[Any] = [value for pair in chunk for value in pair]
+                set_clause = f'play_count = play_count + CASE video_id {cases} ELSE 0 END'
+                if not self.use_mysql:
+                    set_clause += f', updated_at = {placeholder}'
+                    params.append(now)
                 cursor.execute(
-                    f'UPDATE videos SET play_count = play_count + {placeholder}, updated_at = {placeholder} WHERE video_id = {placeholder}',
-                    (increment, datetime.now().isoformat(), video_id)
+                    f'UPDATE videos SET {set_clause} WHERE video_id IN ({in_list})',
+                    params + ids
                 )
-            self.connection.commit()
-            return cursor.rowcount > 0
+                updated += cursor.rowcount
+                if notify:
+                    self._changed.update(f'video:{vid}' for vid in categories)
+
+                plays: Dict[str, int] = {}
+                for vid, inc in chunk:
+                    if vid in categories:
+                        plays[categories[vid]] = plays.get(categories[vid], 0) + inc
+                cursor.executemany(
+                    f'UPDATE category_stats SET play_total = play_total + {placeholder} '
+                    f'WHERE video_category = {placeholder}',
+                    [(inc, category) for category, inc in plays.items()]
+                )
+                self._merge_viewer_sketches(
+                    cursor, {vid: viewers[vid] for vid in categories if vid in viewers}
+                )
+                self._record_trending(
+                    cursor, [(vid, inc, categories[vid]) for vid, inc in chunk if vid in categories]
+                )
+            self._commit()
+            return updated
         except Exception as e:
-            logger.error(f"更新播放数失败: {e}")
-            self._log(f"❌ 更新播放数失败: {e}")
-            return False
+            self.connection.rollback()
+            logger.error(f"批量更新播放数失败: {e}")
+            raise
+
+    def _merge_viewer_sketches(self, cursor, sketches: Dict[int, bytes]) -> None:
+        """
+        把新的观看者草图合并进 video_viewers 并刷新 unique_viewers (调用方负责提交)
+
+        调用前 videos 行已在同一事务中更新 (已持有写锁/行锁), 其他进程对同一视频的
+        合并会等待本事务提交, 读-合并-写不会丢失寄存器; MySQL 额外使用锁定读,
+        以读取最新提交的草图而非事务快照。
+        """
+        if not sketches:
+            return
+        placeholder = '%s' if self.use_mysql else '?'
+        ids = list(sketches)
+        cursor.execute(
+            f"SELECT video_id, sketch FROM video_viewers "
+            f"WHERE video_id IN ({', '.join([placeholder] * len(ids))})"
+            + (' FOR UPDATE' if self.use_mysql else ''),
+            ids
+        )
+        merged = {vid: bytearray(sketch) for vid, sketch in sketches.items()}
+        for row in cursor.fetchall():
+            _hll_merge(merged[int(row['video_id'])], bytes(row['sketch']))
+
+        if self.use_mysql:
+            sql = ('INSERT INTO video_viewers (video_id, sketch) VALUES (%s, %s) '
+                   'ON DUPLICATE KEY UPDATE sketch = VALUES(sketch)')
+        else:
+            sql = ('INSERT INTO video_viewers (video_id, sketch) VALUES (?, ?) '
+                   'ON CONFLICT(video_id) DO UPDATE SET sketch = excluded.sketch')
+        cursor.executemany(sql, [(vid, bytes(sketch)) for vid, sketch in merged.items()])
+        cursor.executemany(
+            f'UPDATE videos SET unique_viewers = {placeholder} WHERE video_id = {placeholder}',
+            [(_hll_estimate(sketch), vid) for vid, sketch in merged.items()]
+        )
 
     def delete_video(self, video_id: int) -> bool:
         """
@@ -968,10 +3532,14 @@ class VideoDatabase:
         try:
             cursor = self.connection.cursor()
             placeholder = '%s' if self.use_mysql else '?'
+            before = self._snapshot_videos(cursor, [video_id])
             cursor.execute(f'DELETE FROM videos WHERE video_id = {placeholder}', (video_id,))
-            self.connection.commit()
-            return cursor.rowcount > 0
+            deleted = cursor.rowcount > 0
+            self._reindex_videos(cursor, before, {})
+            self._commit()
+            return deleted
         except Exception as e:
+            self.connection.rollback()
             logger.error(f"删除视频失败: {e}")
             self._log(f"❌ 删除视频失败: {e}")
             return False
@@ -987,16 +3555,7 @@ class VideoDatabase:
             成功删除的视频数量
         """
         # 归一化为去重后的整数列表, 过滤无效值
-        ids: List[int] = []
-        seen = set()
-        for vid in video_ids or []:
-            try:
-                iv = int(vid)
-            except (TypeError, ValueError):
-                continue
-            if iv not in seen:
-                seen.add(iv)
-                ids.append(iv)
+        ids = self._int_ids(video_ids)
 
         if not ids:
             return 0
@@ -1004,14 +3563,21 @@ class VideoDatabase:
         try:
             cursor = self.connection.cursor()
             placeholder = '%s' if self.use_mysql else '?'
-            placeholders = ', '.join([placeholder] * len(ids))
-            cursor.execute(
-                f'DELETE FROM videos WHERE video_id IN ({placeholders})',
-                ids
-            )
-            self.connection.commit()
-            return cursor.rowcount
+            before = self._snapshot_videos(cursor, ids)
+            deleted = 0
+            for start in range(0, len(ids), self._IN_CHUNK_SIZE):
+                chunk = ids[start:start + self._IN_CHUNK_SIZE]
+                placeholders = ', '.join([placeholder] * len(chunk))
+                cursor.execute(
+                    f'DELETE FROM videos WHERE video_id IN ({placeholders})',
+                    chunk
+                )
+                deleted += cursor.rowcount
+            self._reindex_videos(cursor, before, {})
+            self._commit()
+            return deleted
         except Exception as e:
+            self.connection.rollback()
             logger.error(f"批量删除视频失败: {e}")
             self._log(f"❌ 批量删除视频失败: {e}")
             return 0
@@ -1020,18 +3586,19 @@ class VideoDatabase:
         """
         获取所有分类及其视频数量
 
+        读取增量维护的 category_stats 表, 不再对 videos 全表分组计数。
+
         Returns:
             分类列表，包含分类名和视频数量
         """
         cursor = self.connection.cursor()
         cursor.execute('''
-            SELECT video_category, COUNT(*) as video_count
-            FROM videos
-            GROUP BY video_category
+            SELECT video_category, video_count
+            FROM category_stats
             ORDER BY video_count DESC
         ''')
         rows = cursor.fetchall()
-        return [dict(row) if isinstance(row, dict) else dict(row) for row in rows]
+        return [dict(row) for row in rows]
 
     def get_statistics(self) -> Dict[str, Any]:
         """
@@ -1041,21 +3608,16 @@ class VideoDatabase:
             统计信息字典
         """
         cursor = self.connection.cursor()
-
-        # 总视频数
-        cursor.execute('SELECT COUNT(*) as cnt FROM videos')
-        row = cursor.fetchone()
-        total_videos = row['cnt'] if isinstance(row, dict) else row[0]
-
-        # 总播放数
-        cursor.execute('SELECT COALESCE(SUM(play_count), 0) as total FROM videos')
-        row = cursor.fetchone()
-        total_plays = row['total'] if isinstance(row, dict) else row[0]
-
-        # 分类数
-        cursor.execute('SELECT COUNT(DISTINCT video_category) as cnt FROM videos')
-        row = cursor.fetchone()
-        category_count = row['cnt'] if isinstance(row, dict) else row[0]
+        cursor.execute('''
+            SELECT COALESCE(SUM(video_count), 0) as total_videos,
+                   COALESCE(SUM(play_total), 0) as total_plays,
+                   COUNT(CASE WHEN video_category != '' THEN 1 END) as category_count
+            FROM category_stats
+        ''')
+        row = dict(cursor.fetchone())
+        total_videos = int(row['total_videos'])
+        total_plays = int(row['total_plays'])
+        category_count = int(row['category_count'])
 
         # 平均播放数
         avg_plays = total_plays / total_videos if total_videos > 0 else 0
@@ -1128,7 +3690,8 @@ class VideoDatabase:
                     VALUES ({placeholder}, {placeholder}, {placeholder}, {placeholder})''',
                     (cat['key'], cat['label'], subcategories_json, i))
 
-            self.connection.commit()
+            self._changed.add('nav_categories')
+            self._commit()
             self._log(f"✅ 保存了 {len(categories)} 个导航分类")
             return True
         except Exception as e:
@@ -1262,7 +3825,8 @@ class VideoDatabase:
                         i
                     ))
 
-            self.connection.commit()
+            self._changed.add('carousel')
+            self._commit()
             self._log(f"✅ 保存了 {len(items)} 个轮播图条目")
             return True
         except Exception as e:
@@ -1279,73 +3843,37 @@ class VideoDatabase:
             分类统计列表，包含分类名、视频数量和示例图片
         """
         cursor = self.connection.cursor()
-        
-        if self.use_mysql:
-            # MySQL: Use a subquery with ROW_NUMBER() or a correlated subquery
-            # This approach uses a LEFT JOIN with a derived table that finds the latest video per category
-            cursor.execute('''
-                SELECT 
-                    c.video_category,
-                    c.video_count,
-                    v.video_image as sample_image
-                FROM (
-                    SELECT video_category, COUNT(*) as video_count
-                    FROM videos
-                    WHERE video_category IS NOT NULL AND video_category != ''
-                    GROUP BY video_category
-                ) c
-                LEFT JOIN videos v ON v.video_id = (
-                    SELECT v2.video_id 
-                    FROM videos v2 
-                    WHERE v2.video_category = c.video_category 
-                    AND v2.video_image IS NOT NULL 
-                    AND v2.video_image != ''
-                    ORDER BY v2.upload_time DESC 
-                    LIMIT 1
-                )
-                ORDER BY c.video_count DESC
-            ''')
-        else:
-            # SQLite: Similar approach with correlated subquery
-            cursor.execute('''
-                SELECT 
-                    c.video_category,
-                    c.video_count,
-                    (
-                        SELECT v.video_image 
-                        FROM videos v 
-                        WHERE v.video_category = c.video_category 
-                        AND v.video_image IS NOT NULL 
-                        AND v.video_image != ''
-                        ORDER BY v.upload_time DESC 
-                        LIMIT 1
-                    ) as sample_image
-                FROM (
-                    SELECT video_category, COUNT(*) as video_count
-                    FROM videos
-                    WHERE video_category IS NOT NULL AND video_category != ''
-                    GROUP BY video_category
-                ) c
-                ORDER BY c.video_count DESC
-            ''')
-        
-        rows = cursor.fetchall()
-        
-        result = []
-        for row in rows:
-            row_dict = dict(row) if isinstance(row, dict) else dict(row)
-            result.append({
-                'video_category': row_dict['video_category'],
-                'video_count': row_dict['video_count'],
-                'sample_image': row_dict.get('sample_image') or ''
-            })
-        
-        return result
+        cursor.execute('''
+            SELECT video_category, video_count, sample_image
+            FROM category_stats
+            WHERE video_category != ''
+            ORDER BY video_count DESC
+        ''')
+        return [
+            {
+                'video_category': row['video_category'],
+                'video_count': row['video_count'],
+                'sample_image': row['sample_image'] or ''
+            }
+            for row in cursor.fetchall()
+        ]
 
     # SQL expression for normalizing video titles (removing spaces and common separators)
     # Used in find_duplicates to identify similar titles like "海绵宝宝" and "海绵宝 宝"
+    # 写入时由 _normalize_title 以相同规则计算并存入 title_norm 列, 查询不再使用该表达式
     TITLE_NORMALIZE_SQL = "REPLACE(REPLACE(REPLACE(REPLACE(REPLACE(video_title, ' ', ''), '　', ''), '-', ''), '_', ''), '.', '')"
 
+    # TITLE_NORMALIZE_SQL 中移除的字符
+    _TITLE_NORMALIZE_CHARS = (' ', '　', '-', '_', '.')
+
+    @classmethod
+    def _normalize_title(cls, title: Any) -> str:
+        """规范化标题 (与 TITLE_NORMALIZE_SQL 相同): 移除空格、全角空格和常见分隔符"""
+        normalized = str(title or '')
+        for char in cls._TITLE_NORMALIZE_CHARS:
+            normalized = normalized.replace(char, '')
+        return normalized
+
     def find_duplicates(self, check_type: str = 'title') -> List[Dict[str, Any]]:
         """
         查找重复视频 (Find duplicate videos by title or image)
@@ -1363,47 +3891,40 @@ class VideoDatabase:
 
         if check_type == 'title':
             # 查找标题重复的视频 (忽略空格和常见分隔符)
-            # 使用 TITLE_NORMALIZE_SQL 移除空格、全角空格、以及常见的分隔符后进行比较
-            # 这样 "海绵宝宝" 和 "海绵宝 宝" 会被识别为相同标题
-            cursor.execute(f'''
-                SELECT 
-                    {self.TITLE_NORMALIZE_SQL} as normalized_title,
-                    COUNT(*) as duplicate_count
-                FROM videos
-                WHERE video_title IS NOT NULL AND video_title != ''
-                GROUP BY normalized_title
-                HAVING COUNT(*) > 1
-                ORDER BY duplicate_count DESC
-                LIMIT 100
+            # title_norm 在写入时按 TITLE_NORMALIZE_SQL 的规则计算, 分组只需扫描 idx_video_title_norm;
+            # 一条查询同时取出前 100 组及其成员, 窗口函数给出组内序号 (第一条的标题作为显示值)
+            cursor.execute('''
+                WITH dup AS (
+                    SELECT title_norm, COUNT(*) as duplicate_count
+                    FROM videos
+                    WHERE title_norm != ''
+                    GROUP BY title_norm
+                    HAVING COUNT(*) > 1
+                    ORDER BY duplicate_count DESC, title_norm
+                    LIMIT 100
+                )
+                SELECT
+                    v.video_id, v.video_title, v.video_image, v.video_category, v.upload_time,
+                    dup.title_norm, dup.duplicate_count,
+                    ROW_NUMBER() OVER (PARTITION BY dup.title_norm ORDER BY v.video_id) as member_rank
+                FROM dup
+                JOIN videos v ON v.title_norm = dup.title_norm
+                ORDER BY dup.duplicate_count DESC, dup.title_norm, member_rank
             ''')
-            duplicate_groups = cursor.fetchall()
 
             result = []
-            placeholder = '%s' if self.use_mysql else '?'
-            
-            for group in duplicate_groups:
-                group_dict = dict(group) if isinstance(group, dict) else dict(group)
-                normalized_title = group_dict['normalized_title']
-
-                # 使用相同的规范化方式查找所有匹配的视频
-                cursor.execute(
-                    f'''SELECT video_id, video_title, video_image, video_category, upload_time 
-                        FROM videos 
-                        WHERE {self.TITLE_NORMALIZE_SQL} = {placeholder}''',
-                    (normalized_title,)
-                )
-                videos = cursor.fetchall()
-                
-                # 使用第一个视频的原始标题作为显示值
-                video_list = [dict(v) if isinstance(v, dict) else dict(v) for v in videos]
-                display_title = video_list[0]['video_title'] if video_list else normalized_title
-                
-                result.append({
-                    'duplicate_value': display_title,
-                    'duplicate_type': 'title',
-                    'count': group_dict['duplicate_count'],
-                    'videos': video_list
-                })
+            for row in cursor.fetchall():
+                row = dict(row)
+                video = {key: row[key] for key in
+                         ('video_id', 'video_title', 'video_image', 'video_category', 'upload_time')}
+                if row['member_rank'] == 1:
+                    result.append({
+                        'duplicate_value': row['video_title'],
+                        'duplicate_type': 'title',
+                        'count': row['duplicate_count'],
+                        'videos': []
+                    })
+                result[-1]['videos'].append(video)
 
             return result
 
@@ -1472,20 +3993,10 @@ class VideoDatabase:
         """
         cursor = self.connection.cursor()
 
-        # 总视频数
-        cursor.execute('SELECT COUNT(*) as cnt FROM videos')
-        row = cursor.fetchone()
-        total_videos = row['cnt'] if isinstance(row, dict) else row[0]
-
-        # 分类统计
-        cursor.execute('''
-            SELECT COUNT(DISTINCT video_category) as cnt FROM videos
-            WHERE video_category IS NOT NULL AND video_category != ''
-        ''')
-        row = cursor.fetchone()
-        total_categories = row['cnt'] if isinstance(row, dict) else row[0]
+        # 总视频数 / 分类数 (来自 category_stats)
+        stats = self.get_statistics()
 
-        # 最新采集时间 (基于created_at或upload_time)
+        # 最新采集时间 (MAX(created_at) 走 idx_video_created_at, 只读索引一端)
         cursor.execute('''
             SELECT MAX(created_at) as latest FROM videos
         ''')
@@ -1496,19 +4007,25 @@ class VideoDatabase:
         category_stats = self.get_category_stats()
 
         return {
-            'total_videos': total_videos,
-            'total_categories': total_categories,
+            'total_videos': stats['total_videos'],
+            'total_categories': stats['category_count'],
             'latest_collection_time': latest_collection,
             'category_breakdown': category_stats[:10],  # Top 10 categories
             'hours_checked': hours
         }
 
     def close(self) -> None:
-        """关闭数据库连接"""
-        if self.connection:
-            self.connection.close()
-            self.connection = None
-            self._log("📁 数据库连接已关闭")
+        """关闭数据库连接 (使用连接池时归还连接)"""
+        connection = getattr(self, 'connection', None)
+        if not connection:
+            return
+        self.connection = None
+        pool = getattr(self, '_pool', None)
+        if pool is not None:
+            pool.release(connection)
+            return
+        connection.close()
+        self._log("📁 数据库连接已关闭")
 
     def __del__(self):
         """析构函数，确保连接被关闭"""
@@ -1523,6 +4040,407 @@ class VideoDatabase:
         self.close()
 
 
+# ==================== 连接池 (Connection Pool) ====================
+
+class PoolTimeout(Exception):
+    """在等待时间内没有可用的池连接 (No pooled connection became available in time)"""
+
+
+class _PooledConnection:
+    """池中的一个连接及其创建时间 (用于按存活时间回收)"""
+
+    __slots__ = ('connection', 'created_at')
+
+    def __init__(self, connection: Any):
+        self.connection = connection
+        self.created_at = time.monotonic()
+
+
+class ConnectionPool:
+    """
+    进程级线程安全连接池 (Process-wide, thread-safe connection pool)
+
+    建池时只执行一次建表/迁移 (借助一个普通的 VideoDatabase 完成初始化,
+    MySQL 不可用时同样会降级到 SQLite), 之后借出的连接直接可用, 请求不再
+    承担 DDL 开销。
+
+    - pool_size: 常驻的空闲连接上限
+    - max_overflow: 池满后允许临时多建的连接数, 归还时如空闲已满则直接关闭
+    - timeout: 连接全部借出时的等待秒数, 超时抛出 PoolTimeout
+    - recycle: 连接存活超过该秒数后, 借出前重建 (避免 MySQL wait_timeout 断连)
+    - pre_ping: 借出前做一次健康检查, 失效连接自动重建
+
+    默认值取自环境变量 DB_POOL_SIZE / DB_POOL_MAX_OVERFLOW /
+    DB_POOL_TIMEOUT / DB_POOL_RECYCLE。
+
+    使用方法:
+        pool = ConnectionPool(use_mysql=False)
+        with VideoDatabase(pool=pool, verbose=False) as db:
+            db.get_video(1)
+    """
+
+    def __init__(self, use_mysql: bool = True, db_path: Optional[str] = None,
+                 mysql_config: Optional[Dict[str, Any]] = None,
+                 pool_size: Optional[int] = None,
+                 max_overflow: Optional[int] = None,
+                 timeout: Optional[float] = None,
+                 recycle: Optional[float] = None,
+                 pre_ping: bool = True):
+        # 一次性完成建表与迁移, 并把这条连接作为池中的第一条连接
+        bootstrap = VideoDatabase(use_mysql=use_mysql, db_path=db_path,
+                                  mysql_config=mysql_config, verbose=False)
+        self.use_mysql = bootstrap.use_mysql
+        self.db_path = bootstrap.db_path
+        self.mysql_config = bootstrap.mysql_config
+
+        self.pool_size = max(1, pool_size if pool_size is not None else POOL_CONFIG['pool_size'])
+        self.max_overflow = max(0, max_overflow if max_overflow is not None
+                                else POOL_CONFIG['max_overflow'])
+        self.timeout = timeout if timeout is not None else POOL_CONFIG['timeout']
+        self.recycle = recycle if recycle is not None else POOL_CONFIG['recycle']
+        self.pre_ping = pre_ping
+
+        self._cond = threading.Condition()
+        self._idle: List[_PooledConnection] = []
+        self._checked_out: Dict[int, _PooledConnection] = {}
+        self._total = 0
+        self._closed = False
+        self._stats: Dict[str, int] = {
+            'checkouts': 0,
+            'waits': 0,
+            'timeouts': 0,
+            'created': 0,
+            'recycled': 0,
+            'reconnects': 0,
+        }
+
+        connection = bootstrap.connection
+        bootstrap.connection = None  # 转交给连接池, 避免被 bootstrap.close() 关闭
+        self._idle.append(_PooledConnection(connection))
+        self._total = 1
+        self._stats['created'] = 1
+
+    def _connect(self) -> Any:
+        """新建一条连接 (不执行 DDL, 建表已在建池时完成)"""
+        if self.use_mysql:
+            return _open_mysql_connection(self.mysql_config)
+        return _open_sqlite_connection(self.db_path)
+
+    def _ping(self, connection: Any) -> bool:
+        """健康检查: 连接仍可用返回 True"""
+        try:
+            if self.use_mysql:
+                connection.ping(reconnect=False)
+            else:
+                connection.execute('SELECT 1')
+            return True
+        except Exception:
+            return False
+
+    @staticmethod
+    def _close_quietly(connection: Any) -> None:
+        try:
+            connection.close()
+        except Exception:
+            pass
+
+    def _prepare(self, entry: Optional[_PooledConnection]) -> _PooledConnection:
+        """为借出准备连接: 新建、按存活时间回收或健康检查失败后重建"""
+        if entry is None:
+            entry = _PooledConnection(self._connect())
+            with self._cond:
+                self._stats['created'] += 1
+            return entry
+
+        if self.recycle and time.monotonic() - entry.created_at > self.recycle:
+            self._close_quietly(entry.connection)
+            entry = _PooledConnection(self._connect())
+            with self._cond:
+                self._stats['recycled'] += 1
+                self._stats['created'] += 1
+        elif self.pre_ping and not self._ping(entry.connection):
+            self._close_quietly(entry.connection)
+            entry = _PooledConnection(self._connect())
+            with self._cond:
+                self._stats['reconnects'] += 1
+                self._stats['created'] += 1
+        return entry
+
+    def acquire(self) -> Any:
+        """
+        借出一条连接
+
+        Returns:
+            数据库连接对象 (pymysql / sqlite3 连接)
+
+        Raises:
+            PoolTimeout: 在 timeout 秒内没有可用连接
+        """
+        deadline = time.monotonic() + self.timeout
+        entry: Optional[_PooledConnection] = None
+        with self._cond:
+            if self._closed:
+                raise PoolTimeout("连接池已关闭")
+            self._stats['checkouts'] += 1
+            waited = False
+            while True:
+                if self._idle:
+                    entry = self._idle.pop()
+                    break
+                if self._total < self.pool_size + self.max_overflow:
+                    self._total += 1
+                    break
+                if not waited:
+                    waited = True
+                    self._stats['waits'] += 1
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    self._stats['timeouts'] += 1
+                    raise PoolTimeout(
+                        f"等待数据库连接超时 ({self.timeout}s, "
+                        f"pool_size={self.pool_size}, max_overflow={self.max_overflow})"
+                    )
+                self._cond.wait(remaining)
+
+        try:
+            entry = self._prepare(entry)
+        except Exception:
+            with self._cond:
+                self._total -= 1
+                self._cond.notify()
+            raise
+
+        with self._cond:
+            self._checked_out[id(entry.connection)] = entry
+        return entry.connection
+
+    def release(self, connection: Any) -> None:
+        """归还连接: 回滚未提交的事务后放回空闲队列, 空闲已满时关闭"""
+        healthy = True
+        try:
+            connection.rollback()
+        except Exception:
+            healthy = False
+
+        with self._cond:
+            entry = self._checked_out.pop(id(connection), None)
+            if entry is None:
+                entry = _PooledConnection(connection)
+            keep = healthy and not self._closed and len(self._idle) < self.pool_size
+            if keep:
+                self._idle.append(entry)
+            else:
+                self._total -= 1
+            self._cond.notify()
+
+        if not keep:
+            self._close_quietly(connection)
+
+    def dispose(self) -> None:
+        """关闭所有空闲连接, 并拒绝后续借出 (已借出的连接归还时关闭)"""
+        with self._cond:
+            self._closed = True
+            idle, self._idle = self._idle, []
+            self._total -= len(idle)
+            self._cond.notify_all()
+        for entry in idle:
+            self._close_quietly(entry.connection)
+
+    def stats(self) -> Dict[str, Any]:
+        """连接池统计: 容量、当前占用以及累计借出/等待/超时次数"""
+        with self._cond:
+            in_use = len(self._checked_out)
+            return {
+                'backend': 'mysql' if self.use_mysql else 'sqlite',
+                'pool_size': self.pool_size,
+                'max_overflow': self.max_overflow,
+                'timeout': self.timeout,
+                'recycle': self.recycle,
+                'open': self._total,
+                'idle': len(self._idle),
+                'in_use': in_use,
+                'overflow': max(0, self._total - self.pool_size),
+                **self._stats,
+            }
+
+
+class PlayCountAggregator:
+    """
+    进程内播放数合并写入器 (In-process write-behind play counter)
+
+    播放接口只在内存中按 video_id 累加增量, 后台线程每隔 flush_interval 秒
+    (或累积次数达到 flush_threshold 时立即) 借一条池连接, 用
+    VideoDatabase.apply_play_counts 一条多行 UPDATE 写入。写入失败时增量
+    并回内存, 下次重试。进程退出前调用 close() 写入剩余增量
+    (API 服务通过 atexit 注册)。
+
+    传入观看者指纹时, 同时为待写入的视频维护一个 HyperLogLog 草图 (256 字节),
+    写入时与库中草图合并。草图可任意合并, 多个 worker 各自累积互不影响。
+
+    默认值取自环境变量 PLAY_FLUSH_INTERVAL / PLAY_FLUSH_THRESHOLD / PLAY_UNIQUE_VIEWERS。
+
+    使用方法:
+        counter = PlayCountAggregator(pool)
+        counter.add(video_id, viewer='203.0.113.7|Mozilla/5.0 ...')
+        ...
+        counter.close()
+    """
+
+    def __init__(self, pool: ConnectionPool,
+                 flush_interval: Optional[float] = None,
+                 flush_threshold: Optional[int] = None,
+                 unique_viewers: Optional[bool] = None):
+        self.pool = pool
+        self.flush_interval = max(0.05, flush_interval if flush_interval is not None
+                                  else PLAY_COUNT_CONFIG['flush_interval'])
+        self.flush_threshold = max(1, flush_threshold if flush_threshold is not None
+                                   else PLAY_COUNT_CONFIG['flush_threshold'])
+        self.unique_viewers = (unique_viewers if unique_viewers is not None
+                               else PLAY_COUNT_CONFIG['unique_viewers'])
+
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()  # 保证同一时刻只有一次写入
+        self._wakeup = threading.Event()
+        self._pending: Dict[int, int] = {}
+        self._sketches: Dict[int, bytearray] = {}
+        self._pending_increments = 0
+        self._closed = False
+        self._thread: Optional[threading.Thread] = None
+        self._stats: Dict[str, Any] = {
+            'increments': 0,
+            'flushes': 0,
+            'flushed_videos': 0,
+            'flush_errors': 0,
+            'last_flush_ms': 0.0,
+            'max_flush_ms': 0.0,
+            'total_flush_ms': 0.0,
+        }
+
+    def _ensure_thread(self) -> None:
+        """首次累加时启动后台写入线程 (守护线程, 不阻止进程退出)"""
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name='play-count-flusher',
+                                            daemon=True)
+            self._thread.start()
+
+    def add(self, video_id: int, increment: int = 1, viewer: Optional[str] = None) -> None:
+        """
+        累加一次播放 (只操作内存, 不访问数据库)
+
+        Args:
+            video_id: 视频ID
+            increment: 播放次数增量
+            viewer: 观看者指纹 (如 IP + User-Agent), 用于估算独立观看人数
+        """
+        sketch = None
+        if viewer and self.unique_viewers:
+            sketch = _hll_new()
+            _hll_add(sketch, viewer)
+        with self._lock:
+            if self._closed:
+                closed = True
+            else:
+                closed = False
+                self._pending[video_id] = self._pending.get(video_id, 0) + increment
+                if sketch is not None:
+                    _hll_merge(self._sketches.setdefault(video_id, _hll_new()), sketch)
+                self._pending_increments += increment
+                self._stats['increments'] += increment
+                if self._pending_increments >= self.flush_threshold:
+                    self._wakeup.set()
+                self._ensure_thread()
+        if closed:
+            # 关闭后 (进程退出过程中) 的点击直接写库, 不再丢进无人处理的缓冲区
+            self._write({video_id: increment}, {video_id: sketch} if sketch is not None else None)
+
+    def _run(self) -> None:
+        while True:
+            self._wakeup.wait(self.flush_interval)
+            self._wakeup.clear()
+            if self._closed:
+                return
+            try:
+                self.flush()
+            except Exception as e:  # flush 已记录错误, 这里保证线程不退出
+                logger.error(f"播放数写入线程异常: {e}")
+
+    def _write(self, batch: Dict[int, int],
+               sketches: Optional[Dict[int, bytearray]] = None) -> int:
+        """借一条池连接写入一批增量"""
+        db = VideoDatabase(pool=self.pool, verbose=False)
+        try:
+            return db.apply_play_counts(batch, sketches)
+        finally:
+            db.close()
+
+    def flush(self) -> int:
+        """
+        立即写入所有累积的增量
+
+        Returns:
+            本次更新的视频数 (写入失败返回 0, 增量保留到下次)
+        """
+        with self._flush_lock:
+            with self._lock:
+                batch, self._pending = self._pending, {}
+                sketches, self._sketches = self._sketches, {}
+                self._pending_increments = 0
+            if not batch:
+                return 0
+
+            started = time.monotonic()
+            try:
+                updated = self._write(batch, sketches)
+            except Exception as e:
+                with self._lock:
+                    for vid, inc in batch.items():
+                        self._pending[vid] = self._pending.get(vid, 0) + inc
+                        self._pending_increments += inc
+                    for vid, sketch in sketches.items():
+                        _hll_merge(self._sketches.setdefault(vid, _hll_new()), sketch)
+                    self._stats['flush_errors'] += 1
+                logger.warning(f"播放数写入失败, 稍后重试 ({len(batch)} 个视频): {e}")
+                return 0
+
+            elapsed_ms = (time.monotonic() - started) * 1000
+            with self._lock:
+                self._stats['flushes'] += 1
+                self._stats['flushed_videos'] += len(batch)
+                self._stats['last_flush_ms'] = round(elapsed_ms, 3)
+                self._stats['max_flush_ms'] = round(max(self._stats['max_flush_ms'], elapsed_ms), 3)
+                self._stats['total_flush_ms'] += elapsed_ms
+            return updated
+
+    def close(self) -> None:
+        """停止后台线程并写入剩余增量 (进程退出前调用)"""
+        with self._lock:
+            self._closed = True
+        self._wakeup.set()
+        if self._thread is not None and self._thread is not threading.current_thread():
+            self._thread.join(timeout=self.flush_interval + 5)
+        self.flush()
+
+    def stats(self) -> Dict[str, Any]:
+        """写入统计: 待写入的视频数/次数、累计写入次数与耗时"""
+        with self._lock:
+            flushes = self._stats['flushes']
+            return {
+                'flush_interval': self.flush_interval,
+                'flush_threshold': self.flush_threshold,
+                'unique_viewers': self.unique_viewers,
+                'pending_videos': len(self._pending),
+                'pending_sketches': len(self._sketches),
+                'pending_increments': self._pending_increments,
+                'increments': self._stats['increments'],
+                'flushes': flushes,
+                'flushed_videos': self._stats['flushed_videos'],
+                'flush_errors': self._stats['flush_errors'],
+                'last_flush_ms': self._stats['last_flush_ms'],
+                'max_flush_ms': self._stats['max_flush_ms'],
+                'avg_flush_ms': round(self._stats['total_flush_ms'] / flushes, 3) if flushes else 0.0,
+            }
+
+
 def import_from_collector(collector_data: List[Dict[str, Any]],
                           db: VideoDatabase) -> int:
     """
@@ -1717,6 +4635,16 @@ if __name__ == '__main__':
                         help='搜索视频标题')
     parser.add_argument('--top', type=int, default=None,
                         help='显示播放量最高的N个视频')
+    parser.add_argument('--rebuild-stats', action='store_true',
+                        help='从视频表全量重建分类统计 (category_stats)')
+    parser.add_argument('--backfill-derived', action='store_true',
+                        help='重新计算已有视频的派生列 (排序键/规范化标题/合集键)')
+    parser.add_argument('--rebuild-trending', action='store_true',
+                        help='从按小时播放桶重建热度榜分数 (video_trending)')
+    parser.add_argument('--update-related', action='store_true',
+                        help='增量计算待更新视频的相关推荐 (related_dirty 队列)')
+    parser.add_argument('--rebuild-related', action='store_true',
+                        help='全量重新计算所有视频的相关推荐')
 
     args = parser.parse_args()
 
@@ -1741,6 +4669,25 @@ if __name__ == '__main__':
             count = import_from_spjs(args.import_spjs, db)
             print(f"✅ 成功导入 {count} 个视频到数据库")
 
+        if args.backfill_derived:
+            print("\n🔧 正在回填派生列...")
+            db.backfill_derived_columns()
+
+        if args.rebuild_stats:
+            print("\n🔧 正在重建分类统计...")
+            db.rebuild_category_stats()
+
+        if args.rebuild_trending:
+            print("\n🔧 正在重建热度榜...")
+            db.rebuild_trending()
+
+        if args.rebuild_related:
+            print("\n🔧 正在全量计算相关推荐...")
+            db.rebuild_related_videos()
+        elif args.update_related:
+            print("\n🔧 正在增量计算相关推荐...")
+            db.update_related_videos()
+
         if args.stats:
             stats = db.get_statistics()
             print("\n📊 数据库统计信息:")
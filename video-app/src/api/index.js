@@ -213,6 +213,7 @@ async function cachedGet(url, params = {}, useCache = true) {
 // Video API endpoints
 export const videoApi = {
   // Get all videos with pagination
+  // Items carry only the card fields unless params.fields is set ('all' for full records)
   getVideos(params = {}) {
     return cachedGet('/videos', params)
   },
@@ -222,15 +223,31 @@ export const videoApi = {
     return cachedGet(`/videos/${videoId}`)
   },
 
+  // Get many videos by ID in one request (max 500); data follows the order of ids,
+  // with null for videos that no longer exist (also listed in `missing`)
+  getVideosBatch(ids, fields = '') {
+    const params = { ids: ids.join(',') }
+    if (fields) {
+      params.fields = fields
+    }
+    return api.get('/videos/batch', { params })
+  },
+
   // Search videos by keyword (no cache - user-initiated searches should be fresh)
-  searchVideos(keyword, limit = 20, offset = 0) {
-    return api.get('/videos/search', { params: { keyword, limit, offset } })
+  // fields: '' for card fields, 'all' for full records (admin editing)
+  searchVideos(keyword, limit = 20, offset = 0, fields = '') {
+    const params = { keyword, limit, offset }
+    if (fields) {
+      params.fields = fields
+    }
+    return api.get('/videos/search', { params })
   },
 
   // Get videos by category (optionally filtered by one or more tags)
   // tags: string or array of tag names; broad: OR matching when true (dyb 广泛配对)
-  getVideosByCategory(category, limit = 20, offset = 0, tags = '', broad = false) {
-    const params = { category, limit, offset }
+  // cursor: next_cursor from the previous page; seeks directly instead of using offset
+  getVideosByCategory(category, limit = 20, offset = 0, tags = '', broad = false, cursor = '') {
+    const params = cursor ? { category, limit, cursor } : { category, limit, offset }
     const list = Array.isArray(tags)
       ? tags.filter(Boolean)
       : (tags ? [tags] : [])
@@ -261,12 +278,25 @@ export const videoApi = {
     return cachedGet('/videos/top', { limit })
   },
 
-  // Get random video recommendations
-  getRandomVideos(limit = 10, category = '') {
+  // Get trending videos (time-decayed play counts), window: '24h' | '7d'
+  getTrendingVideos(window = '24h', limit = 20, category = '') {
+    const params = { window, limit }
+    if (category) {
+      params.category = category
+    }
+    return cachedGet('/videos/trending', params)
+  },
+
+  // Get random video recommendations (pass the same seed with an offset for reproducible pages)
+  getRandomVideos(limit = 10, category = '', seed = '', offset = 0) {
     const params = { limit }
     if (category) {
       params.category = category
     }
+    if (seed) {
+      params.seed = seed
+      params.offset = offset
+    }
     return api.get('/videos/random', { params })
   },
 
@@ -322,6 +352,13 @@ export const videoApi = {
     return api.get('/carousel')
   },
 
+  // Home page bootstrap: nav categories, carousel, category list and the
+  // first page of every nav subcategory in one request. Not cached here -
+  // the server caches the whole payload and drops it when admin settings change.
+  getHome(perCategory = 7) {
+    return api.get('/home', { params: { per_category: perCategory } })
+  },
+
   // Save home carousel videos (list of video ids, in display order)
   saveCarousel(videoIds) {
     return api.post('/admin/carousel', { video_ids: videoIds })
@@ -13,11 +13,25 @@ export interface Video {
   video_category: string
   video_tags?: string
   play_count: number
+  unique_viewers?: number
   upload_time: string
   video_duration: string
   video_coins: number
 }
 
+// Card projection returned by list endpoints unless fields=all is requested
+export type VideoCard = Pick<
+  Video,
+  | 'video_id'
+  | 'video_title'
+  | 'video_image'
+  | 'video_duration'
+  | 'play_count'
+  | 'upload_time'
+  | 'video_category'
+  | 'video_coins'
+>
+
 // Category entity interface
 export interface Category {
   video_category: string
@@ -29,12 +43,16 @@ export interface ApiResponse<T> {
   code: number
   message: string
   data: T
+  total?: number
+  // Keyset cursor for the next page of list endpoints (null at the end)
+  next_cursor?: string | null
 }
 
 // Pagination parameters
 export interface PaginationParams {
   limit?: number
   offset?: number
+  cursor?: string
 }
 
 // Search parameters
@@ -55,6 +73,22 @@ export interface Statistics {
   last_updated?: string
 }
 
+// Main navigation category (大分类) with its subcategories
+export interface NavCategory {
+  key: string
+  label: string
+  subcategories: string[]
+}
+
+// /api/home payload: everything the home page needs in one response
+export interface HomeData {
+  nav_categories: NavCategory[]
+  carousel: Array<Record<string, unknown>>
+  categories: Category[]
+  // First page of every nav subcategory (card fields)
+  category_videos: Record<string, VideoCard[]>
+}
+
 // Video list response
 export type VideoListResponse = ApiResponse<Video[]>
 
@@ -64,6 +98,9 @@ export type VideoResponse = ApiResponse<Video>
 // Category list response
 export type CategoryListResponse = ApiResponse<Category[]>
 
+// Home bootstrap response
+export type HomeResponse = ApiResponse<HomeData>
+
 // Statistics response type
 export type StatisticsResponse = ApiResponse<Statistics>
 
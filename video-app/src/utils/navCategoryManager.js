@@ -121,6 +121,17 @@ export async function fetchNavCategories() {
   return getNavCategories()
 }
 
+/**
+ * Update the cache with categories already fetched elsewhere (e.g. /api/home)
+ * @param {Array} categories - Navigation categories array
+ */
+export function setNavCategories(categories) {
+  if (Array.isArray(categories) && categories.length > 0) {
+    cachedCategories = categories
+    saveCacheToStorage(categories)
+  }
+}
+
 /**
  * Save navigation categories to API (async)
  * @param {Array} categories - Navigation categories to save
@@ -291,6 +302,7 @@ export async function initNavCategories() {
 export default {
   getNavCategories,
   fetchNavCategories,
+  setNavCategories,
   saveNavCategories,
   addNavCategory,
   updateNavCategory,